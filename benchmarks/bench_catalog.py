@@ -0,0 +1,71 @@
+"""Time until list-all has its first package name and until it has all of
+them, by scanning every database as before and by reading the catalog,
+together with the time of building the catalog.
+
+Usage: python -m benchmarks.bench_catalog [--packages N]
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from benchmarks.bench_divergent import ARCHS, two_arch_packages
+from benchmarks.bench_schema import normalized_load
+from depinspect.database import catalog, database
+from depinspect.database.connection import readers
+
+RELEASES = ("jammy", "noble")
+
+
+def scan(database_dir: Path) -> list[str]:
+    """Reference: distinct names of every database, sorted in Python."""
+    res: set[str] = set()
+    for db_path in sorted((database_dir / "ubuntu").iterdir()):
+        db_con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        for arch in ARCHS:
+            res.update(database.find_all_distinct(db_con, arch))
+        db_con.close()
+    return sorted(res)
+
+
+@click.command()
+@click.option("--packages", default=60_000, help="Packages of every architecture.")
+def main(packages: int) -> None:
+    with TemporaryDirectory() as tmp:
+        database_dir = Path(tmp)
+        (database_dir / "ubuntu").mkdir()
+        for release in RELEASES:
+            normalized_load(
+                two_arch_packages(packages),
+                database_dir / "ubuntu" / f"ubuntu_{release}.sqlite",
+            )
+
+        start = time.perf_counter()
+        scanned = scan(database_dir)
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        catalog.sync(database_dir)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        names = catalog.iter_names(database_dir, "ubuntu", set(ARCHS))
+        first = next(names)
+        first_name = time.perf_counter() - start
+        listed = [first, *names]
+        all_names = time.perf_counter() - start
+        readers.close()
+
+        assert listed == scanned
+        click.echo(
+            f"{len(listed)} names  scan {scan_time:6.2f}s  "
+            f"catalog build {build:6.2f}s  first name {first_name * 1e3:6.2f} ms  "
+            f"all names {all_names:6.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Time of dependency lookups that open a connection every time, as
+before, and that reuse the connections kept by Readers.
+
+Usage: python -m benchmarks.bench_connection [--packages N] [--lookups N]
+"""
+
+import sqlite3
+import time
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from benchmarks.bench_schema import normalized_load, synthetic_packages
+from depinspect.database import database
+from depinspect.database.connection import Readers
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def reconnecting(db_path: Path, names: list[str]) -> None:
+    for name in names:
+        db_con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        database.find_relations(db_con, "depends", "amd64", name)
+        db_con.close()
+
+
+def reusing(db_path: Path, names: list[str]) -> None:
+    with Readers() as readers:
+        for name in names:
+            database.find_relations(readers.get(db_path), "depends", "amd64", name)
+
+
+@click.command()
+@click.option("--packages", default=100_000, help="Number of packages to load.")
+@click.option("--lookups", default=20_000, help="Number of lookups.")
+def main(packages: int, lookups: int) -> None:
+    records = synthetic_packages(packages)
+    names = [records[i * packages // lookups].package for i in range(lookups)]
+
+    with TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "ubuntu_jammy.sqlite"
+        normalized_load(records, db_path)
+
+        for label, func in (("reconnecting", reconnecting), ("reusing", reusing)):
+            elapsed = timed(lambda: func(db_path, names))
+            click.echo(f"{label:<13} {elapsed / lookups * 1e6:6.1f} us/lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Database size and cold-cache join time with descriptions kept in the
+packages table and in a separate descriptions table.
+
+Every join runs on a new connection, so the SQLite page cache is empty,
+while the files stay in the page cache of the operating system.
+
+Usage: python -m benchmarks.bench_descriptions [--packages N] [--length N]
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+from shutil import copyfile
+from tempfile import TemporaryDirectory
+
+import click
+
+from benchmarks.bench_schema import normalized_load, synthetic_packages, table_size
+
+# Every package name and the number of packages depending on it.
+DEPENDENTS_QUERY = """
+    SELECT names.name, COUNT(*) FROM depends
+    JOIN names ON names.nameKey = depends.nameKey
+    JOIN packages ON packages.pkgKey = depends.pkgKey
+    WHERE packages.arch = 'amd64'
+    GROUP BY names.name
+"""
+
+# Distinct package names of an architecture, as listed by list-all.
+DISTINCT_QUERY = "SELECT DISTINCT name FROM packages WHERE arch = 'amd64'"
+
+
+def vacuum(db_path: Path) -> None:
+    db_con = sqlite3.connect(db_path)
+    db_con.execute("VACUUM")
+    db_con.close()
+
+
+def inline_descriptions(db_path: Path) -> None:
+    """Move descriptions back into the packages table, as stored before."""
+    db_con = sqlite3.connect(db_path)
+    db_con.executescript(
+        """
+        ALTER TABLE packages ADD COLUMN description TEXT;
+        UPDATE packages SET description = (
+            SELECT description FROM descriptions
+            WHERE descriptions.pkgKey = packages.pkgKey
+        );
+        DROP TABLE descriptions;
+        VACUUM;
+        """
+    )
+    db_con.close()
+
+
+def cold_join(db_path: Path, query: str, repeat: int) -> float:
+    """Best time of a query on a new connection with an empty page cache."""
+    timings = []
+    for _ in range(repeat):
+        db_con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        start = time.perf_counter()
+        db_con.execute(query).fetchall()
+        timings.append(time.perf_counter() - start)
+        db_con.close()
+    return min(timings)
+
+
+@click.command()
+@click.option("--packages", default=100_000, help="Number of packages to load.")
+@click.option("--length", default=80, help="Characters of every description.")
+@click.option("--repeat", default=5, help="Number of runs, the best one is reported.")
+def main(packages: int, length: int, repeat: int) -> None:
+    records = [
+        record._replace(description=(record.description * length)[:length])
+        for record in synthetic_packages(packages)
+    ]
+
+    with TemporaryDirectory() as tmp:
+        separate_path = Path(tmp) / "separate.sqlite"
+        inline_path = Path(tmp) / "inline.sqlite"
+        normalized_load(records, separate_path)
+        vacuum(separate_path)
+        copyfile(separate_path, inline_path)
+        inline_descriptions(inline_path)
+
+        for label, path in (("inline", inline_path), ("separate", separate_path)):
+            db_con = sqlite3.connect(path)
+            packages_size = table_size(db_con, "packages")
+            db_con.close()
+
+            scan = cold_join(path, DEPENDENTS_QUERY, repeat)
+            distinct = cold_join(path, DISTINCT_QUERY, repeat)
+            click.echo(
+                f"{label:<9} {path.stat().st_size / 2**20:7.1f} MiB  "
+                f"packages {packages_size / 2**20:5.1f} MiB  "
+                f"join {scan * 1e3:7.1f} ms  distinct {distinct * 1e3:7.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
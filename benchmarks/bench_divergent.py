@@ -0,0 +1,90 @@
+"""Time of finding packages with divergent dependencies between two
+architectures with two lookups per package, as before, and with a single
+set-based query.
+
+Usage: python -m benchmarks.bench_divergent [--packages N] [--repeat N]
+"""
+
+import sqlite3
+import time
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from benchmarks.bench_schema import normalized_load, synthetic_packages
+from depinspect.database import database
+from depinspect.distributions.package import PackageRecord
+
+ARCHS = ("amd64", "riscv64")
+
+
+def two_arch_packages(count: int) -> list[PackageRecord]:
+    """Build count packages of each architecture, every tenth one with
+    different dependencies on riscv64 and every hundredth one missing.
+    """
+    amd64 = synthetic_packages(count)
+    riscv64 = [
+        pkg._replace(
+            architecture="riscv64",
+            depends=pkg.depends[1:] if i % 10 == 0 else pkg.depends,
+        )
+        for i, pkg in enumerate(amd64)
+        if i % 100 != 1
+    ]
+    return amd64 + riscv64
+
+
+def per_package(db_con: sqlite3.Connection, versions: bool) -> set[str]:
+    """Reference: the relations of every stored package looked up per arch."""
+    names: set[str] = set()
+    for arch in ARCHS:
+        names.update(database.find_all_distinct(db_con, arch))
+
+    return {
+        name
+        for name in names
+        if database.find_relations(db_con, "depends", ARCHS[0], name, versions)
+        != database.find_relations(db_con, "depends", ARCHS[1], name, versions)
+    }
+
+
+def set_based(db_con: sqlite3.Connection, versions: bool) -> set[str]:
+    return database.find_divergent(db_con, "depends", *ARCHS, versions)
+
+
+def best_of(func: Callable[[], set[str]], repeat: int) -> tuple[float, set[str]]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        res = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), res
+
+
+@click.command()
+@click.option("--packages", default=60_000, help="Packages of every architecture.")
+@click.option("--repeat", default=3, help="Number of runs, the best one is reported.")
+def main(packages: int, repeat: int) -> None:
+    with TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "ubuntu_jammy.sqlite"
+        normalized_load(two_arch_packages(packages), db_path)
+        db_con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+        for versions in (True, False):
+            old, expected = best_of(lambda: per_package(db_con, versions), 1)
+            new, res = best_of(lambda: set_based(db_con, versions), repeat)
+            assert res == expected
+
+            label = "versions" if versions else "names only"
+            click.echo(
+                f"{label:<11} {len(res):6} divergent  "
+                f"per package {old:7.2f}s  set-based {new:6.2f}s"
+            )
+
+        db_con.close()
+
+
+if __name__ == "__main__":
+    main()
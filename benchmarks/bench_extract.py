@@ -0,0 +1,110 @@
+"""Throughput and peak memory of archive extraction.
+
+Usage: python -m benchmarks.bench_extract [--size MB] [--buffer-size BYTES]
+"""
+
+import bz2
+import lzma
+import time
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import IO, Any
+
+import click
+
+from depinspect.archives.extractor import (
+    BUFFER_SIZE,
+    extract_bz2_archive,
+    extract_xz_archive,
+)
+
+STANZA = (
+    "Package: libexample{0}\n"
+    "Architecture: amd64\n"
+    "Version: 1.{0}-1ubuntu1\n"
+    "Depends: libc6 (>= 2.34), libgcc-s1 (>= 3.0), libstdc++6 (>= 11)\n"
+    "Filename: pool/main/libe/libexample/libexample{0}_1.{0}-1ubuntu1_amd64.deb\n"
+    "Description: synthetic package number {0}\n\n"
+)
+
+FORMATS: dict[str, tuple[Callable[[bytes], bytes], Callable[..., None]]] = {
+    "xz": (lambda data: lzma.compress(data, preset=1), extract_xz_archive),
+    "bz2": (lambda data: bz2.compress(data, compresslevel=9), extract_bz2_archive),
+}
+
+
+def synthetic_payload(size: int) -> bytes:
+    """Build a Packages-like payload of at least size bytes."""
+    stanzas: list[str] = []
+    total = 0
+    while total < size:
+        stanza = STANZA.format(len(stanzas))
+        stanzas.append(stanza)
+        total += len(stanza)
+    return "".join(stanzas).encode()
+
+
+def extract_whole(
+    open_archive: Callable[[Path, str], IO[Any]], archive_path: Path, output_path: Path
+) -> None:
+    """Reference: read the whole decompressed payload into memory at once."""
+    with open_archive(archive_path, "rb") as archive:
+        data = archive.read()
+    output_path.write_bytes(data)
+
+
+def measure(func: Callable[[], None], repeat: int = 5) -> tuple[float, int]:
+    """Return the best elapsed seconds of untraced runs and peak traced memory."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    elapsed = min(timings)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak
+
+
+@click.command()
+@click.option("--size", default=64, help="Decompressed payload size in MB.")
+@click.option("--buffer-size", default=BUFFER_SIZE, help="Extraction buffer in bytes.")
+def main(size: int, buffer_size: int) -> None:
+    payload = synthetic_payload(size * 1024 * 1024)
+    payload_mb = len(payload) / 1024 / 1024
+
+    with TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+
+        for archive_ext, (compress, extractor) in FORMATS.items():
+            archive_path = tmp_dir / f"Packages.{archive_ext}"
+            archive_path.write_bytes(compress(payload))
+            output_path = tmp_dir / "Packages.txt"
+            open_archive = lzma.open if archive_ext == "xz" else bz2.open
+
+            runs: dict[str, Callable[[], None]] = {
+                f"chunked ({buffer_size} B)": lambda: extractor(
+                    archive_path, output_path, buffer_size
+                ),
+                "whole payload": lambda: extract_whole(
+                    open_archive, archive_path, output_path
+                ),
+            }
+
+            for label, run in runs.items():
+                elapsed, peak = measure(run)
+                click.echo(
+                    f"{archive_ext:>3} {label:<24} "
+                    f"{payload_mb / elapsed:8.1f} MB/s "
+                    f"peak {peak / 1024 / 1024:8.1f} MiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Time of finding Fedora packages with divergent requirements between two
+repository databases with two lookups per package, as before, and with
+a merge join of both databases read in the order of package names.
+
+Usage: python -m benchmarks.bench_fedora_divergent [--packages N] [--requires N]
+"""
+
+import sqlite3
+import time
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from depinspect.database import database
+
+# Tables and indexes of a Fedora primary.sqlite that are read.
+PRIMARY_SCHEMA = """
+    CREATE TABLE packages (pkgKey INTEGER PRIMARY KEY, name TEXT, arch TEXT);
+    CREATE TABLE requires (name TEXT, flags TEXT, version TEXT, pkgKey INTEGER);
+    CREATE INDEX packagename ON packages (name);
+    CREATE INDEX pkgrequires ON requires (pkgKey);
+"""
+
+
+def write_primary(db_path: Path, arch: str, packages: int, requires: int) -> None:
+    """Write a primary database, every tenth package of riscv64 has one
+    requirement less and every hundredth one is missing.
+    """
+    db_con = sqlite3.connect(db_path)
+    db_con.executescript(PRIMARY_SCHEMA)
+    with db_con:
+        db_con.executemany(
+            "INSERT INTO packages (pkgKey, name, arch) VALUES (?, ?, ?)",
+            [
+                (i, f"package{i}", arch)
+                for i in range(packages)
+                if arch != "riscv64" or i % 100 != 1
+            ],
+        )
+        db_con.executemany(
+            "INSERT INTO requires (name, pkgKey) VALUES (?, ?)",
+            [
+                (f"lib{(i * 7 + j) % 5000}.so", i)
+                for i in range(packages)
+                for j in range(requires - (arch == "riscv64" and i % 10 == 0))
+            ],
+        )
+    db_con.close()
+
+
+def per_package(db_a: Path, db_b: Path) -> set[str]:
+    """Reference: the requirements of every stored package looked up per arch."""
+    con_a = sqlite3.connect(f"file:{db_a}?mode=ro", uri=True)
+    con_b = sqlite3.connect(f"file:{db_b}?mode=ro", uri=True)
+
+    names = database.find_all_distinct(con_a, "x86_64")
+    names.update(database.find_all_distinct(con_b, "riscv64"))
+    res = {
+        name
+        for name in names
+        if database.find_dependencies(con_a, "requires", "x86_64", name)
+        != database.find_dependencies(con_b, "requires", "riscv64", name)
+    }
+
+    con_a.close()
+    con_b.close()
+    return res
+
+
+def merged(db_a: Path, db_b: Path) -> set[str]:
+    con_a = sqlite3.connect(f"file:{db_a}?mode=ro", uri=True)
+    con_b = sqlite3.connect(f"file:{db_b}?mode=ro", uri=True)
+    res = database.find_divergent_between(con_a, con_b, "requires", "x86_64", "riscv64")
+    con_a.close()
+    con_b.close()
+    return res
+
+
+def timed(func: Callable[[], set[str]]) -> tuple[float, set[str]]:
+    start = time.perf_counter()
+    res = func()
+    return time.perf_counter() - start, res
+
+
+@click.command()
+@click.option("--packages", default=20_000, help="Packages of the smallest run.")
+@click.option("--requires", default=8, help="Requirements of every package.")
+def main(packages: int, requires: int) -> None:
+    with TemporaryDirectory() as tmp:
+        for count in (packages, packages * 2, packages * 4):
+            db_a = Path(tmp) / f"everything_{count}.sqlite"
+            db_b = Path(tmp) / f"koji_{count}.sqlite"
+            write_primary(db_a, "x86_64", count, requires)
+            write_primary(db_b, "riscv64", count, requires)
+
+            old, expected = timed(lambda: per_package(db_a, db_b))
+            new, res = timed(lambda: merged(db_a, db_b))
+            assert res == expected
+
+            click.echo(
+                f"{count:7} packages {len(res):6} divergent  "
+                f"per package {old:6.2f}s  merge join {new:6.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
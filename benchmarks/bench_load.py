@@ -0,0 +1,179 @@
+"""Rows per second of loading packages into a fresh database, and the time
+of applying a small change set to a loaded one.
+
+Usage: python -m benchmarks.bench_load [--packages N] [--repeat N] [--changed N]
+"""
+
+import sqlite3
+import time
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from depinspect.database import database
+from depinspect.distributions.loader import (
+    RELATION_TABLES,
+    apply_changes,
+    insert_packages_into_db,
+)
+from depinspect.distributions.package import PackageRecord
+
+
+def synthetic_packages(count: int) -> list[PackageRecord]:
+    """Build records of count packages with a few relations each."""
+    return [
+        PackageRecord(
+            package=f"libexample{i}",
+            architecture="amd64",
+            version=f"1.{i}-1ubuntu1",
+            release="jammy",
+            description=f"synthetic package number {i}",
+            depends=("libc6 (>= 2.34)", "libgcc-s1 (>= 3.0)", f"libexample{i + 1}"),
+            recommends=("example-data",),
+            breaks=(f"libexample{i}-old (<< 1.0)",),
+            provides=(f"libexample-abi-{i % 100}",),
+        )
+        for i in range(count)
+    ]
+
+
+# Tables and indexes the original loader filled, created before the load.
+LEGACY_SCHEMA = """
+    CREATE TABLE packages
+        (  pkgKey INTEGER PRIMARY KEY,  pkgId TEXT,  name TEXT, arch TEXT,
+            version TEXT,  release TEXT,  description TEXT  );
+    CREATE TABLE depends
+        (  name TEXT,  version TEXT,  release TEXT,
+           pkgKey INTEGER , pre BOOLEAN DEFAULT FALSE  );
+    {0}
+    CREATE INDEX packagename ON packages (name);
+    CREATE INDEX packageId ON packages (pkgId);
+    CREATE INDEX pkgdepends on depends (pkgKey);
+    CREATE INDEX dependsname ON depends (name);
+    CREATE INDEX pkgprovides on provides (pkgKey);
+    CREATE INDEX providesname ON provides (name);
+    CREATE INDEX pkgconflicts on conflicts (pkgKey);
+    CREATE INDEX pkgsuggests on suggests (pkgKey);
+    CREATE INDEX pkgenhances on enhances (pkgKey);
+    CREATE INDEX pkgrecommends on recommends (pkgKey);
+"""
+
+
+def legacy_load(packages: list[PackageRecord], db_path: Path) -> None:
+    """Reference: the original loader, one lookup and eight inserts per package
+    into the original schema with indexes in place.
+    """
+    db_path.unlink(missing_ok=True)
+    db_con = sqlite3.connect(db_path)
+    db_con.executescript(
+        LEGACY_SCHEMA.format(
+            "".join(
+                f"CREATE TABLE {table} (name TEXT, version TEXT, release TEXT, "
+                "pkgKey INTEGER);"
+                for table in RELATION_TABLES
+                if table != "depends"
+            )
+        )
+    )
+
+    with db_con:
+        for pkg in packages:
+            res = db_con.execute(
+                """SELECT name, arch, version, release FROM packages
+                WHERE name = ? AND arch = ? AND version = ? AND release = ?""",
+                (pkg.package, pkg.architecture, pkg.version, pkg.release),
+            )
+            if res.fetchone() is not None:
+                continue
+
+            pkg_key = db_con.execute(
+                """INSERT INTO packages (name, arch, version, release, description)
+                VALUES (?, ?, ?, ?, ?)""",
+                (
+                    pkg.package,
+                    pkg.architecture,
+                    pkg.version,
+                    pkg.release,
+                    pkg.description,
+                ),
+            ).lastrowid
+            for table in RELATION_TABLES:
+                if getattr(pkg, table):
+                    db_con.executemany(
+                        f"INSERT INTO {table} (name, release, pkgKey) VALUES (?, ?, ?)",
+                        [
+                            (entry, pkg.release, pkg_key)
+                            for entry in getattr(pkg, table)
+                        ],
+                    )
+
+    db_con.close()
+
+
+def bulk_load(packages: list[PackageRecord], db_path: Path) -> None:
+    db_path = database.init(db_path.name, db_path.parent, indexes=False)
+    insert_packages_into_db(packages, db_path)
+    database.create_indexes(db_path)
+
+
+def changed_packages(packages: list[PackageRecord], count: int) -> list[PackageRecord]:
+    """Replace, add and remove count packages in total."""
+    step = max(len(packages) // max(count // 3, 1), 1)
+    changed = [
+        pkg._replace(description="updated") if i % step == 0 else pkg
+        for i, pkg in enumerate(packages)
+    ]
+    removed = count // 3
+    added = synthetic_packages(len(packages) + count - 2 * removed)[len(packages) :]
+    return changed[removed:] + added
+
+
+def best_of(func: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@click.command()
+@click.option("--packages", default=100_000, help="Number of packages to load.")
+@click.option("--repeat", default=3, help="Number of runs, the best one is reported.")
+@click.option(
+    "--changed", default=1000, help="Packages changed in the incremental run."
+)
+def main(packages: int, repeat: int, changed: int) -> None:
+    records = synthetic_packages(packages)
+    rows = len(records) + sum(
+        len(getattr(pkg, table)) for pkg in records for table in RELATION_TABLES
+    )
+
+    with TemporaryDirectory() as tmp:
+        runs: dict[str, Callable[[], None]] = {
+            "legacy": lambda: legacy_load(records, Path(tmp) / "legacy.sqlite"),
+            "bulk": lambda: bulk_load(records, Path(tmp) / "bulk.sqlite"),
+        }
+
+        timings: dict[str, float] = {}
+        for label, run in runs.items():
+            timings[label] = best_of(run, repeat)
+            click.echo(f"{label:<8} {rows / timings[label]:10.0f} rows/s")
+
+        click.echo(f"speedup {timings['legacy'] / timings['bulk']:.2f}x")
+
+        # Applied once to the database of the last bulk run.
+        snapshot = changed_packages(records, changed)
+        start = time.perf_counter()
+        stats = apply_changes(snapshot, Path(tmp) / "bulk.sqlite")
+        elapsed = time.perf_counter() - start
+        click.echo(
+            f"incremental {elapsed:.2f}s for {stats} "
+            f"(full bulk load {timings['bulk']:.2f}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Throughput of the Ubuntu Packages parser on a synthetic index.
+
+Usage: python -m benchmarks.bench_parse [--stanzas N] [--target SPEEDUP] [--jobs N]
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from os import cpu_count
+from pathlib import Path
+from re import split
+from tempfile import TemporaryDirectory
+
+import click
+
+from depinspect.distributions.ubuntu import Ubuntu
+
+STANZA = (
+    "Package: libexample{0}\n"
+    "Architecture: amd64\n"
+    "Version: 1.{0}-1ubuntu1\n"
+    "Priority: optional\n"
+    "Section: libs\n"
+    "Source: example\n"
+    "Origin: Ubuntu\n"
+    "Maintainer: Ubuntu Developers <ubuntu-devel-discuss@lists.ubuntu.com>\n"
+    "Installed-Size: 1024\n"
+    "Pre-Depends: libc6 (>= 2.34)\n"
+    "Depends: libc6 (>= 2.34), libgcc-s1 (>= 3.0), libstdc++6 (>= 11), "
+    "zlib1g (>= 1:1.2.0) | libz1\n"
+    "Recommends: example-data\n"
+    "Breaks: libexample-old (<< 1.0)\n"
+    "Filename: pool/main/e/example/libexample{0}_1.{0}-1ubuntu1_amd64.deb\n"
+    "Size: 123456\n"
+    "MD5sum: 0123456789abcdef0123456789abcdef\n"
+    "SHA1: 0123456789abcdef0123456789abcdef01234567\n"
+    "SHA256: 0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef\n"
+    "SHA512: {1}\n"
+    "Homepage: https://example.com\n"
+    "Description: synthetic package number {0}\n"
+    "Task: ubuntu-desktop\n"
+    "Description-md5: 0123456789abcdef0123456789abcdef\n\n"
+)
+
+
+def write_index(path: Path, stanzas: int) -> None:
+    sha512 = "0123456789abcdef" * 8
+    with open(path, "w", encoding="utf-8") as file:
+        for i in range(stanzas):
+            file.write(STANZA.format(i, sha512))
+
+
+def legacy_parse_metadata(file_path: Path, dist_release: str) -> list[Ubuntu]:
+    """Reference: the regex and setattr based parser this engine replaces."""
+    with open(file_path, encoding="utf-8") as file:
+        file_content = file.read()
+        ubuntu_packages: list[Ubuntu] = []
+
+        blocks = split(r"\n(?=Package:)", file_content)
+        for block in blocks:
+            if block.strip():
+                lines = block.strip().split("\n")
+                package_info = Ubuntu()
+
+                for line in lines:
+                    key, value = split(r":\s*", line, 1)
+                    try:
+                        setattr(package_info, key.lower().replace("-", "_"), value)
+                    except AttributeError:
+                        logging.warning(
+                            "Ubuntu package field %s was not set. Skipping value: %s",
+                            key,
+                            value,
+                        )
+
+                package_info.release = dist_release
+                ubuntu_packages.append(package_info)
+
+    return ubuntu_packages
+
+
+def best_of(func: Callable[[], int], repeat: int) -> tuple[float, int]:
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), count
+
+
+@click.command()
+@click.option("--stanzas", default=100_000, help="Number of stanzas in the index.")
+@click.option("--repeat", default=3, help="Number of runs, the best one is reported.")
+@click.option("--target", default=3.0, help="Required speedup over the legacy parser.")
+@click.option("--jobs", default=cpu_count() or 1, help="Processes of the parallel run.")
+def main(stanzas: int, repeat: int, target: float, jobs: int) -> None:
+    # The legacy parser warns about every unknown field.
+    logging.disable(logging.WARNING)
+
+    with TemporaryDirectory() as tmp:
+        index = Path(tmp) / "Packages.txt"
+        write_index(index, stanzas)
+        size_mb = index.stat().st_size / 1024 / 1024
+
+        runs: dict[str, Callable[[], int]] = {
+            "legacy": lambda: len(legacy_parse_metadata(index, "jammy")),
+            "dispatch": lambda: sum(1 for _ in Ubuntu.iter_metadata(index, "jammy")),
+            f"parallel ({jobs} jobs)": lambda: sum(
+                1 for _ in Ubuntu.iter_metadata_parallel(index, "jammy", jobs)
+            ),
+        }
+
+        timings: dict[str, float] = {}
+        for label, run in runs.items():
+            elapsed, count = best_of(run, repeat)
+            timings[label] = elapsed
+            click.echo(
+                f"{label:<20} {count / elapsed:10.0f} stanzas/s "
+                f"{size_mb / elapsed:8.1f} MB/s"
+            )
+
+    speedup = timings["legacy"] / timings["dispatch"]
+    verdict = "PASS" if speedup >= target else "FAIL"
+    click.echo(f"speedup {speedup:.2f}x (target {target:.1f}x): {verdict}")
+
+    if speedup < target:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""Database size and lookup time of the normalized relation schema compared
+with relations stored as free text.
+
+Usage: python -m benchmarks.bench_schema [--packages N] [--lookups N]
+"""
+
+import sqlite3
+import time
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from depinspect.database import database
+from depinspect.distributions.loader import (
+    RELATION_TABLES,
+    insert_packages_into_db,
+    package_hash,
+)
+from depinspect.distributions.package import PackageRecord
+
+# Relation entries shared by many packages, as in real indices.
+COMMON_DEPENDS = (
+    "libc6 (>= 2.34)",
+    "libgcc-s1 (>= 3.0)",
+    "libstdc++6 (>= 12)",
+    "zlib1g (>= 1:1.2.0) | libz1",
+    "debconf (>= 0.5) | debconf-2.0",
+)
+
+
+def synthetic_packages(count: int) -> list[PackageRecord]:
+    """Build records of count packages with common and unique relations."""
+    return [
+        PackageRecord(
+            package=f"libexample{i}",
+            architecture="amd64",
+            version=f"1.{i}-1ubuntu1",
+            release="jammy",
+            description=f"synthetic package number {i}",
+            depends=COMMON_DEPENDS[: 2 + i % 4] + (f"libexample{i // 2} (= 1.0)",),
+            recommends=("example-data",),
+            breaks=(f"libexample{i}-old (<< 1.0)",),
+            provides=(f"libexample-abi-{i % 100}",),
+        )
+        for i in range(count)
+    ]
+
+
+# Tables and indexes of the schema that stored relations as free text.
+TEXT_SCHEMA = """
+    CREATE TABLE packages
+        (  pkgKey INTEGER PRIMARY KEY,  pkgId TEXT,  name TEXT, arch TEXT,
+            version TEXT,  release TEXT,  description TEXT,  hash TEXT,
+            UNIQUE (name, arch, version, release)  );
+    {0}
+    CREATE INDEX packagename ON packages (name);
+    CREATE INDEX packageId ON packages (pkgId);
+    CREATE INDEX dependsname ON depends (name);
+    CREATE INDEX providesname ON provides (name);
+    {1}
+"""
+
+
+def text_load(packages: list[PackageRecord], db_path: Path) -> None:
+    """Reference: every relation entry stored as text with its release."""
+    db_con = sqlite3.connect(db_path)
+    db_con.executescript(
+        TEXT_SCHEMA.format(
+            "".join(
+                f"CREATE TABLE {table} (name TEXT, version TEXT, release TEXT, "
+                "pkgKey INTEGER);"
+                for table in RELATION_TABLES
+            ),
+            "".join(
+                f"CREATE INDEX pkg{table} ON {table} (pkgKey);"
+                for table in RELATION_TABLES
+            ),
+        )
+    )
+
+    with db_con:
+        db_con.executemany(
+            """INSERT INTO packages
+            (pkgKey, name, arch, version, release, description, hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (
+                    key,
+                    pkg.package,
+                    pkg.architecture,
+                    pkg.version,
+                    pkg.release,
+                    pkg.description,
+                    package_hash(pkg),
+                )
+                for key, pkg in enumerate(packages, start=1)
+            ],
+        )
+        for table in RELATION_TABLES:
+            db_con.executemany(
+                f"INSERT INTO {table} (name, release, pkgKey) VALUES (?, ?, ?)",
+                [
+                    (entry, pkg.release, key)
+                    for key, pkg in enumerate(packages, start=1)
+                    for entry in getattr(pkg, table)
+                ],
+            )
+    db_con.close()
+
+
+def normalized_load(packages: list[PackageRecord], db_path: Path) -> None:
+    database.init(db_path.name, db_path.parent, indexes=False)
+    insert_packages_into_db(packages, db_path)
+    database.create_indexes(db_path)
+
+
+def table_size(db_con: sqlite3.Connection, table: str) -> int:
+    """Bytes of the pages of a table and its indexes."""
+    (size,) = db_con.execute(
+        """SELECT SUM(pgsize) FROM dbstat
+        JOIN sqlite_master ON sqlite_master.name = dbstat.name
+        WHERE sqlite_master.tbl_name = ?""",
+        (table,),
+    ).fetchone()
+    return int(size)
+
+
+def timed(func: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--packages", default=100_000, help="Number of packages to load.")
+@click.option("--lookups", default=20_000, help="Number of lookups of each kind.")
+def main(packages: int, lookups: int) -> None:
+    records = synthetic_packages(packages)
+    names = [records[i * packages // lookups].package for i in range(lookups)]
+
+    with TemporaryDirectory() as tmp:
+        text_path = Path(tmp) / "text.sqlite"
+        normalized_path = Path(tmp) / "normalized.sqlite"
+        text_load(records, text_path)
+        normalized_load(records, normalized_path)
+
+        text_con = sqlite3.connect(text_path)
+        normalized_con = sqlite3.connect(normalized_path)
+
+        forward = {
+            "text": timed(
+                lambda: [
+                    database.find_dependencies(text_con, "depends", "amd64", name)
+                    for name in names
+                ]
+            ),
+            "normalized": timed(
+                lambda: [
+                    database.find_relations(normalized_con, "depends", "amd64", name)
+                    for name in names
+                ]
+            ),
+        }
+        # Free text can only be matched by prefix, the normalized
+        # schema looks the name up exactly.
+        reverse = {
+            "text": timed(
+                lambda: [
+                    text_con.execute(
+                        """SELECT DISTINCT packages.name FROM depends
+                        JOIN packages ON packages.pkgKey = depends.pkgKey
+                        WHERE depends.name = ? OR depends.name LIKE ? || ' %'""",
+                        (name, name),
+                    ).fetchall()
+                    for name in names[:100]
+                ]
+            ),
+            "normalized": timed(
+                lambda: [
+                    database.find_dependents(normalized_con, "depends", "amd64", name)
+                    for name in names[:100]
+                ]
+            ),
+        }
+        depends_size = {
+            "text": table_size(text_con, "depends"),
+            "normalized": table_size(normalized_con, "depends"),
+        }
+        text_con.close()
+        normalized_con.close()
+
+        for label, path in (("text", text_path), ("normalized", normalized_path)):
+            click.echo(
+                f"{label:<11} {path.stat().st_size / 2**20:7.1f} MiB  "
+                f"depends {depends_size[label] / 2**20:5.1f} MiB  "
+                f"dependencies {forward[label] / lookups * 1e6:6.1f} us/lookup  "
+                f"dependents {reverse[label] / 100 * 1e3:8.2f} ms/lookup"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Time of loading several architectures of a release one after another
+and sharded in parallel, against the time of the largest one alone.
+
+Usage: python -m benchmarks.bench_shard [--archs N] [--stanzas N] [--repeat N]
+"""
+
+import logging
+import time
+from collections.abc import Callable
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import click
+
+from benchmarks.bench_parse import write_index
+from depinspect.database import database
+from depinspect.distributions.loader import load_files
+
+
+def load(files: list[Path], db_path: Path, jobs: int) -> None:
+    database.init(db_path.name, db_path.parent, indexes=False)
+    load_files(files, db_path, "ubuntu", "jammy", jobs)
+    database.create_indexes(db_path)
+
+
+def best_of(func: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@click.command()
+@click.option("--archs", default=4, help="Number of architectures.")
+@click.option("--stanzas", default=50_000, help="Stanzas of every architecture.")
+@click.option("--repeat", default=3, help="Number of runs, the best one is reported.")
+def main(archs: int, stanzas: int, repeat: int) -> None:
+    logging.disable(logging.INFO)
+
+    with TemporaryDirectory() as tmp:
+        files = [Path(tmp) / f"ubuntu_jammy_main_arch{i}.txt" for i in range(archs)]
+        for i, file_path in enumerate(files):
+            write_index(file_path, stanzas)
+            content = file_path.read_text(encoding="utf-8")
+            file_path.write_text(
+                content.replace("Architecture: amd64", f"Architecture: arch{i}"),
+                encoding="utf-8",
+            )
+
+        db_path = Path(tmp) / "ubuntu_jammy.sqlite"
+        runs: dict[str, Callable[[], None]] = {
+            "single arch": lambda: load(files[:1], db_path, 1),
+            "sequential": lambda: load(files, db_path, 1),
+            f"sharded ({archs} jobs)": lambda: load(files, db_path, archs),
+        }
+
+        for label, run in runs.items():
+            click.echo(f"{label:<20} {best_of(run, repeat):8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+
+def validators_path(archive_path: Path) -> Path:
+    """Get the path of the sidecar file holding validators of a cached archive."""
+    return archive_path.with_name(f"{archive_path.name}.json")
+
+
+def read_validators(archive_path: Path, url: str) -> dict[str, str]:
+    """Read HTTP validators stored for a cached archive.
+
+    Parameters
+    ----------
+    archive_path : Path
+        Path to the cached archive.
+    url : str
+        The URL the archive is expected to be fetched from.
+
+    Returns
+    -------
+    dict[str, str]
+        Stored "etag" and "last_modified" values. Empty if the archive is missing,
+        no validators were stored or they belong to a different URL.
+    """
+    meta_path = validators_path(archive_path)
+
+    if not (archive_path.is_file() and meta_path.is_file()):
+        return {}
+
+    try:
+        with open(meta_path, encoding="utf-8") as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        logging.warning("Ignoring unreadable cache metadata %s", meta_path.name)
+        return {}
+
+    if meta.get("url") != url:
+        return {}
+
+    return {
+        key: meta[key]
+        for key in ("etag", "last_modified")
+        if isinstance(meta.get(key), str)
+    }
+
+
+def write_validators(archive_path: Path, url: str, validators: dict[str, str]) -> None:
+    """Store HTTP validators for a cached archive.
+
+    Parameters
+    ----------
+    archive_path : Path
+        Path to the cached archive.
+    url : str
+        The URL the archive was fetched from.
+    validators : dict[str, str]
+        "etag" and "last_modified" values returned by the server.
+    """
+    with open(validators_path(archive_path), "w", encoding="utf-8") as file:
+        json.dump({"url": url, **validators}, file, indent=2)
+
+
+def hash_file(file_path: Path, algorithm: str = "sha256") -> str:
+    """Compute the hex digest of a file without reading it into memory at once."""
+    digest = hashlib.new(algorithm)
+    with open(file_path, "rb") as file:
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -2,12 +2,58 @@ import bz2
 import logging
 import lzma
 from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from os import replace
 from pathlib import Path
+from shutil import copyfileobj
+from typing import IO, Any
 
-from depinspect.files import list_files_in_directory, remove_file
+from depinspect.constants import SETTINGS
+from depinspect.files import list_files_in_directory
 
+EXTRACTOR_SETTINGS = SETTINGS.get("extractor", {})
 
-def extract_xz_archive(archive_path: Path, output_path: Path) -> None:
+BUFFER_SIZE: int = EXTRACTOR_SETTINGS.get("buffer_size", 64 * 1024)
+
+
+def extract_archive(
+    open_archive: Callable[[Path, str], IO[Any]],
+    archive_path: Path,
+    output_path: Path,
+    buffer_size: int = BUFFER_SIZE,
+) -> None:
+    """Extract the contents of an archive in chunks of a fixed size.
+
+    The contents are written to a temporary file in the output directory,
+    which replaces the output file only when the extraction succeeds.
+
+    Parameters
+    ----------
+    open_archive : Callable[[Path, str], IO[Any]]
+        Function opening the archive as a file object, e.g. lzma.open.
+    archive_path : Path
+        Path to the archive.
+    output_path : Path
+        Path to the output file where the contents will be written.
+    buffer_size : int
+        Maximum number of decompressed bytes held in memory at once.
+    """
+    part_path = output_path.with_name(f"{output_path.name}.part")
+
+    with open_archive(archive_path, "rb") as archive:
+        try:
+            with open(part_path, "wb") as output_file:
+                copyfileobj(archive, output_file, buffer_size)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+
+    replace(part_path, output_path)
+
+
+def extract_xz_archive(
+    archive_path: Path, output_path: Path, buffer_size: int = BUFFER_SIZE
+) -> None:
     """Extract the contents of an XZ archive to a specified output file.
 
     Parameters
@@ -16,15 +62,15 @@ def extract_xz_archive(archive_path: Path, output_path: Path) -> None:
         Path to the XZ-compressed archive.
     output_path : Path
         Path to the output file where the contents will be written.
+    buffer_size : int
+        Maximum number of decompressed bytes held in memory at once.
     """
-    with lzma.open(archive_path, "rb") as xz_archive:
-        data = xz_archive.read()
-
-        with open(output_path, "wb") as output_file:
-            output_file.write(data)
+    extract_archive(lzma.open, archive_path, output_path, buffer_size)
 
 
-def extract_bz2_archive(archive_path: Path, output_path: Path) -> None:
+def extract_bz2_archive(
+    archive_path: Path, output_path: Path, buffer_size: int = BUFFER_SIZE
+) -> None:
     """Extract the contents of a BZ2 archive to a specified output file.
 
     Parameters
@@ -33,12 +79,69 @@ def extract_bz2_archive(archive_path: Path, output_path: Path) -> None:
         Path to the BZ2-compressed archive.
     output_path : Path
         Path to the output file where the contents will be written.
+    buffer_size : int
+        Maximum number of decompressed bytes held in memory at once.
+    """
+    extract_archive(bz2.open, archive_path, output_path, buffer_size)
+
+
+def extract_archives(
+    tasks: list[tuple[Callable[[Path, Path], None], Path, Path]], jobs: int = 1
+) -> dict[Path, Exception | None]:
+    """Extract independent archives, in parallel processes if requested.
+
+    Parameters
+    ----------
+    tasks : list[tuple[Callable[[Path, Path], None], Path, Path]]
+        Extractor function, archive path and output path of each archive.
+    jobs : int
+        Number of archives extracted at the same time. Each one is extracted
+        in a separate process, since decompression is CPU-bound.
+
+    Returns
+    -------
+    dict[Path, Exception | None]
+        Result for every output path: None on success, the raised exception
+        otherwise. A failed archive doesn't prevent the others from being extracted.
+
+    Raises
+    ------
+    ValueError
+        If the number of jobs is less than one.
     """
-    with bz2.open(archive_path, "rb") as bz_archive:
-        data = bz_archive.read()
+    if jobs < 1:
+        raise ValueError("Number of jobs must be a positive integer.")
 
-        with open(output_path, "wb") as output_file:
-            output_file.write(data)
+    results: dict[Path, Exception | None] = {}
+
+    if jobs == 1 or len(tasks) < 2:
+        for extractor, archive_path, output_path in tasks:
+            try:
+                extractor(archive_path, output_path)
+                results[output_path] = None
+            except Exception as e:
+                logging.exception("Failed to extract %s", archive_path)
+                results[output_path] = e
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+        futures = {
+            executor.submit(extractor, archive_path, output_path): (
+                archive_path,
+                output_path,
+            )
+            for extractor, archive_path, output_path in tasks
+        }
+        for future in as_completed(futures):
+            archive_path, output_path = futures[future]
+            try:
+                future.result()
+                results[output_path] = None
+            except Exception as e:
+                logging.error("Failed to extract %s: %s", archive_path, e)
+                results[output_path] = e
+
+    return results
 
 
 def process_archives(
@@ -47,7 +150,8 @@ def process_archives(
     file_extension: str,
     archive_extension: str,
     extractor: Callable[[Path, Path], None],
-) -> None:
+    jobs: int = 1,
+) -> dict[Path, Exception | None]:
     """Process archives in the input directory.
 
     Parameters
@@ -62,26 +166,24 @@ def process_archives(
         File extension of the archives to be processed.
     extractor : Callable[[Path, Path], None]
         Extractor function to be applied to each archive.
+    jobs : int
+        Number of archives extracted at the same time in separate processes.
+
+    Returns
+    -------
+    dict[Path, Exception | None]
+        Result for every extracted file: None on success, the raised exception
+        otherwise. Existing files are replaced only by successful extractions.
     """
     archives_files = [
         file
         for file in list_files_in_directory(input_dir)
         if file.suffix == archive_extension
     ]
-    try:
-        for archive_path in archives_files:
-            file_name = archive_path.stem
-            out_file_path = output_dir / f"{file_name}{file_extension}"
-
-            # If an output file with the same name and extension exists, remove it
-            if (
-                out_file_path.exists()
-                and out_file_path.is_file()
-                and out_file_path.suffix == file_extension
-            ):
-                logging.info("Removing existing fedora database.")
-                remove_file(out_file_path)
-
-            extractor(archive_path, out_file_path)
-    except Exception:
-        logging.exception("Failed to extract %s", archive_path)
+
+    tasks = [
+        (extractor, archive_path, output_dir / f"{archive_path.stem}{file_extension}")
+        for archive_path in archives_files
+    ]
+
+    return extract_archives(tasks, jobs)
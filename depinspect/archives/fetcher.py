@@ -1,16 +1,65 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http import HTTPStatus
+from os import replace
 from pathlib import Path
+from shutil import copyfileobj
+from threading import BoundedSemaphore
+from typing import NamedTuple
 from urllib import request
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
 
+from depinspect.archives.cache import read_validators, write_validators
+from depinspect.constants import FETCHER_SETTINGS
 
-def pull_target_from_url(target_url: str, local_target_path: Path) -> None:
+MAX_WORKERS: int = FETCHER_SETTINGS.get("max_workers", 8)
+
+MAX_PER_HOST: int = FETCHER_SETTINGS.get("max_per_host", 2)
+
+PDIFF: bool = FETCHER_SETTINGS.get("pdiff", True)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FetchResult(NamedTuple):
+    """Outcome of fetching a single URL.
+
+    validators holds the validators of a fetched target that were
+    not stored yet, see fetch_all.
+    """
+
+    path: Path
+    modified: bool = False
+    error: Exception | None = None
+    validators: dict[str, str] | None = None
+
+
+def pull_target_from_url(
+    target_url: str,
+    local_target_path: Path,
+    validators: dict[str, str] | None = None,
+) -> dict[str, str] | None:
     """Pull a target from a given URL and save it to a local file.
 
+    The response body is streamed to a temporary file next to the target,
+    which replaces the target only when the transfer succeeds.
+
     Parameters
     ----------
     target_url : str
         The URL of the target to be pulled.
     local_target_path : Path
         The local path where the target will be saved.
+    validators : dict[str, str] | None
+        "etag" and "last_modified" values of the currently saved target.
+        When given, the request is made conditional on the target being changed.
+
+    Returns
+    -------
+    dict[str, str] | None
+        Validators of the pulled target, or None if the server replied
+        that the saved target is not modified.
 
     Raises
     ------
@@ -22,38 +71,113 @@ def pull_target_from_url(target_url: str, local_target_path: Path) -> None:
     else:
         raise ValueError from None
 
-    with request.urlopen(req, timeout=15.0) as response:
-        if response.status == 200:
-            request.urlretrieve(target_url, local_target_path)
+    if validators:
+        if "etag" in validators:
+            req.add_header("If-None-Match", validators["etag"])
+        if "last_modified" in validators:
+            req.add_header("If-Modified-Since", validators["last_modified"])
 
+    part_path = local_target_path.with_name(f"{local_target_path.name}.part")
 
-def fetch_and_save_metadata(
-    config: dict[str, dict[str, dict[str, dict[str, str]]]],
-    distro: str,
-    output_dir: Path,
-) -> None:
-    """Fetch and save metadata for a specified distribution.
+    try:
+        with request.urlopen(req, timeout=15.0) as response:
+            with open(part_path, "wb") as output_file:
+                copyfileobj(response, output_file, CHUNK_SIZE)
+            headers = response.headers
+    except HTTPError as e:
+        if e.code == HTTPStatus.NOT_MODIFIED:
+            return None
+        raise
+    except BaseException:
+        part_path.unlink(missing_ok=True)
+        raise
+
+    replace(part_path, local_target_path)
+
+    return {
+        key: value
+        for key, value in (
+            ("etag", headers.get("ETag")),
+            ("last_modified", headers.get("Last-Modified")),
+        )
+        if value
+    }
+
+
+def fetch_all(
+    targets: dict[str, Path],
+    max_workers: int = MAX_WORKERS,
+    max_per_host: int = MAX_PER_HOST,
+    conditional: bool = True,
+    store_validators: bool = True,
+) -> dict[str, FetchResult]:
+    """Concurrently pull every target URL to its local path.
 
     Parameters
     ----------
-    config : Dict[str, Dict[str, Dict[str, Dict[str, str]]]]
-        Configuration dictionary.
-    distribution : str
-        The distribution for which metadata should be fetched and saved.
-    output_directory : Path
-        The directory where the fetched metadata will be saved.
+    targets : dict[str, Path]
+        Mapping of target URLs to the local paths where they will be saved.
+    max_workers : int
+        Maximum number of downloads running at the same time.
+    max_per_host : int
+        Maximum number of downloads running at the same time against one host.
+    conditional : bool
+        Skip the transfer of targets that weren't changed since they were saved,
+        using validators stored next to them.
+    store_validators : bool
+        Store validators of fetched targets right away. Otherwise they are
+        returned in the results, to be stored with write_validators once the
+        targets were put to use.
 
     Returns
     -------
-    None
+    dict[str, FetchResult]
+        Result for every target URL.
+
+    Raises
+    ------
+    ValueError
+        If any of the concurrency limits is less than one.
     """
-    for release, branches in config[distro].items():
-        for branch, archs in branches.items():
-            for arch, url in archs.items():
-                archive_ext = url.split(".")[-1]
+    if max_workers < 1 or max_per_host < 1:
+        raise ValueError("Concurrency limits must be positive integers.")
+
+    host_limits = {
+        urlsplit(url).netloc: BoundedSemaphore(max_per_host) for url in targets
+    }
+
+    def pull_with_host_limit(url: str, local_target_path: Path) -> FetchResult:
+        validators = read_validators(local_target_path, url) if conditional else {}
+
+        with host_limits[urlsplit(url).netloc]:
+            new_validators = pull_target_from_url(url, local_target_path, validators)
+
+        if new_validators is None:
+            return FetchResult(local_target_path)
+
+        if store_validators:
+            write_validators(local_target_path, url, new_validators)
+            return FetchResult(local_target_path, modified=True)
+
+        return FetchResult(local_target_path, modified=True, validators=new_validators)
 
-                file_name = f"{distro}_{release}_{branch}_{arch}.{archive_ext}"
+    results: dict[str, FetchResult] = {}
 
-                local_target_path = output_dir / file_name
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(pull_with_host_limit, url, path): url
+            for url, path in targets.items()
+        }
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                results[url] = future.result()
+                if results[url].modified:
+                    logging.info("Fetched %s", url)
+                else:
+                    logging.info("Not modified since last update: %s", url)
+            except Exception as e:
+                results[url] = FetchResult(targets[url], error=e)
+                logging.error("Failed to fetch %s: %s", url, e)
 
-                pull_target_from_url(url, local_target_path)
+    return results
@@ -0,0 +1,215 @@
+import gzip
+import hashlib
+import logging
+import re
+import zlib
+from os import replace
+from pathlib import Path
+from shutil import copyfile
+from typing import NamedTuple
+
+from depinspect.archives.cache import hash_file
+from depinspect.archives.stream import read_url
+from depinspect.distributions.deb822 import iter_stanzas
+
+# Commands of ed scripts produced by "diff --ed".
+ED_COMMAND = re.compile(rb"(\d+)(?:,(\d+))?([acd])")
+
+
+class PdiffIndex(NamedTuple):
+    """Contents of a Packages.diff/Index file.
+
+    Hashes are SHA256 hex digests. history holds the hash of every older
+    version of the index together with the name of the patch that applies
+    to it, oldest first.
+    """
+
+    current: str
+    history: list[tuple[str, str]]
+    patches: dict[str, str]
+    downloads: dict[str, tuple[str, str]]
+    merged: bool
+
+
+def hash_entries(value: str) -> list[tuple[str, str]]:
+    """Split a multiline "<hash> <size> <name>" field into (hash, name) pairs."""
+    entries = []
+    for line in value.splitlines():
+        parts = line.split()
+        if len(parts) == 3:
+            entries.append((parts[0], parts[2]))
+    return entries
+
+
+def parse_index(text: str) -> PdiffIndex:
+    """Parse a Packages.diff/Index file.
+
+    Raises
+    ------
+    ValueError
+        If the index doesn't specify the SHA256 of the current index.
+    """
+    fields = next(iter_stanzas(text.splitlines()), {})
+
+    current = fields.get("SHA256-Current", "").split()
+    if not current:
+        raise ValueError("pdiff index has no SHA256-Current field")
+
+    return PdiffIndex(
+        current=current[0],
+        history=hash_entries(fields.get("SHA256-History", "")),
+        patches={
+            name: digest
+            for digest, name in hash_entries(fields.get("SHA256-Patches", ""))
+        },
+        downloads={
+            name.removesuffix(".gz"): (name, digest)
+            for digest, name in hash_entries(fields.get("SHA256-Download", ""))
+        },
+        merged=fields.get("X-Patch-Precedence", "") == "merged",
+    )
+
+
+def patches_to_apply(index: PdiffIndex, digest: str) -> list[str]:
+    """Get names of the patches that turn a local index into the current one.
+
+    Raises
+    ------
+    ValueError
+        If the local index is not one of the versions the patches apply to.
+    """
+    if digest == index.current:
+        return []
+
+    names = [name for old_digest, name in index.history if old_digest == digest]
+    if not names:
+        raise ValueError("Local index is too old or unknown to the pdiff index")
+
+    if index.merged:
+        # Every merged patch leads straight to the current index.
+        return names[-1:]
+
+    start = next(i for i, (old, _) in enumerate(index.history) if old == digest)
+    return [name for _, name in index.history[start:]]
+
+
+def apply_ed_script(lines: list[bytes], script: bytes) -> None:
+    """Apply an ed script to lines of a file in place.
+
+    Lines keep their line endings. Scripts made by "diff --ed" list their
+    commands from the end of the file to the start, so line numbers of
+    a command are not shifted by the commands applied before it.
+
+    Raises
+    ------
+    ValueError
+        If the script contains an unsupported command.
+    """
+    script_lines = script.splitlines(keepends=True)
+    pos = 0
+
+    while pos < len(script_lines):
+        command = script_lines[pos].rstrip(b"\n")
+        pos += 1
+        if not command:
+            continue
+
+        match = ED_COMMAND.fullmatch(command)
+        if match is None:
+            raise ValueError(f"Unsupported ed command: {command!r}")
+
+        start = int(match[1])
+        end = int(match[2] or match[1])
+
+        text: list[bytes] = []
+        if match[3] in (b"a", b"c"):
+            while pos < len(script_lines) and script_lines[pos] != b".\n":
+                text.append(script_lines[pos])
+                pos += 1
+            pos += 1
+
+        if match[3] == b"a":
+            lines[start:start] = text
+        elif match[3] == b"c":
+            lines[start - 1 : end] = text
+        else:
+            del lines[start - 1 : end]
+
+
+def patch_index(
+    diff_url: str, index_path: Path, output_path: Path | None = None
+) -> bool:
+    """Bring a cached uncompressed index up to date with pdiff patches.
+
+    Only the patches between the cached and the current version are
+    downloaded. Every patch and the patched index are checked against
+    the hashes from the pdiff index before the patched index is written.
+
+    Parameters
+    ----------
+    diff_url : str
+        URL of the Packages.diff/Index file.
+    index_path : Path
+        Path to the cached uncompressed index.
+    output_path : Path | None
+        Path where the patched index is written. The cached index is
+        replaced if not given.
+
+    Returns
+    -------
+    bool
+        True if the index was patched, False if the cached one was already current.
+
+    Raises
+    ------
+    ValueError
+        If the cached index can't be patched or a hash doesn't match.
+        The cached index is left untouched.
+    OSError
+        If the pdiff index or a patch can't be downloaded.
+    """
+    index = parse_index(read_url(diff_url).decode("utf-8"))
+    names = patches_to_apply(index, hash_file(index_path))
+    if not names:
+        return False
+
+    base_url = diff_url.rpartition("/")[0]
+    lines = index_path.read_bytes().splitlines(keepends=True)
+
+    for name in names:
+        download_name, download_digest = index.downloads.get(name, (f"{name}.gz", ""))
+        compressed = read_url(f"{base_url}/{download_name}")
+        if (
+            download_digest
+            and hashlib.sha256(compressed).hexdigest() != download_digest
+        ):
+            raise ValueError(f"Hash mismatch of downloaded patch {download_name}")
+
+        try:
+            script = gzip.decompress(compressed)
+        except (OSError, EOFError, zlib.error) as e:
+            raise ValueError(f"Corrupted patch {download_name}") from e
+        if name in index.patches:
+            if hashlib.sha256(script).hexdigest() != index.patches[name]:
+                raise ValueError(f"Hash mismatch of patch {name}")
+
+        apply_ed_script(lines, script)
+
+    content = b"".join(lines)
+    if hashlib.sha256(content).hexdigest() != index.current:
+        raise ValueError(f"Hash mismatch of patched {index_path.name}")
+
+    output_path = output_path or index_path
+    part_path = output_path.with_name(f"{output_path.name}.part")
+    part_path.write_bytes(content)
+    replace(part_path, output_path)
+
+    logging.info("Applied %d patches to %s", len(names), index_path.name)
+    return True
+
+
+def store_index(extracted_path: Path, index_path: Path) -> None:
+    """Keep a copy of a freshly extracted index to be patched by later updates."""
+    part_path = index_path.with_name(f"{index_path.name}.part")
+    copyfile(extracted_path, part_path)
+    replace(part_path, index_path)
@@ -0,0 +1,126 @@
+import hashlib
+import xml.etree.ElementTree as ET
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import NamedTuple
+
+from depinspect.archives.cache import hash_file
+from depinspect.archives.stream import read_url
+
+REPO_NAMESPACE = {"repo": "http://linux.duke.edu/metadata/repo"}
+
+# Checksum types of repomd.xml mapped to names understood by hashlib.
+CHECKSUM_ALGORITHMS = {"sha": "sha1"}
+
+
+class Checksum(NamedTuple):
+    algorithm: str
+    value: str
+
+
+class PrimaryDb(NamedTuple):
+    """Location and checksums of a primary database listed in repomd.xml."""
+
+    url: str
+    checksum: Checksum
+    open_checksum: Checksum
+
+
+def read_checksum(element: ET.Element | None) -> Checksum:
+    """Read a checksum element and normalize its type to a hashlib name.
+
+    Raises
+    ------
+    ValueError
+        If the element is missing or empty.
+    """
+    if element is None or not element.text:
+        raise ValueError("repomd.xml entry has no checksum")
+
+    algorithm = element.get("type", "sha256")
+    return Checksum(
+        CHECKSUM_ALGORITHMS.get(algorithm, algorithm), element.text.strip().lower()
+    )
+
+
+def parse_repomd(content: bytes, base_url: str) -> PrimaryDb:
+    """Find the primary database in the contents of repomd.xml.
+
+    Parameters
+    ----------
+    content : bytes
+        Contents of repomd.xml.
+    base_url : str
+        Base URL of the repository, the location of the database is relative to it.
+
+    Returns
+    -------
+    PrimaryDb
+        Absolute URL and checksums of the compressed and the uncompressed database.
+
+    Raises
+    ------
+    ValueError
+        If the repository doesn't list a primary database.
+    """
+    root = ET.fromstring(content)
+
+    for data in root.findall("repo:data", REPO_NAMESPACE):
+        if data.get("type") != "primary_db":
+            continue
+
+        location = data.find("repo:location", REPO_NAMESPACE)
+        href = location.get("href") if location is not None else None
+        if not href:
+            raise ValueError("primary_db entry of repomd.xml has no location")
+
+        return PrimaryDb(
+            url=f"{base_url.rstrip('/')}/{href}",
+            checksum=read_checksum(data.find("repo:checksum", REPO_NAMESPACE)),
+            open_checksum=read_checksum(
+                data.find("repo:open-checksum", REPO_NAMESPACE)
+            ),
+        )
+
+    raise ValueError("repomd.xml doesn't list a primary_db")
+
+
+def resolve_primary_db(repomd_url: str) -> PrimaryDb:
+    """Download repomd.xml of a repository and find its primary database.
+
+    Raises
+    ------
+    ValueError
+        If repomd.xml is malformed or doesn't list a primary database.
+    OSError
+        If repomd.xml can't be downloaded.
+    """
+    base_url = repomd_url.removesuffix("repodata/repomd.xml")
+    try:
+        return parse_repomd(read_url(repomd_url), base_url)
+    except ET.ParseError as e:
+        raise ValueError(f"Malformed repomd.xml: {e}") from None
+
+
+def matches(file_path: Path, checksum: Checksum) -> bool:
+    """Check a file against a checksum from repomd.xml."""
+    return hash_file(file_path, checksum.algorithm) == checksum.value
+
+
+def verify_stream(
+    chunks: Iterable[bytes], checksum: Checksum, name: str
+) -> Iterator[bytes]:
+    """Pass a stream through and check it against a checksum from repomd.xml.
+
+    Raises
+    ------
+    ValueError
+        If the stream doesn't match, once its last chunk was consumed.
+    """
+    digest = hashlib.new(checksum.algorithm)
+    for chunk in chunks:
+        digest.update(chunk)
+        yield chunk
+
+    if digest.hexdigest() != checksum.value:
+        raise ValueError(f"{name} doesn't match the checksum from repomd.xml")
@@ -0,0 +1,103 @@
+import bz2
+import lzma
+from collections.abc import Iterable, Iterator
+from urllib import request
+
+CHUNK_SIZE = 64 * 1024
+
+DECOMPRESSORS = {
+    "xz": lzma.LZMADecompressor,
+    "bz2": bz2.BZ2Decompressor,
+}
+
+
+def stream_from_url(target_url: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield the body of a response in chunks of at most chunk_size bytes.
+
+    Raises
+    ------
+    ValueError
+        If the target URL does not start with "http".
+    """
+    if target_url.lower().startswith("http"):
+        req = request.Request(target_url)
+    else:
+        raise ValueError from None
+
+    with request.urlopen(req, timeout=15.0) as response:
+        while chunk := response.read(chunk_size):
+            yield chunk
+
+
+def read_url(target_url: str) -> bytes:
+    """Download a small file into memory."""
+    return b"".join(stream_from_url(target_url))
+
+
+def decompress_stream(
+    chunks: Iterable[bytes], archive_ext: str, chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Incrementally decompress a stream of compressed chunks.
+
+    Parameters
+    ----------
+    chunks : Iterable[bytes]
+        Compressed data.
+    archive_ext : str
+        Archive format, either "xz" or "bz2".
+    chunk_size : int
+        Maximum size of a single decompressed chunk.
+
+    Returns
+    -------
+    Iterator[bytes]
+        Decompressed data in chunks of at most chunk_size bytes.
+
+    Raises
+    ------
+    ValueError
+        If the archive format is not supported.
+    EOFError
+        If the compressed stream ends unexpectedly.
+    """
+    try:
+        decompressor_class = DECOMPRESSORS[archive_ext]
+    except KeyError:
+        raise ValueError(f"Unsupported archive format: {archive_ext}") from None
+
+    decompressor = decompressor_class()
+
+    for chunk in chunks:
+        data = chunk
+        while True:
+            # Concatenated streams are decompressed one after another.
+            if decompressor.eof:
+                data = decompressor.unused_data + data
+                if not data:
+                    break
+                decompressor = decompressor_class()
+
+            output = decompressor.decompress(data, max_length=chunk_size)
+            data = b""
+            if output:
+                yield output
+
+            if decompressor.needs_input:
+                break
+
+    if not decompressor.eof:
+        raise EOFError("Compressed stream ended before the end-of-stream marker.")
+
+
+def iter_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Split a stream of UTF-8 encoded chunks into lines without line endings."""
+    remainder = b""
+
+    for chunk in chunks:
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            yield line.decode("utf-8")
+
+    if remainder:
+        yield remainder.decode("utf-8")
@@ -1,21 +1,25 @@
 import logging
-from pathlib import Path
+from collections.abc import Iterable
 from shutil import rmtree
 from typing import Any
 
 import click
 
 from depinspect import printer, validator
+from depinspect.archives.fetcher import MAX_PER_HOST, MAX_WORKERS
 from depinspect.constants import (
     ARCHITECTURES,
+    CACHE_DIR,
     DATABASE_DIR,
-    DB_SUFFIX,
     DISTRIBUTIONS,
     PYPROJECT_TOML,
     ROOT_DIR,
 )
+from depinspect.database import catalog, generation
+from depinspect.database.connection import readers
 from depinspect.distributions.mapping import distro_class_mapping
 from depinspect.helper import create_temp_dir
+from depinspect.planner import EXTRACT_WORKERS, run_update
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,8 +29,9 @@ logging.basicConfig(
 
 
 @click.group()
-def depinspect() -> None:
-    pass
+@click.pass_context
+def depinspect(ctx: click.Context) -> None:
+    ctx.call_on_close(readers.close)
 
 
 @depinspect.command(context_settings={"ignore_unknown_options": True})
@@ -44,10 +49,18 @@ def list_all(ctx: click.Context, distro: str) -> None:
 
     Example: depinspect list-all --distro=fedora
     """
+    distro_class = distro_class_mapping[distro]
 
-    architectures = distro_class_mapping[distro].get_all_archs()
+    packages: Iterable[str]
+    architectures = distro_class.get_all_archs()
 
-    packages = distro_class_mapping[distro].get_stored_packages()
+    # The catalog lists names in order as they are read, so printing
+    # starts without waiting for every stored package.
+    if catalog.is_built(DATABASE_DIR, distro):
+        architectures = architectures & catalog.stored_archs(DATABASE_DIR, distro)
+        packages = catalog.iter_names(DATABASE_DIR, distro, architectures)
+    else:
+        packages = sorted(distro_class.get_stored_packages())
 
     printer.list_all(distro, architectures, packages)
 
@@ -55,27 +68,91 @@ def list_all(ctx: click.Context, distro: str) -> None:
 
 
 @depinspect.command(context_settings={"ignore_unknown_options": True})
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help="Stream sources straight into databases without intermediate files.",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Apply only changed packages to existing databases.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=EXTRACT_WORKERS,
+    show_default=True,
+    help="Number of processes extracting and parsing archives.",
+)
 @click.pass_context
-def update(ctx: click.Context) -> None:
+def update(ctx: click.Context, stream: bool, incremental: bool, jobs: int) -> None:
     """Update metadata stored in databases."""
     config = PYPROJECT_TOML.get("tool", {}).get("depinspect", {}).get("archives", {})
 
     tmp_dir = create_temp_dir(dir_prefix=".tmp", output_path=ROOT_DIR)
 
     try:
-        for distribution in DISTRIBUTIONS:
-            Path.mkdir(tmp_dir / distribution)
-
-            if not Path(DATABASE_DIR / distribution).exists():
-                Path.mkdir(DATABASE_DIR / distribution)
-
-            distro_class_mapping[distribution].init(
-                tmp_dir / distribution, config, DB_SUFFIX, DATABASE_DIR / distribution
-            )
+        results = run_update(
+            config,
+            tmp_dir,
+            CACHE_DIR,
+            DATABASE_DIR,
+            MAX_WORKERS,
+            MAX_PER_HOST,
+            extract_workers=jobs,
+            stream=stream,
+            incremental=incremental,
+        )
     finally:
         logging.info("Cleaning up.")
         rmtree(tmp_dir, ignore_errors=True)
 
+    catalog.sync(
+        DATABASE_DIR,
+        [
+            db_path
+            for db_path, result in results.items()
+            if not isinstance(result, Exception)
+        ],
+    )
+
+    printer.update_summary(results)
+
+    ctx.exit(0)
+
+
+@depinspect.command(
+    context_settings={"ignore_unknown_options": True},
+    short_help=("Restore databases replaced by the last update."),
+)
+@click.option(
+    "--distro",
+    type=click.Choice(sorted(DISTRIBUTIONS), case_sensitive=False),
+    nargs=1,
+    required=True,
+)
+@click.pass_context
+def rollback(ctx: click.Context, distro: str) -> None:
+    """Restore the previous generation of databases for a given distro.
+
+    Every update keeps the databases it replaces. Rolling back puts them
+    back in place and discards the current ones.
+
+    Example: depinspect rollback --distro=ubuntu
+    """
+    db_paths = generation.with_previous(DATABASE_DIR / distro)
+
+    for db_path in db_paths:
+        generation.rollback(db_path)
+
+    catalog.sync(DATABASE_DIR, db_paths)
+
+    printer.rollback(distro, db_paths)
+
     ctx.exit(0)
 
 
@@ -90,8 +167,13 @@ def update(ctx: click.Context) -> None:
     type=(str, str, str),
     callback=validator.validate_diff_args,
 )
+@click.option(
+    "--ignore-versions",
+    is_flag=True,
+    help="Compare dependencies by name, ignoring required versions.",
+)
 @click.pass_context
-def diff(ctx: click.Context, args: tuple[Any, ...]) -> None:
+def diff(ctx: click.Context, args: tuple[Any, ...], ignore_versions: bool) -> None:
     """Find a difference and similarities in dependencies of two packages.
 
     This command requires two sets of arguments each under -p to be specified.
@@ -104,10 +186,10 @@ def diff(ctx: click.Context, args: tuple[Any, ...]) -> None:
     distro_b, arch_b, name_b = arg_info_b
 
     distro_class_a = distro_class_mapping[distro_a]
-    depends_a = distro_class_a.get_dependencies(arch_a, name_a)
+    depends_a = distro_class_a.get_dependencies(arch_a, name_a, not ignore_versions)
 
     distro_class_b = distro_class_mapping[distro_b]
-    depends_b = distro_class_b.get_dependencies(arch_b, name_b)
+    depends_b = distro_class_b.get_dependencies(arch_b, name_b, not ignore_versions)
 
     printer.diff(
         distro_a, arch_a, name_a, depends_a, distro_b, arch_b, name_b, depends_b
@@ -116,6 +198,35 @@ def diff(ctx: click.Context, args: tuple[Any, ...]) -> None:
     ctx.exit(0)
 
 
+@depinspect.command(
+    context_settings={"ignore_unknown_options": True},
+    short_help=("Show the description of a package."),
+)
+@click.option(
+    "-p",
+    "args",
+    required=True,
+    type=(str, str, str),
+    callback=validator.validate_info_args,
+)
+@click.pass_context
+def info(ctx: click.Context, args: tuple[str, str, str]) -> None:
+    """Display the description of every stored version of a package.
+
+    Descriptions are kept apart from the dependency data and are only
+    read by this command.
+
+    Example: depinspect info -p ubuntu amd64 apt
+    """
+    distro, arch, name = args
+
+    descriptions = distro_class_mapping[distro].get_descriptions(arch, name)
+
+    printer.info(distro, arch, name, descriptions)
+
+    ctx.exit(0)
+
+
 @depinspect.command(
     context_settings={"ignore_unknown_options": True},
     short_help=("List all packages that have divergent dependencies."),
@@ -133,8 +244,15 @@ def diff(ctx: click.Context, args: tuple[Any, ...]) -> None:
     nargs=2,
     required=True,
 )
+@click.option(
+    "--ignore-versions",
+    is_flag=True,
+    help="Compare dependencies by name, ignoring required versions.",
+)
 @click.pass_context
-def find_divergent(ctx: click.Context, distro: str, archs: tuple[str, str]) -> None:
+def find_divergent(
+    ctx: click.Context, distro: str, archs: tuple[str, str], ignore_versions: bool
+) -> None:
     """Display all divergent packages from a given distribution and two architectures.
 
     This command requires distribution and two architectures to be specified.
@@ -154,7 +272,7 @@ def find_divergent(ctx: click.Context, distro: str, archs: tuple[str, str]) -> N
             f"Specified architectures are not present in {distro}\n", ctx=ctx
         )
 
-    divergent = distro_class.get_divergent(arch_a, arch_b)
+    divergent = distro_class.get_divergent(arch_a, arch_b, not ignore_versions)
 
     printer.divergent(distro, arch_a, arch_b, divergent)
 
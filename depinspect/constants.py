@@ -4,8 +4,14 @@ ROOT_DIR = get_project_root()
 
 PYPROJECT_TOML = parse_pyproject(ROOT_DIR / "pyproject.toml")
 
+SETTINGS = PYPROJECT_TOML.get("tool", {}).get("depinspect", {})
+
+FETCHER_SETTINGS = SETTINGS.get("fetcher", {})
+
 DATABASE_DIR = ROOT_DIR / "depinspect" / "database"
 
+CACHE_DIR = ROOT_DIR / "depinspect" / "archives" / "cache"
+
 DB_SUFFIX = ".sqlite"
 
 DISTRIBUTIONS = {"ubuntu", "fedora"}
@@ -0,0 +1,142 @@
+import logging
+import sqlite3
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from depinspect.constants import DB_SUFFIX, DISTRIBUTIONS
+from depinspect.database.connection import CACHE_SIZE, readers
+from depinspect.files import list_files_in_directory
+
+CATALOG_NAME = f"catalog{DB_SUFFIX}"
+
+# Every stored package name of every database. The primary key lists the
+# names of a distribution in order. The indexes find the rows of one
+# database when it is rebuilt and the architectures of a distribution.
+CATALOG_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS catalog
+        (  distro TEXT,  release TEXT,  arch TEXT,  name TEXT,  db TEXT,
+           PRIMARY KEY (distro, name, arch, release, db)  ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS catalogdb ON catalog (db);
+    CREATE INDEX IF NOT EXISTS catalogarch ON catalog (distro, arch);
+"""
+
+
+def catalog_path(database_dir: Path) -> Path:
+    return database_dir / CATALOG_NAME
+
+
+def refresh(db_con: sqlite3.Connection, db_path: Path, distro: str) -> None:
+    """Replace the catalog rows of a database with its current packages.
+
+    Database names start with the distribution and the release,
+    e.g. "ubuntu_jammy.sqlite" or "fedora_f39_koji_riscv64.sqlite".
+    """
+    release = db_path.stem.split("_")[1]
+
+    db_con.execute("ATTACH DATABASE ? AS source", (f"file:{db_path}?mode=ro",))
+    try:
+        with db_con:
+            db_con.execute("DELETE FROM catalog WHERE db = ?", (db_path.name,))
+            db_con.execute(
+                """
+                INSERT OR IGNORE INTO catalog (distro, release, arch, name, db)
+                SELECT DISTINCT ?, ?, arch, name, ? FROM source.packages
+                ORDER BY name, arch
+                """,
+                (distro, release, db_path.name),
+            )
+    finally:
+        db_con.execute("DETACH DATABASE source")
+
+
+def sync(database_dir: Path, changed: Iterable[Path] = ()) -> None:
+    """Bring the catalog up to date with the stored databases.
+
+    Changed databases and databases missing from the catalog are read
+    again, rows of databases that no longer exist are dropped.
+
+    Parameters
+    ----------
+    database_dir : Path
+        Directory with a subdirectory of databases for each distribution.
+    changed : Iterable[Path]
+        Databases that were rebuilt or rolled back since the last sync.
+    """
+    changed_names = {db_path.name for db_path in changed}
+
+    db_con = sqlite3.connect(catalog_path(database_dir), uri=True)
+    try:
+        db_con.execute(f"PRAGMA cache_size = -{CACHE_SIZE}")
+        db_con.executescript(CATALOG_SCHEMA)
+        known = {db for (db,) in db_con.execute("SELECT DISTINCT db FROM catalog")}
+
+        stored: set[str] = set()
+        for distro in sorted(DISTRIBUTIONS):
+            if not (database_dir / distro).is_dir():
+                continue
+            for db_path in list_files_in_directory(database_dir / distro):
+                if db_path.suffix != DB_SUFFIX:
+                    continue
+                stored.add(db_path.name)
+                if db_path.name in changed_names or db_path.name not in known:
+                    logging.info("Cataloging %s.", db_path.name)
+                    refresh(db_con, db_path, distro)
+
+        with db_con:
+            db_con.executemany(
+                "DELETE FROM catalog WHERE db = ?",
+                [(db,) for db in known - stored],
+            )
+    finally:
+        db_con.close()
+
+
+def is_built(database_dir: Path, distro: str) -> bool:
+    """Check if the catalog lists any package of a distribution."""
+    path = catalog_path(database_dir)
+    if not path.is_file():
+        return False
+
+    db_con = readers.get(path)
+    if "catalog" not in db_con.tables:
+        return False
+
+    res = db_con.execute("SELECT 1 FROM catalog WHERE distro = ? LIMIT 1", (distro,))
+    return res.fetchone() is not None
+
+
+def iter_names(database_dir: Path, distro: str, archs: set[str]) -> Iterator[str]:
+    """Iterate over distinct stored package names of a distribution in order.
+
+    Only packages of the given architectures are listed. Names are read
+    along the primary key, so the first ones are available right away.
+    """
+    db_con = readers.get(catalog_path(database_dir))
+    placeholders = ", ".join("?" * len(archs))
+    for (name,) in db_con.execute(
+        f"""SELECT DISTINCT name FROM catalog
+        WHERE distro = ? AND arch IN ({placeholders}) ORDER BY name""",
+        (distro, *sorted(archs)),
+    ):
+        yield name
+
+
+def stored_archs(database_dir: Path, distro: str) -> set[str]:
+    """Get the architectures of stored packages of a distribution."""
+    db_con = readers.get(catalog_path(database_dir))
+    return {
+        arch
+        for (arch,) in db_con.execute(
+            "SELECT DISTINCT arch FROM catalog WHERE distro = ?", (distro,)
+        )
+    }
+
+
+def is_stored(database_dir: Path, distro: str, arch: str, name: str) -> bool:
+    """Check if the catalog lists a package of a distribution and architecture."""
+    db_con = readers.get(catalog_path(database_dir))
+    res = db_con.execute(
+        "SELECT 1 FROM catalog WHERE distro = ? AND name = ? AND arch = ? LIMIT 1",
+        (distro, name, arch),
+    )
+    return res.fetchone() is not None
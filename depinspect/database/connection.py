@@ -0,0 +1,133 @@
+import logging
+import sqlite3
+from pathlib import Path
+from types import TracebackType
+
+from depinspect.constants import SETTINGS
+
+READER_SETTINGS = SETTINGS.get("reader", {})
+
+# Bytes of a database file mapped into memory by a read-only connection.
+MMAP_SIZE: int = READER_SETTINGS.get("mmap_size", 256 * 2**20)
+
+# KiB of SQLite page cache of a read-only connection.
+CACHE_SIZE: int = READER_SETTINGS.get("cache_size", 16 * 1024)
+
+# Prepared statements kept by every connection. Queries are formatted the
+# same way on every call, so repeated lookups skip compiling the SQL.
+STATEMENT_CACHE: int = READER_SETTINGS.get("statement_cache", 128)
+
+
+class ReaderConnection(sqlite3.Connection):
+    """Read-only connection that knows the tables of its database.
+
+    Read-only databases don't change their schema, so the tables are
+    read once when the connection is opened.
+    """
+
+    tables: frozenset[str] = frozenset()
+
+
+def open_reader(db_path: Path) -> ReaderConnection:
+    """Open a read-only connection to a database tuned for lookups.
+
+    Parameters
+    ----------
+    db_path : Path
+        Path to the database.
+
+    Returns
+    -------
+    ReaderConnection
+        Connection returning sqlite3.Row rows.
+    """
+    db_con = sqlite3.connect(
+        f"file:{db_path}?mode=ro",
+        uri=True,
+        cached_statements=STATEMENT_CACHE,
+        factory=ReaderConnection,
+    )
+    db_con.row_factory = sqlite3.Row
+    db_con.executescript(
+        f"""
+        PRAGMA query_only = ON;
+        PRAGMA mmap_size = {MMAP_SIZE};
+        PRAGMA cache_size = -{CACHE_SIZE};
+        """
+    )
+    db_con.tables = frozenset(
+        name
+        for (name,) in db_con.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    )
+    return db_con
+
+
+def is_open(db_con: sqlite3.Connection) -> bool:
+    try:
+        db_con.total_changes
+    except sqlite3.ProgrammingError:
+        return False
+    return True
+
+
+class Readers:
+    """Read-only connections to databases, kept open and keyed by path.
+
+    A connection is opened on the first request for a database and handed
+    out again by later requests. It is reopened when the database file was
+    replaced, e.g. by a new generation, or when it was closed. Leaving a
+    with block closes every connection.
+    """
+
+    def __init__(self) -> None:
+        self.connections: dict[Path, tuple[ReaderConnection, int]] = {}
+
+    def get(self, db_path: Path) -> ReaderConnection:
+        """Get the open read-only connection to a database.
+
+        Parameters
+        ----------
+        db_path : Path
+            Path to the database.
+
+        Returns
+        -------
+        ReaderConnection
+            Connection shared by every caller that reads the database.
+        """
+        inode = db_path.stat().st_ino
+        db_con, opened_inode = self.connections.get(db_path, (None, None))
+
+        if db_con is not None and opened_inode == inode and is_open(db_con):
+            return db_con
+
+        if db_con is not None:
+            db_con.close()
+
+        logging.debug("Opening a read-only connection to %s.", db_path.name)
+        db_con = open_reader(db_path)
+        self.connections[db_path] = (db_con, inode)
+        return db_con
+
+    def close(self) -> None:
+        """Close every connection."""
+        for db_con, _ in self.connections.values():
+            db_con.close()
+        self.connections.clear()
+
+    def __enter__(self) -> "Readers":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+# Connections shared by the lookups of distribution classes in a process.
+readers = Readers()
@@ -1,9 +1,33 @@
 import logging
 import sqlite3
+from collections.abc import Iterator
 from pathlib import Path
 
+# Stored in PRAGMA user_version. Bumped whenever the layout of the tables
+# changes, so databases of an older layout are rebuilt instead of updated.
+SCHEMA_VERSION = 4
 
-def init(db_name: str, output_path: Path) -> Path:
+# Relation tables share one layout. Every entry of a relation field is
+# stored as one row per alternative: grp is the position of the entry
+# within the field and alt the position of the alternative within the entry.
+# Rows are clustered by package, so the relations of a package are read
+# with a single range scan and need no separate index.
+RELATION_COLUMNS = """
+    (  pkgKey INTEGER,  grp INTEGER,  alt INTEGER,
+       nameKey INTEGER REFERENCES names (nameKey),
+       archq TEXT,  op TEXT,  version TEXT,  arches TEXT,  profiles TEXT,
+       PRIMARY KEY (pkgKey, grp, alt)  ) WITHOUT ROWID
+"""
+
+INDEXES = """
+    CREATE INDEX IF NOT EXISTS packagename ON packages (name);
+    CREATE INDEX IF NOT EXISTS packageId ON packages (pkgId);
+    CREATE INDEX IF NOT EXISTS dependsname ON depends (nameKey);
+    CREATE INDEX IF NOT EXISTS providesname ON provides (nameKey);
+"""
+
+
+def init(db_name: str, output_path: Path, indexes: bool = True) -> Path:
     """Initialize a SQLite database for package metadata.
 
     Parameters
@@ -12,6 +36,9 @@ def init(db_name: str, output_path: Path) -> Path:
         Name of the SQLite database.
     output_path : Path
         Path to the directory where the database will be created.
+    indexes : bool
+        Create secondary indexes right away. Bulk loads pass False
+        and call create_indexes once the data is in.
 
     Returns
     -------
@@ -24,9 +51,11 @@ def init(db_name: str, output_path: Path) -> Path:
     con = sqlite3.connect(db_path)
 
     con.executescript(
-        """
+        f"""
         BEGIN;
+        DROP TABLE IF EXISTS names;
         DROP TABLE IF EXISTS packages;
+        DROP TABLE IF EXISTS descriptions;
         DROP TABLE IF EXISTS depends;
         DROP TABLE IF EXISTS recommends;
         DROP TABLE IF EXISTS suggests;
@@ -34,40 +63,23 @@ def init(db_name: str, output_path: Path) -> Path:
         DROP TABLE IF EXISTS breaks;
         DROP TABLE IF EXISTS conflicts;
         DROP TABLE IF EXISTS provides;
+        CREATE TABLE names
+            (  nameKey INTEGER PRIMARY KEY,  name TEXT NOT NULL UNIQUE  );
         CREATE TABLE packages
             (  pkgKey INTEGER PRIMARY KEY,  pkgId TEXT,  name TEXT, arch TEXT,
-                version TEXT,  release TEXT,  description TEXT  );
-        CREATE TABLE depends
-            (  name TEXT,  version TEXT,  release TEXT,
-               pkgKey INTEGER , pre BOOLEAN DEFAULT FALSE  );
-        CREATE TABLE recommends
-            (  name TEXT,  version TEXT,  release TEXT,
-               pkgKey INTEGER  );
-        CREATE TABLE suggests
-            (  name TEXT,  version TEXT,  release TEXT,
-               pkgKey INTEGER  );
-        CREATE TABLE enhances
-            (  name TEXT,  version TEXT,  release TEXT,
-               pkgKey INTEGER  );
-        CREATE TABLE breaks
-            (  name TEXT,  version TEXT,  release TEXT,
-               pkgKey INTEGER  );
-        CREATE TABLE conflicts
-            (  name TEXT,  version TEXT,  release TEXT,
-               pkgKey INTEGER  );
-        CREATE TABLE provides
-            (  name TEXT,  version TEXT,  release TEXT,
-               pkgKey INTEGER  );
-        CREATE INDEX packagename ON packages (name);
-        CREATE INDEX packageId ON packages (pkgId);
-        CREATE INDEX pkgdepends on depends (pkgKey);
-        CREATE INDEX dependsname ON depends (name);
-        CREATE INDEX pkgprovides on provides (pkgKey);
-        CREATE INDEX providesname ON provides (name);
-        CREATE INDEX pkgconflicts on conflicts (pkgKey);
-        CREATE INDEX pkgsuggests on suggests (pkgKey);
-        CREATE INDEX pkgenhances on enhances (pkgKey);
-        CREATE INDEX pkgrecommends on recommends (pkgKey);
+                version TEXT,  release TEXT,  hash TEXT,
+                UNIQUE (name, arch, version, release)  );
+        CREATE TABLE descriptions
+            (  pkgKey INTEGER PRIMARY KEY,  description TEXT  );
+        CREATE TABLE depends {RELATION_COLUMNS};
+        CREATE TABLE recommends {RELATION_COLUMNS};
+        CREATE TABLE suggests {RELATION_COLUMNS};
+        CREATE TABLE enhances {RELATION_COLUMNS};
+        CREATE TABLE breaks {RELATION_COLUMNS};
+        CREATE TABLE conflicts {RELATION_COLUMNS};
+        CREATE TABLE provides {RELATION_COLUMNS};
+        PRAGMA user_version = {SCHEMA_VERSION};
+        {INDEXES if indexes else ""}
         COMMIT;
         """
     )
@@ -77,6 +89,34 @@ def init(db_name: str, output_path: Path) -> Path:
     return db_path
 
 
+def create_indexes(db_path: Path) -> None:
+    """Create secondary indexes of a database after it has been loaded.
+
+    Building an index over the loaded rows in one pass is much cheaper
+    than updating it on every insert.
+    """
+    con = sqlite3.connect(db_path)
+    con.executescript(f"BEGIN; {INDEXES} COMMIT;")
+    con.close()
+    logging.info("Created indexes of %s", db_path.name)
+
+
+def schema_version(db_path: Path) -> int:
+    """Get the schema version a database was initialized with."""
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    (version,) = con.execute("PRAGMA user_version").fetchone()
+    con.close()
+    return int(version)
+
+
+def count_packages(db_path: Path) -> int:
+    """Count the packages stored in a database."""
+    con = sqlite3.connect(db_path)
+    (count,) = con.execute("SELECT COUNT(*) FROM packages").fetchone()
+    con.close()
+    return int(count)
+
+
 def find_dependencies(
     db_con: sqlite3.Connection, table: str, arch: str, name: str
 ) -> set[str]:
@@ -105,10 +145,7 @@ def find_dependencies(
     """
     from depinspect.validator import is_valid_sql_table
 
-    db_con.row_factory = sqlite3.Row
-
     if not is_valid_sql_table(db_con, table):
-        db_con.close()
         logging.exception("%s is not a correct sqlite table name.", table)
         raise ValueError
 
@@ -122,7 +159,389 @@ def find_dependencies(
         (name, arch),
     ).fetchall()
 
-    return {elem["name"] for elem in res}
+    return {dep for (dep,) in res}
+
+
+def alternative_sql(table: str, versions: bool) -> str:
+    """SQL expression that formats an alternative of a relation table row
+    like Relation.__str__, with or without its version constraint.
+    """
+    constraint = "|| COALESCE(' (' || {0}.op || ' ' || {0}.version || ')', '')"
+
+    return """names.name
+        || COALESCE(':' || {0}.archq, '')
+        {1}
+        || COALESCE(' [' || {0}.arches || ']', '')
+        || COALESCE(' ' || {0}.profiles, '')""".format(
+        table, constraint.format(table) if versions else ""
+    )
+
+
+def find_relations(
+    db_con: sqlite3.Connection,
+    table: str,
+    arch: str,
+    name: str,
+    versions: bool = True,
+) -> set[str]:
+    """Find relations of a package in a normalized SQLite database.
+
+    Entries are put back together from their parsed alternatives in
+    a normalized form, e.g. "libc6 (>= 2.34) | libc6.1".
+
+    Parameters
+    ----------
+    db_con : sqlite3.Connection
+        SQLite database connection.
+    table : str
+        Name of the relation table in the database.
+    arch : str
+        Architecture to search for in the 'packages' table.
+    name : str
+        Package name to search for in the 'packages' table.
+    versions : bool
+        Include version constraints. Without them, entries that differ
+        only in the required version are the same.
+
+    Returns
+    -------
+    set[str]
+        Set of relation entries of the specified package.
+
+    Raises
+    ------
+    ValueError
+        If the provided table name is not a valid SQLite table.
+    """
+    from depinspect.validator import is_valid_sql_table
+
+    if not is_valid_sql_table(db_con, table):
+        logging.exception("%s is not a correct sqlite table name.", table)
+        raise ValueError
+
+    # Alternatives are joined in Python, where their order is guaranteed
+    # by the primary key of the table. Every entry starts with alt 0.
+    rows = db_con.execute(
+        """
+        SELECT {0}.alt, {1}
+        FROM {0} JOIN names ON names.nameKey = {0}.nameKey
+        WHERE {0}.pkgKey IN
+            (SELECT pkgKey FROM packages WHERE name = ? AND arch = ?)
+        ORDER BY {0}.pkgKey, {0}.grp, {0}.alt
+        """.format(
+            table, alternative_sql(table, versions)
+        ),
+        (name, arch),
+    )
+
+    entries: list[str] = []
+    for alt, text in rows:
+        if alt:
+            entries[-1] += f" | {text}"
+        else:
+            entries.append(text)
+    return set(entries)
+
+
+def find_divergent(
+    db_con: sqlite3.Connection,
+    table: str,
+    arch_a: str,
+    arch_b: str,
+    versions: bool = True,
+) -> set[str]:
+    """Find packages whose relations differ between two architectures.
+
+    The relation entries of every package are compared as sets, like the
+    results of find_relations, in a single query over both architectures
+    instead of two lookups per package.
+    A package counts as divergent when an entry is present for only one of
+    them, also when the package itself is stored for one architecture only.
+
+    Parameters
+    ----------
+    db_con : sqlite3.Connection
+        SQLite database connection.
+    table : str
+        Name of the relation table in the database.
+    arch_a : str
+        The first architecture to compare.
+    arch_b : str
+        The second architecture to compare.
+    versions : bool
+        Include version constraints. Without them, entries that differ
+        only in the required version are the same.
+
+    Returns
+    -------
+    set[str]
+        Set of names of packages with divergent relations.
+
+    Raises
+    ------
+    ValueError
+        If the provided table name is not a valid SQLite table.
+    """
+    from depinspect.validator import is_valid_sql_table
+
+    if not is_valid_sql_table(db_con, table):
+        logging.exception("%s is not a correct sqlite table name.", table)
+        raise ValueError
+
+    if arch_a == arch_b:
+        return set()
+
+    columns = ["nameKey", "archq", "op", "version", "arches", "profiles"]
+    if not versions:
+        columns.remove("op")
+        columns.remove("version")
+    same = " AND ".join(f"b.{column} IS a.{column}" for column in columns)
+
+    # Packages whose relations are stored in the same order for both
+    # architectures are identical and are ruled out by comparing rows at the
+    # same position, without building any text. Only the remaining candidates,
+    # stored for one architecture only, with several versions or with entries
+    # in a different order, are compared as sets of formatted entries.
+    # An aggregate over an ordered subquery reads it in order, so group_concat
+    # joins the alternatives of an entry in the order of the primary key.
+    # Entries are made distinct per architecture, after which an entry that
+    # is counted once belongs to one architecture only.
+    res = db_con.execute(
+        """
+        WITH pairs AS (
+            SELECT pkg_a.name, pkg_a.pkgKey AS key_a, pkg_b.pkgKey AS key_b
+            FROM packages AS pkg_a LEFT JOIN packages AS pkg_b
+                ON pkg_b.name = pkg_a.name AND pkg_b.arch = ?2
+            WHERE pkg_a.arch = ?1
+            UNION ALL
+            SELECT name, NULL, pkgKey FROM packages
+            WHERE arch = ?2 AND name NOT IN
+                (SELECT name FROM packages WHERE arch = ?1)
+        ),
+        candidates AS (
+            SELECT pairs.name FROM pairs
+            JOIN {0} AS a ON a.pkgKey = pairs.key_a
+            LEFT JOIN {0} AS b
+                ON b.pkgKey = pairs.key_b AND b.grp = a.grp AND b.alt = a.alt
+            WHERE NOT ({2})
+            UNION
+            SELECT pairs.name FROM pairs
+            JOIN {0} AS b ON b.pkgKey = pairs.key_b
+            LEFT JOIN {0} AS a
+                ON a.pkgKey = pairs.key_a AND a.grp = b.grp AND a.alt = b.alt
+            WHERE a.pkgKey IS NULL
+        ),
+        alternatives AS (
+            SELECT packages.name AS pkg, packages.arch AS arch,
+                {0}.pkgKey, {0}.grp, {1} AS text
+            FROM packages
+            JOIN {0} ON {0}.pkgKey = packages.pkgKey
+            JOIN names ON names.nameKey = {0}.nameKey
+            WHERE packages.arch IN (?1, ?2)
+                AND packages.name IN (SELECT name FROM candidates)
+            ORDER BY {0}.pkgKey, {0}.grp, {0}.alt
+        ),
+        entries AS (
+            SELECT DISTINCT pkg, arch, group_concat(text, ' | ') AS entry
+            FROM alternatives GROUP BY pkgKey, grp
+        )
+        SELECT DISTINCT pkg FROM entries GROUP BY pkg, entry HAVING COUNT(*) = 1
+        """.format(
+            table, alternative_sql(table, versions), same
+        ),
+        (arch_a, arch_b),
+    )
+
+    return {pkg for (pkg,) in res}
+
+
+def iter_grouped_dependencies(
+    db_con: sqlite3.Connection, table: str, arch: str
+) -> Iterator[tuple[str, str]]:
+    """Iterate over packages of an architecture in the order of their names,
+    with the names of their dependencies joined by newlines.
+
+    Dependencies of every version of a package are joined together.
+    Packages without dependencies are left out. Rows are grouped along the
+    index on package names, so no sorting is needed.
+    """
+    return db_con.execute(
+        """
+        SELECT packages.name, group_concat({0}.name, char(10)) FROM packages
+        JOIN {0} ON {0}.pkgKey = packages.pkgKey
+        WHERE packages.arch = ?
+        GROUP BY packages.name
+        ORDER BY packages.name
+        """.format(
+            table
+        ),
+        (arch,),
+    )
+
+
+def find_divergent_between(
+    db_con_a: sqlite3.Connection,
+    db_con_b: sqlite3.Connection,
+    table: str,
+    arch_a: str,
+    arch_b: str,
+) -> set[str]:
+    """Find packages whose dependencies differ between two databases.
+
+    The dependency names of every package, like the results of
+    find_dependencies, are compared as sets. Both databases are read once,
+    sorted by package name, and the two streams are merged.
+
+    Parameters
+    ----------
+    db_con_a : sqlite3.Connection
+        SQLite database connection searched for the first architecture.
+    db_con_b : sqlite3.Connection
+        SQLite database connection searched for the second architecture.
+    table : str
+        Name of the dependency table in both databases.
+    arch_a : str
+        The first architecture to compare.
+    arch_b : str
+        The second architecture to compare.
+
+    Returns
+    -------
+    set[str]
+        Set of names of packages with divergent dependencies.
+
+    Raises
+    ------
+    ValueError
+        If the provided table name is not a valid SQLite table.
+    """
+    from depinspect.validator import is_valid_sql_table
+
+    for db_con in (db_con_a, db_con_b):
+        if not is_valid_sql_table(db_con, table):
+            logging.exception("%s is not a correct sqlite table name.", table)
+            raise ValueError
+
+    res: set[str] = set()
+
+    rows_a = iter_grouped_dependencies(db_con_a, table, arch_a)
+    rows_b = iter_grouped_dependencies(db_con_b, table, arch_b)
+    row_a = next(rows_a, None)
+    row_b = next(rows_b, None)
+
+    # A package found on one side only has dependencies on that side alone.
+    # Dependencies are listed in the order they are stored, so lists
+    # that differ are compared again as sets.
+    while row_a is not None and row_b is not None:
+        if row_a[0] < row_b[0]:
+            res.add(row_a[0])
+            row_a = next(rows_a, None)
+        elif row_b[0] < row_a[0]:
+            res.add(row_b[0])
+            row_b = next(rows_b, None)
+        else:
+            if row_a[1] != row_b[1] and set(row_a[1].split("\n")) != set(
+                row_b[1].split("\n")
+            ):
+                res.add(row_a[0])
+            row_a = next(rows_a, None)
+            row_b = next(rows_b, None)
+
+    for row in (row_a, row_b):
+        if row is not None:
+            res.add(row[0])
+    res.update(name for name, _ in rows_a)
+    res.update(name for name, _ in rows_b)
+
+    return res
+
+
+def find_dependents(
+    db_con: sqlite3.Connection, table: str, arch: str, name: str
+) -> set[str]:
+    """Find packages that have a relation to a given package name.
+
+    Any alternative of an entry counts. The name is looked up exactly
+    through the indexed names table.
+
+    Parameters
+    ----------
+    db_con : sqlite3.Connection
+        SQLite database connection.
+    table : str
+        Name of the relation table in the database.
+    arch : str
+        Architecture of the packages to search for.
+    name : str
+        Name of the package that is related to.
+
+    Returns
+    -------
+    set[str]
+        Set of names of the related packages.
+
+    Raises
+    ------
+    ValueError
+        If the provided table name is not a valid SQLite table.
+    """
+    from depinspect.validator import is_valid_sql_table
+
+    if not is_valid_sql_table(db_con, table):
+        logging.exception("%s is not a correct sqlite table name.", table)
+        raise ValueError
+
+    res = db_con.execute(
+        """
+        SELECT DISTINCT packages.name FROM names
+        JOIN {0} ON {0}.nameKey = names.nameKey
+        JOIN packages ON packages.pkgKey = {0}.pkgKey
+        WHERE names.name = ? AND packages.arch = ?
+        """.format(
+            table
+        ),
+        (name, arch),
+    )
+
+    return {pkg for (pkg,) in res}
+
+
+def find_descriptions(
+    db_con: sqlite3.Connection, arch: str, name: str
+) -> dict[str, str | None]:
+    """Find descriptions of every stored version of a package.
+
+    Databases that keep descriptions in a side table are joined with it,
+    other ones are read from the description column of 'packages'.
+
+    Parameters
+    ----------
+    db_con : sqlite3.Connection
+        SQLite database connection.
+    arch : str
+        Architecture to search for in the 'packages' table.
+    name : str
+        Package name to search for in the 'packages' table.
+
+    Returns
+    -------
+    dict[str, str | None]
+        Description of every version of the package, None if it wasn't stored.
+    """
+    from depinspect.validator import is_valid_sql_table
+
+    if is_valid_sql_table(db_con, "descriptions"):
+        query = """
+            SELECT packages.version, descriptions.description FROM packages
+            LEFT JOIN descriptions ON descriptions.pkgKey = packages.pkgKey
+            WHERE packages.name = ? AND packages.arch = ?
+        """
+    else:
+        query = """
+            SELECT version, description FROM packages WHERE name = ? AND arch = ?
+        """
+
+    return {row[0]: row[1] for row in db_con.execute(query, (name, arch))}
 
 
 def find_all_distinct(db_con: sqlite3.Connection, arch: str) -> set[str]:
@@ -140,14 +559,12 @@ def find_all_distinct(db_con: sqlite3.Connection, arch: str) -> set[str]:
     set[str]
         Set of distinct package names for the specified architecture.
     """
-    db_con.row_factory = sqlite3.Row
-
     res: set[str] = set()
 
     with db_con:
         for row in db_con.execute(
             "SELECT DISTINCT name FROM packages WHERE arch = ?", (arch,)
         ):
-            res.add(row["name"])
+            res.add(row[0])
 
     return res
@@ -0,0 +1,157 @@
+import logging
+import sqlite3
+from os import link, replace
+from pathlib import Path
+from shutil import copy2
+
+from depinspect.constants import SETTINGS
+
+UPDATE_SETTINGS = SETTINGS.get("update", {})
+
+# A new generation must keep at least this share of the packages
+# stored in the generation it replaces.
+MIN_PACKAGE_RATIO: float = UPDATE_SETTINGS.get("min_package_ratio", 0.5)
+
+STAGING_DIR = ".staging"
+
+PREVIOUS_DIR = ".previous"
+
+
+def staging_path(db_path: Path) -> Path:
+    """Get the path where the next generation of a database is built.
+
+    Staging databases live in a hidden subdirectory on the same file system,
+    so they are never listed as stored databases and can be renamed atomically.
+    """
+    path = db_path.parent / STAGING_DIR / db_path.name
+    Path.mkdir(path.parent, parents=True, exist_ok=True)
+    return path
+
+
+def stage_copy(db_path: Path) -> Path:
+    """Seed the staging database with a copy of the current generation."""
+    new_path = staging_path(db_path)
+    new_path.unlink(missing_ok=True)
+
+    source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    target = sqlite3.connect(new_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+    return new_path
+
+
+def previous_path(db_path: Path) -> Path:
+    """Get the path where the previous generation of a database is kept."""
+    return db_path.parent / PREVIOUS_DIR / db_path.name
+
+
+def count_rows(db_path: Path) -> int:
+    """Check the integrity of a database and count its packages.
+
+    Raises
+    ------
+    ValueError
+        If the integrity check fails.
+    """
+    con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        (status,) = con.execute("PRAGMA integrity_check").fetchone()
+        (count,) = con.execute("SELECT COUNT(*) FROM packages").fetchone()
+    finally:
+        con.close()
+
+    if status != "ok":
+        raise ValueError(f"Integrity check of {db_path.name} failed: {status}")
+
+    return int(count)
+
+
+def validate(
+    new_path: Path, db_path: Path, min_ratio: float = MIN_PACKAGE_RATIO
+) -> None:
+    """Validate a staged database before it replaces the current one.
+
+    Parameters
+    ----------
+    new_path : Path
+        Path to the staged database.
+    db_path : Path
+        Path to the current database. It doesn't have to exist.
+    min_ratio : float
+        Minimum share of packages of the current database that the staged
+        database must contain.
+
+    Raises
+    ------
+    ValueError
+        If the staged database is corrupted, empty or much smaller than
+        the current one.
+    """
+    count = count_rows(new_path)
+    if not count:
+        raise ValueError(f"Staged database {new_path.name} has no packages")
+
+    if db_path.is_file():
+        current = count_rows(db_path)
+        if count < current * min_ratio:
+            raise ValueError(
+                f"Staged database {new_path.name} has {count} packages, "
+                f"the current one has {current}"
+            )
+
+
+def promote(db_path: Path) -> None:
+    """Validate the staged generation of a database and swap it in.
+
+    The current generation is kept as the previous one. Readers never see
+    a partially written database, since the staged file is renamed over
+    the current one in a single step.
+
+    Raises
+    ------
+    ValueError
+        If the staged database fails validation. The current database
+        is left untouched.
+    """
+    new_path = staging_path(db_path)
+    validate(new_path, db_path)
+
+    if db_path.is_file():
+        prev_path = previous_path(db_path)
+        Path.mkdir(prev_path.parent, parents=True, exist_ok=True)
+        prev_path.unlink(missing_ok=True)
+        try:
+            link(db_path, prev_path)
+        except OSError:
+            copy2(db_path, prev_path)
+
+    replace(new_path, db_path)
+    logging.info("Promoted a new generation of %s", db_path.name)
+
+
+def with_previous(directory: Path) -> list[Path]:
+    """List databases of a directory that have a previous generation kept."""
+    prev_dir = directory / PREVIOUS_DIR
+    if not prev_dir.is_dir():
+        return []
+    return sorted(directory / path.name for path in prev_dir.iterdir())
+
+
+def rollback(db_path: Path) -> None:
+    """Put the previous generation of a database back in place.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no previous generation is kept.
+    """
+    prev_path = previous_path(db_path)
+    if not prev_path.is_file():
+        raise FileNotFoundError(f"No previous generation of {db_path.name}")
+
+    replace(prev_path, db_path)
+    logging.info("Rolled back %s to the previous generation.", db_path.name)
@@ -0,0 +1,52 @@
+import logging
+from collections.abc import Iterable, Iterator
+
+
+def iter_stanzas(lines: Iterable[str]) -> Iterator[dict[str, str]]:
+    """Parse lines in the deb822 format and yield one stanza at a time.
+
+    Only the stanza that is currently being parsed is held in memory,
+    so the input can be arbitrarily large.
+
+    Parameters
+    ----------
+    lines : Iterable[str]
+        Lines of deb822 data, with or without line endings.
+        Stanzas are separated by blank lines.
+
+    Returns
+    -------
+    Iterator[dict[str, str]]
+        Mapping of field names to values for every stanza in input order.
+        Continuation lines of a field are appended to its value after a newline.
+    """
+    stanza: dict[str, str] = {}
+    key = ""
+
+    for line in lines:
+        line = line.rstrip("\r\n")
+
+        if not line.strip():
+            if stanza:
+                yield stanza
+                stanza = {}
+                key = ""
+            continue
+
+        if line[0] in " \t":
+            if key:
+                stanza[key] = f"{stanza[key]}\n{line.strip()}"
+            else:
+                logging.warning("Skipping continuation line without a field: %s", line)
+            continue
+
+        key, sep, value = line.partition(":")
+        if not sep:
+            logging.warning("Skipping malformed deb822 line: %s", line)
+            key = ""
+            continue
+
+        stanza[key] = value.strip()
+
+    if stanza:
+        yield stanza
@@ -1,16 +1,11 @@
-import logging
-import sqlite3
+from collections.abc import Iterator
+from os import replace
 from pathlib import Path
 
-from depinspect.archives.extractor import (
-    extract_bz2_archive,
-    extract_xz_archive,
-    process_archives,
-)
-from depinspect.archives.fetcher import fetch_and_save_metadata
 from depinspect.constants import DATABASE_DIR, DB_SUFFIX, FEDORA_ARCHS
-from depinspect.database import database
-from depinspect.distributions.package import Package
+from depinspect.database import catalog, database
+from depinspect.database.connection import readers
+from depinspect.distributions.package import LoadStats, Package, PackageRecord
 from depinspect.files import list_files_in_directory
 
 
@@ -20,49 +15,119 @@ class Fedora(Package):
         return super(Fedora, Fedora).parse_metadata(file_path, release)
 
     @staticmethod
-    def init(
-        tmp_dir: Path,
-        config: dict[str, dict[str, dict[str, dict[str, str]]]],
-        db_suffix: str,
-        output_path: Path,
-    ) -> None:
-        """Initialize and fetch metadata for Fedora releases.
+    def iter_metadata(
+        file_path: Path, release: str, jobs: int = 1
+    ) -> Iterator[PackageRecord]:
+        return super(Fedora, Fedora).iter_metadata(file_path, release, jobs)
+
+    @staticmethod
+    def database_name(release: str, branch: str, arch: str) -> str:
+        """Get the name of the database that stores a given source.
+
+        Every source is a separate prebuilt database.
+        """
+        return f"fedora_{release}_{branch}_{arch}{DB_SUFFIX}"
+
+    @staticmethod
+    def extracted_suffix() -> str:
+        """Get the file extension of extracted Fedora archives."""
+        return DB_SUFFIX
+
+    @staticmethod
+    def index_diff_url(url: str) -> str | None:
+        """Fedora repositories don't publish patches of their metadata."""
+        return None
+
+    @staticmethod
+    def repomd_url(url: str) -> str | None:
+        """Get the URL of repomd.xml if a source points at a repository base URL.
+
+        Sources that point straight at a primary database archive are used as is.
+        """
+        if DB_SUFFIX in url.rpartition("/")[2]:
+            return None
+        return f"{url.rstrip('/')}/repodata/repomd.xml"
+
+    @staticmethod
+    def load(
+        db_path: Path, files: list[Path], release: str, jobs: int = 1
+    ) -> LoadStats:
+        """Put an extracted Fedora database in place of the existing one.
 
         Parameters
         ----------
-        tmp_dir : Path
-            Temporary directory for fetching and extracting archives.
-        config : dict[str, dict[str, dict[str, dict[str, str]]]]
-            Configuration dictionary.
-        db_suffix : str
-            Desired file extension for the extracted databases.
-        output_path : Path
-            The directory where the extracted databases will be saved.
+        db_path : Path
+            Path to the database that will be replaced.
+        files : list[Path]
+            The extracted database. Exactly one file is expected.
+        release : str
+            The release name.
+        jobs : int
+            Unused, Fedora databases are prebuilt.
+
+        Returns
+        -------
+        LoadStats
+            Number of packages in the database.
+
+        Raises
+        ------
+        ValueError
+            If not exactly one extracted database is provided.
         """
+        if len(files) != 1:
+            raise ValueError(f"Expected a single database for {db_path.name}")
+
+        replace(files[0], db_path)
+        return LoadStats(database.count_packages(db_path))
+
+    @staticmethod
+    def update(
+        db_path: Path, files: list[Path], release: str, jobs: int = 1
+    ) -> LoadStats:
+        """Replace a Fedora database, prebuilt databases can't be updated in place."""
+        return Fedora.load(db_path, files, release, jobs)
+
+    @staticmethod
+    def load_stream(
+        db_path: Path, streams: list[Iterator[bytes]], release: str
+    ) -> LoadStats:
+        """Write a decompressed Fedora database stream in place of the existing one.
+
+        Parameters
+        ----------
+        db_path : Path
+            Path to the database that will be replaced.
+        streams : list[Iterator[bytes]]
+            The decompressed database. Exactly one stream is expected.
+        release : str
+            The release name.
+
+        Returns
+        -------
+        LoadStats
+            Number of packages in the database.
+
+        Raises
+        ------
+        ValueError
+            If not exactly one stream is provided.
+        """
+        if len(streams) != 1:
+            raise ValueError(f"Expected a single database for {db_path.name}")
+
+        part_path = db_path.with_name(f"{db_path.name}.part")
+
         try:
-            for release in config["fedora"].keys():
-                logging.info("Fetching fedora archives.")
-                fetch_and_save_metadata(config, "fedora", tmp_dir)
-
-                logging.info("Extracting fedora xz archives.")
-                process_archives(
-                    input_dir=tmp_dir,
-                    output_dir=output_path,
-                    file_extension=db_suffix,
-                    archive_extension=".xz",
-                    extractor=extract_xz_archive,
-                )
-
-                logging.info("Extracting fedora bz2 archives.")
-                process_archives(
-                    input_dir=tmp_dir,
-                    output_dir=output_path,
-                    file_extension=db_suffix,
-                    archive_extension=".bz2",
-                    extractor=extract_bz2_archive,
-                )
-        except Exception:
-            logging.exception("There was an exception trying to pull fedora database.")
+            with open(part_path, "wb") as output_file:
+                for chunk in streams[0]:
+                    output_file.write(chunk)
+        except BaseException:
+            part_path.unlink(missing_ok=True)
+            raise
+
+        replace(part_path, db_path)
+        return LoadStats(database.count_packages(db_path))
 
     @staticmethod
     def get_all_archs() -> set[str]:
@@ -73,27 +138,33 @@ class Fedora(Package):
     def get_stored_packages() -> set[str]:
         """Get the set of all distinct package names stored in Fedora databases.
 
+        Names are read from the catalog once it is built, otherwise
+        every database is scanned.
+
         Returns
         -------
         set[str]
             Set containing all distinct package names stored in Fedora databases.
         """
+        if catalog.is_built(DATABASE_DIR, "fedora"):
+            return set(
+                catalog.iter_names(DATABASE_DIR, "fedora", Fedora.get_all_archs())
+            )
+
         res: set[str] = set()
 
         databases = list_files_in_directory(DATABASE_DIR / "fedora")
 
         for db_path in databases:
-            db_con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            db_con = readers.get(db_path)
 
             for arch in Fedora.get_all_archs():
                 res.update(database.find_all_distinct(db_con, arch))
 
-            db_con.close()
-
         return res
 
     @staticmethod
-    def get_dependencies(arch: str, pkg: str) -> set[str]:
+    def get_dependencies(arch: str, pkg: str, versions: bool = True) -> set[str]:
         """Get the dependencies of a package for a specific architecture.
 
         Parameters
@@ -102,6 +173,8 @@ class Fedora(Package):
             The target architecture for which dependencies are retrieved.
         pkg : str
             The name of the package for which dependencies are retrieved.
+        versions : bool
+            Unused, Fedora requirements are compared by name.
 
         Returns
         -------
@@ -127,7 +200,7 @@ class Fedora(Package):
         if db_not_exists(db):
             return set()
 
-        db_con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        db_con = readers.get(db)
 
         res = database.find_dependencies(
             db_con=db_con,
@@ -136,12 +209,45 @@ class Fedora(Package):
             name=pkg,
         )
 
-        db_con.close()
+        return res
+
+    @staticmethod
+    def get_descriptions(arch: str, pkg: str) -> dict[str, str | None]:
+        """Get the descriptions of a package for a specific architecture.
+
+        Parameters
+        ----------
+        arch : str
+            The target architecture for which descriptions are retrieved.
+        pkg : str
+            The name of the package for which descriptions are retrieved.
+
+        Returns
+        -------
+        dict[str, str | None]
+            Description of every stored version of the package.
+
+        Note
+        ----
+        The "riscv64" architecture uses the "koji" repo, while others use "everything".
+        """
+        from depinspect.validator import db_not_exists
+
+        repo = "koji" if arch == "riscv64" else "everything"
+
+        db = DATABASE_DIR / "fedora" / f"fedora_f39_{repo}_{arch}{DB_SUFFIX}"
+
+        if db_not_exists(db):
+            return {}
+
+        db_con = readers.get(db)
+
+        res = database.find_descriptions(db_con=db_con, arch=arch, name=pkg)
 
         return res
 
     @staticmethod
-    def get_divergent(arch_a: str, arch_b: str) -> set[str]:
+    def get_divergent(arch_a: str, arch_b: str, versions: bool = True) -> set[str]:
         """Find packages with divergent dependencies between two architectures.
 
         Parameters
@@ -150,6 +256,8 @@ class Fedora(Package):
             The first target architecture for comparison.
         arch_b : str
             The second target architecture for comparison.
+        versions : bool
+            Unused, Fedora requirements are compared by name.
 
         Returns
         -------
@@ -162,8 +270,6 @@ class Fedora(Package):
         """
         from depinspect.validator import db_not_exists
 
-        result: set[str] = set()
-
         repo_a = "koji" if arch_a == "riscv64" else "everything"
         repo_b = "koji" if arch_b == "riscv64" else "everything"
 
@@ -173,22 +279,15 @@ class Fedora(Package):
         if any([db_not_exists(db_a), db_not_exists(db_b)]):
             return set()
 
-        db_con_a = sqlite3.connect(f"file:{db_a}?mode=ro", uri=True)
-        db_con_b = sqlite3.connect(f"file:{db_b}?mode=ro", uri=True)
-
-        pkgs = Fedora.get_stored_packages()
+        db_con_a = readers.get(db_a)
+        db_con_b = readers.get(db_b)
 
-        for pkg in pkgs:
-            depends_a = database.find_dependencies(
-                db_con=db_con_a, table="requires", arch=arch_a, name=pkg
-            )
-            depends_b = database.find_dependencies(
-                db_con=db_con_b, table="requires", arch=arch_b, name=pkg
-            )
-            if not (depends_a.issubset(depends_b) and depends_b.issubset(depends_a)):
-                result.add(pkg)
-
-        db_con_a.close()
-        db_con_b.close()
+        res = database.find_divergent_between(
+            db_con_a=db_con_a,
+            db_con_b=db_con_b,
+            table="requires",
+            arch_a=arch_a,
+            arch_b=arch_b,
+        )
 
-        return result
+        return res
@@ -1,11 +1,55 @@
 import logging
 import sqlite3
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+from itertools import repeat
+from multiprocessing import get_context
+from operator import attrgetter
 from pathlib import Path
 from sys import exit
+from typing import NamedTuple
 
-from depinspect.distributions.package import Package
+from depinspect.constants import SETTINGS
+from depinspect.database import database
+from depinspect.distributions.package import LoadStats, Package, PackageRecord
+from depinspect.distributions.relations import Relation, parse_entry
 from depinspect.files import list_files_in_directory
 
+LOADER_SETTINGS = SETTINGS.get("loader", {})
+
+BATCH_SIZE: int = LOADER_SETTINGS.get("batch_size", 10_000)
+
+CACHE_SIZE: int = LOADER_SETTINGS.get("cache_size", 64 * 1024)
+
+# Descriptions are only read by the info command and can be left out.
+STORE_DESCRIPTIONS: bool = LOADER_SETTINGS.get("descriptions", True)
+
+# Process pools of the loader are started from the threads of the load
+# stage. A forked child gets copies of locks held by the other threads,
+# e.g. the one of the logging module, so workers are spawned instead.
+PROCESS_CONTEXT = get_context("spawn")
+
+# Tables filled from the relation field of the same name.
+RELATION_TABLES = (
+    "depends",
+    "recommends",
+    "suggests",
+    "enhances",
+    "breaks",
+    "conflicts",
+    "provides",
+)
+
+# Bulk loads trade durability for speed. A database left behind by an
+# interrupted load is rebuilt by the next update anyway.
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = MEMORY",
+    "PRAGMA synchronous = OFF",
+    # Negative values are in KiB.
+    f"PRAGMA cache_size = -{CACHE_SIZE}",
+)
+
 
 def validate_metadata_file_exists(file_path: Path) -> None:
     """Validate the existence and format of a metadata file.
@@ -55,166 +99,353 @@ def validate_database_file_exists(db_path: Path) -> None:
         exit(1)
 
 
-def is_not_in_db(db_con: sqlite3.Connection, pkg: Package) -> bool:
-    """Check if a package is not present in the SQLite database.
-
-    Parameters
-    ----------
-    db_connection : sqlite3.Connection
-        SQLite database connection.
-    pkg : Package
-        The Package object representing the package to be checked.
-
-    Returns
-    -------
-    bool
-        True if the package is not present in the database, False otherwise.
+def alternatives(entry: str) -> tuple[Relation, ...]:
+    """Parse an entry of a relation field, dropping it if it is malformed."""
+    try:
+        return parse_entry(entry)
+    except ValueError:
+        logging.warning("Skipping malformed relation %r", entry)
+        return ()
+
+
+# Columns of the relation tables: package key, positions of the entry and
+# of the alternative, name key and the other fields of Relation, i.e.
+# architecture qualifier, version operator, version, architecture
+# restrictions and build profiles.
+RELATION_FIELDS = (
+    "pkgKey",
+    "grp",
+    "alt",
+    "nameKey",
+    "archq",
+    "op",
+    "version",
+    "arches",
+    "profiles",
+)
+
+PackageRow = tuple[int, str, str, str, str, str]
+
+# A row of a relation table without its trailing NULL columns. Most
+# relations are a bare name, whose rows bind four parameters instead of nine.
+RelationRow = tuple[int | str | None, ...]
+
+# Rows of one entry of a relation field, without the package key and
+# the position of the entry.
+EntryRows = tuple[RelationRow, ...]
+
+# Rows of a relation table, indexed by their number of columns.
+RelationRows = list[list[RelationRow]]
+
+RelationTargets = list[
+    tuple[Callable[[Package | PackageRecord], Sequence[str]], RelationRows]
+]
+
+
+class Batch(NamedTuple):
+    """Rows collected for one bulk insert and the names of the database.
+
+    names maps every name known to the database to its key. Names seen for
+    the first time are also kept in new_names until the batch is flushed.
+    entries caches relation entries that were already resolved to rows.
+    Rows of every relation table are kept apart by their length, so each
+    length is inserted with a statement binding only those columns.
     """
-    res = db_con.execute(
-        """SELECT name, arch, version, release FROM packages
-        WHERE name = ? AND arch = ? AND version = ? AND release = ?""",
-        (pkg.package, pkg.architecture, pkg.version, pkg.release),
+
+    rows: list[PackageRow]
+    descriptions: list[tuple[int, str]]
+    relations: dict[str, RelationRows]
+    names: dict[str, int]
+    new_names: list[tuple[int, str]]
+    entries: dict[str, EntryRows]
+
+
+def package_hash(pkg: Package | PackageRecord) -> str:
+    """Hash every stored field of a package to detect changed packages cheaply."""
+    fields = [pkg.package, pkg.architecture, pkg.version, pkg.release, pkg.description]
+    fields += ["\x1f".join(getattr(pkg, table)) for table in RELATION_TABLES]
+    return blake2b("\x1e".join(fields).encode(), digest_size=16).hexdigest()
+
+
+def resolve_entry(entry: str, batch: Batch) -> EntryRows:
+    """Parse an entry of a relation field and intern the names it refers to."""
+    rows = []
+    for alt, relation in enumerate(alternatives(entry)):
+        key = batch.names.get(relation.name)
+        if key is None:
+            # Names are never deleted, so keys stay dense.
+            key = batch.names[relation.name] = len(batch.names) + 1
+            batch.new_names.append((key, relation.name))
+        row: RelationRow = (alt, key, *relation[1:])
+        while row[-1] is None:
+            row = row[:-1]
+        rows.append(row)
+
+    batch.entries[entry] = tuple(rows)
+    return batch.entries[entry]
+
+
+def append_package(
+    pkg: Package | PackageRecord,
+    pkg_key: int,
+    batch: Batch,
+    targets: RelationTargets,
+) -> None:
+    """Add the rows of a package and its relations to a batch."""
+    batch.rows.append(
+        (
+            pkg_key,
+            pkg.package,
+            pkg.architecture,
+            pkg.version,
+            pkg.release,
+            package_hash(pkg),
+        )
     )
+    if STORE_DESCRIPTIONS and pkg.description:
+        batch.descriptions.append((pkg_key, pkg.description))
 
-    return True if res.fetchone() is None else False
+    entries = batch.entries
+    for get_relation, table_rows in targets:
+        if relation := get_relation(pkg):
+            for grp, entry in enumerate(relation):
+                for row in entries.get(entry) or resolve_entry(entry, batch):
+                    table_row = (pkg_key, grp, *row)
+                    table_rows[len(table_row)].append(table_row)
 
 
-def insert_into_packages(db_con: sqlite3.Connection, pkg: Package) -> int:
-    """Insert a package into the 'packages' table of an SQLite database.
+def relation_insert(table: str, length: int) -> str:
+    """Get the statement inserting rows of a relation table of the given length."""
+    columns = ", ".join(RELATION_FIELDS[:length])
+    params = ", ".join("?" * length)
+    return f"INSERT INTO {table} ({columns}) VALUES ({params})"
 
-    Parameters
-    ----------
-    db_connection : sqlite3.Connection
-        SQLite database connection.
-    pkg : Package
-        The Package object representing the package to be inserted.
+
+def flush_batch(db_con: sqlite3.Connection, batch: Batch) -> int:
+    """Insert a batch of packages with their relations and descriptions,
+    then empty the batch.
+
+    Packages that are already stored are ignored by the unique constraint
+    of the packages table, and so are their relations and descriptions.
 
     Returns
     -------
     int
-        The row ID of the newly inserted package.
+        Number of inserted packages.
     """
-    res = db_con.execute(
-        """INSERT INTO packages (name, arch, version, release, description)
-        VALUES (?, ?, ?, ?, ?)""",
-        (pkg.package, pkg.architecture, pkg.version, pkg.release, pkg.description),
+    rows = batch.rows
+    if not rows:
+        return 0
+
+    db_con.executemany(
+        "INSERT INTO names (nameKey, name) VALUES (?, ?)", batch.new_names
+    )
+    batch.new_names.clear()
+
+    changes = db_con.total_changes
+    db_con.executemany(
+        """INSERT OR IGNORE INTO packages
+        (pkgKey, name, arch, version, release, hash)
+        VALUES (?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    inserted = db_con.total_changes - changes
+
+    stored_keys: set[int] | None = None
+    if inserted < len(rows):
+        # Keys of a batch are consecutive and larger than any stored key.
+        stored_keys = {
+            pkg_key
+            for (pkg_key,) in db_con.execute(
+                "SELECT pkgKey FROM packages WHERE pkgKey BETWEEN ? AND ?",
+                (rows[0][0], rows[-1][0]),
+            )
+        }
+    rows.clear()
+
+    descriptions = batch.descriptions
+    if stored_keys is not None:
+        descriptions[:] = [row for row in descriptions if row[0] in stored_keys]
+    db_con.executemany(
+        "INSERT INTO descriptions (pkgKey, description) VALUES (?, ?)", descriptions
     )
+    descriptions.clear()
 
-    if not res.lastrowid:
-        logging.exception(
-            "Failed to insert row into database. "
-            "Values that caused an error: %s, %s, %s, %s, %s",
-            pkg.package,
-            pkg.architecture,
-            pkg.version,
-            pkg.release,
-        )
-        db_con.close()
-        exit(1)
+    for table, rows_by_length in batch.relations.items():
+        for length, table_rows in enumerate(rows_by_length):
+            if not table_rows:
+                continue
+            if stored_keys is not None:
+                table_rows[:] = [row for row in table_rows if row[0] in stored_keys]
+            db_con.executemany(relation_insert(table, length), table_rows)
+            table_rows.clear()
 
-    return res.lastrowid
+    return inserted
 
 
-def map_additional_info(
-    input_list: list[str], release: str, key: int
-) -> list[tuple[str, str, int]]:
-    """Map additional information to each entry in a list.
+def delete_packages(db_con: sqlite3.Connection, pkg_keys: list[int]) -> None:
+    """Delete packages and their relations by package key, then empty the list."""
+    params = [(pkg_key,) for pkg_key in pkg_keys]
+    for table in (*RELATION_TABLES, "descriptions"):
+        db_con.executemany(f"DELETE FROM {table} WHERE pkgKey = ?", params)
+    db_con.executemany("DELETE FROM packages WHERE pkgKey = ?", params)
+    pkg_keys.clear()
 
-    Parameters
-    ----------
-    input_list : list[str]
-        The list of entries to map additional information to.
-    release : str
-        The release information to be mapped.
-    key : int
-        The key information to be mapped.
+
+def connect_for_load(db_path: Path) -> tuple[sqlite3.Connection, int, Batch]:
+    """Open a database for loading.
 
     Returns
     -------
-    list[tuple[str, str, int]]
-        A list of tuples containing the mapped information for each entry.
+    tuple[sqlite3.Connection, int, Batch]
+        The connection, the largest stored package key and an empty batch
+        that knows every name stored in the database.
     """
-    return [(entry, release, key) for entry in input_list]
+    validate_database_file_exists(db_path)
 
+    db_con = sqlite3.connect(db_path)
+    for pragma in LOAD_PRAGMAS:
+        db_con.execute(pragma)
+
+    (pkg_key,) = db_con.execute(
+        "SELECT COALESCE(MAX(pkgKey), 0) FROM packages"
+    ).fetchone()
+    names = dict(db_con.execute("SELECT name, nameKey FROM names"))
+
+    relations: dict[str, RelationRows] = {
+        table: [[] for _ in range(len(RELATION_FIELDS) + 1)]
+        for table in RELATION_TABLES
+    }
+    batch = Batch([], [], relations, names, [], {})
+    return db_con, pkg_key, batch
+
+
+def insert_packages_into_db(
+    packages: Iterable[Package | PackageRecord],
+    db_path: Path,
+    batch_size: int = BATCH_SIZE,
+) -> LoadStats:
+    """Bulk insert packages into an SQLite database in a single transaction.
+
+    Package keys are assigned up front, so rows of many packages are
+    collected into batches and every table is filled with one executemany
+    call per batch. Duplicates are dropped by the unique constraint on
+    name, architecture, version and release.
 
-def insert_into_depends(db_con: sqlite3.Connection, pkg: Package, pkg_key: int) -> None:
-    if pkg.depends:
-        db_con.executemany(
-            """INSERT INTO depends (name, release, pkgKey)
-            VALUES (?, ?, ?)""",
-            (map_additional_info(pkg.depends, pkg.release, pkg_key)),
-        )
+    Parameters
+    ----------
+    packages : Iterable[Package | PackageRecord]
+        Packages to be inserted. Packages that are already stored are skipped.
+    db_path : Path
+        Path to the SQLite database where the packages will be inserted.
+    batch_size : int
+        Number of packages inserted at once.
 
+    Returns
+    -------
+    LoadStats
+        Numbers of inserted and dropped duplicate packages.
+    """
+    db_con, pkg_key, batch = connect_for_load(db_path)
+    targets: RelationTargets = [
+        (attrgetter(table), batch.relations[table]) for table in RELATION_TABLES
+    ]
+    first_key = pkg_key
+    inserted = 0
 
-def insert_into_recommends(
-    db_connection: sqlite3.Connection, pkg: Package, pkg_key: int
-) -> None:
-    if pkg.recommends:
-        db_connection.executemany(
-            """INSERT INTO recommends (name, release, pkgKey)
-            VALUES (?, ?, ?)""",
-            (map_additional_info(pkg.recommends, pkg.release, pkg_key)),
-        )
+    with db_con:
+        for pkg in packages:
+            pkg_key += 1
+            append_package(pkg, pkg_key, batch, targets)
 
+            if len(batch.rows) >= batch_size:
+                inserted += flush_batch(db_con, batch)
 
-def insert_into_suggests(
-    db_connection: sqlite3.Connection, pkg: Package, pkg_key: int
-) -> None:
-    if pkg.suggests:
-        db_connection.executemany(
-            """INSERT INTO suggests (name, release, pkgKey)
-            VALUES (?, ?, ?)""",
-            (map_additional_info(pkg.suggests, pkg.release, pkg_key)),
-        )
+        inserted += flush_batch(db_con, batch)
 
+    db_con.close()
+    return LoadStats(inserted, pkg_key - first_key - inserted)
 
-def insert_into_enhances(
-    db_connection: sqlite3.Connection, pkg: Package, pkg_key: int
-) -> None:
-    if pkg.enhances:
-        db_connection.executemany(
-            """INSERT INTO enhances (name, release, pkgKey)
-            VALUES (?, ?, ?)""",
-            (map_additional_info(pkg.enhances, pkg.release, pkg_key)),
-        )
 
+def apply_changes(
+    packages: Iterable[Package | PackageRecord],
+    db_path: Path,
+    batch_size: int = BATCH_SIZE,
+) -> LoadStats:
+    """Bring a loaded database in line with a new snapshot of its packages.
 
-def insert_into_breaks(
-    db_connection: sqlite3.Connection, pkg: Package, pkg_key: int
-) -> None:
-    if pkg.breaks:
-        db_connection.executemany(
-            """INSERT INTO breaks (name, release, pkgKey)
-            VALUES (?, ?, ?)""",
-            (map_additional_info(pkg.breaks, pkg.release, pkg_key)),
-        )
+    Packages are matched with stored ones by name, architecture and version,
+    and compared by their content hash. Only new, changed and removed
+    packages are written, all in a single transaction.
 
+    Parameters
+    ----------
+    packages : Iterable[Package | PackageRecord]
+        Every package of the new snapshot.
+    db_path : Path
+        Path to the SQLite database that will be updated.
+    batch_size : int
+        Number of packages written at once.
 
-def insert_into_conflicts(
-    db_connection: sqlite3.Connection, pkg: Package, pkg_key: int
-) -> None:
-    if pkg.conflicts:
-        db_connection.executemany(
-            """INSERT INTO conflicts (name, release, pkgKey)
-            VALUES (?, ?, ?)""",
-            (map_additional_info(pkg.conflicts, pkg.release, pkg_key)),
+    Returns
+    -------
+    LoadStats
+        Numbers of inserted, dropped duplicate, replaced and deleted packages.
+    """
+    db_con, pkg_key, batch = connect_for_load(db_path)
+    targets: RelationTargets = [
+        (attrgetter(table), batch.relations[table]) for table in RELATION_TABLES
+    ]
+
+    stored = {
+        (name, arch, version): (stored_key, digest)
+        for stored_key, name, arch, version, digest in db_con.execute(
+            "SELECT pkgKey, name, arch, version, hash FROM packages"
         )
+    }
+    seen: set[tuple[str, str, str]] = set()
+    stale: list[int] = []
+    inserted = duplicates = replaced = 0
 
+    with db_con:
+        for pkg in packages:
+            identity = (pkg.package, pkg.architecture, pkg.version)
+            if identity in seen:
+                duplicates += 1
+                continue
+            seen.add(identity)
+
+            current = stored.get(identity)
+            if current is not None:
+                if current[1] == package_hash(pkg):
+                    continue
+                stale.append(current[0])
+                replaced += 1
+            else:
+                inserted += 1
+
+            pkg_key += 1
+            append_package(pkg, pkg_key, batch, targets)
+
+            if len(batch.rows) >= batch_size:
+                # Replaced versions go first to keep the unique constraint.
+                delete_packages(db_con, stale)
+                flush_batch(db_con, batch)
+
+        delete_packages(db_con, stale)
+        flush_batch(db_con, batch)
+
+        removed = [key for identity, (key, _) in stored.items() if identity not in seen]
+        deleted = len(removed)
+        delete_packages(db_con, removed)
 
-def insert_into_provides(
-    db_connection: sqlite3.Connection, pkg: Package, pkg_key: int
-) -> None:
-    if pkg.provides:
-        db_connection.executemany(
-            """INSERT INTO provides (name, release, pkgKey)
-            VALUES (?, ?, ?)""",
-            (map_additional_info(pkg.provides, pkg.release, pkg_key)),
-        )
+    db_con.close()
+    return LoadStats(inserted, duplicates, replaced, deleted)
 
 
 def process_metadata_into_db(
-    file_path: Path, db_path: Path, distro: str, release: str
-) -> None:
+    file_path: Path, db_path: Path, distro: str, release: str, jobs: int = 1
+) -> LoadStats:
     """Process metadata from a file and insert it into an SQLite database.
 
     Parameters
@@ -227,40 +458,187 @@ def process_metadata_into_db(
         The distribution name.
     release : str
         The release name.
+    jobs : int
+        Number of processes parsing the file.
 
     Returns
     -------
-    None
+    LoadStats
+        Numbers of inserted and dropped duplicate packages.
     """
     from depinspect.distributions.mapping import distro_class_mapping
 
     validate_metadata_file_exists(file_path)
     validate_database_file_exists(db_path)
 
-    db_con = sqlite3.connect(db_path)
+    package_class = distro_class_mapping[distro]
+    packages = package_class.iter_metadata(file_path, release, jobs)
+
+    # Packages are inserted while the file is still being parsed.
+    stats = insert_packages_into_db(packages, db_path)
+
+    logging.info(
+        "File %s has been processed succesfully, %d packages inserted, "
+        "%d duplicates dropped.",
+        file_path.name,
+        stats.packages,
+        stats.duplicates,
+    )
+    return stats
+
+
+def shard_path(db_path: Path, index: int) -> Path:
+    """Get the path of a shard database of a database being loaded."""
+    return db_path.with_name(f"{db_path.stem}.shard{index}{db_path.suffix}")
+
+
+def load_shard(file_path: Path, path: Path, distro: str, release: str) -> LoadStats:
+    """Load one metadata file into a shard database of its own."""
+    path = database.init(path.name, path.parent, indexes=False)
+    return process_metadata_into_db(file_path, path, distro, release)
+
+
+def merge_shard(db_con: sqlite3.Connection, path: Path) -> LoadStats:
+    """Copy the packages, relations and descriptions of a shard into a database.
+
+    Package keys of the shard are shifted past the stored ones and names
+    are matched by value, since every shard interns names on its own.
+    Packages that are already stored are dropped with their relations.
+
+    Returns
+    -------
+    LoadStats
+        Numbers of copied and dropped duplicate packages.
+    """
+    db_con.execute("ATTACH DATABASE ? AS shard", (str(path),))
+
+    (offset,) = db_con.execute(
+        "SELECT COALESCE(MAX(pkgKey), 0) FROM main.packages"
+    ).fetchone()
+    (count,) = db_con.execute("SELECT COUNT(*) FROM shard.packages").fetchone()
 
     with db_con:
-        package_class = distro_class_mapping[distro]
-        packages = package_class.parse_metadata(file_path, release)
+        db_con.execute(
+            "INSERT OR IGNORE INTO main.names (name) SELECT name FROM shard.names"
+        )
+        changes = db_con.total_changes
+        db_con.execute(
+            """INSERT OR IGNORE INTO main.packages
+            SELECT pkgKey + ?, pkgId, name, arch, version, release, hash
+            FROM shard.packages ORDER BY pkgKey""",
+            (offset,),
+        )
+        inserted = db_con.total_changes - changes
+
+        # Only packages copied from this shard have keys past the offset.
+        kept = (
+            ""
+            if inserted == count
+            else "WHERE r.pkgKey + ?1 IN (SELECT pkgKey FROM main.packages "
+            "WHERE pkgKey > ?1)"
+        )
+        for table in RELATION_TABLES:
+            db_con.execute(
+                f"""INSERT INTO main.{table}
+                SELECT r.pkgKey + ?1, r.grp, r.alt, n.nameKey,
+                    r.archq, r.op, r.version, r.arches, r.profiles
+                FROM shard.{table} AS r
+                JOIN shard.names AS s ON s.nameKey = r.nameKey
+                JOIN main.names AS n ON n.name = s.name
+                {kept}
+                ORDER BY r.pkgKey, r.grp, r.alt""",
+                (offset,),
+            )
+        db_con.execute(
+            f"""INSERT INTO main.descriptions
+            SELECT r.pkgKey + ?1, r.description FROM shard.descriptions AS r
+            {kept}
+            ORDER BY r.pkgKey""",
+            (offset,),
+        )
 
-        for pkg in packages:
-            if is_not_in_db(db_con, pkg):
-                pkg_key = insert_into_packages(db_con, pkg)
-                insert_into_depends(db_con, pkg, pkg_key)
-                insert_into_recommends(db_con, pkg, pkg_key)
-                insert_into_suggests(db_con, pkg, pkg_key)
-                insert_into_enhances(db_con, pkg, pkg_key)
-                insert_into_breaks(db_con, pkg, pkg_key)
-                insert_into_conflicts(db_con, pkg, pkg_key)
-                insert_into_provides(db_con, pkg, pkg_key)
-
-    logging.info("File %s has been processed succesfully.", file_path.name)
+    db_con.execute("DETACH DATABASE shard")
+    return LoadStats(inserted, count - inserted)
 
-    db_con.close()
+
+def load_sharded(
+    files: list[Path], db_path: Path, distro: str, release: str, jobs: int
+) -> LoadStats:
+    """Load metadata files into shards in parallel and merge them into a database.
+
+    Every file is loaded into a shard database of its own by a separate
+    process, so files are parsed and written at the same time. Shards are
+    merged in the order of the files, so the result is the same as when
+    the files are loaded one after another.
+
+    Parameters
+    ----------
+    files : list[Path]
+        Metadata files to be loaded, e.g. one per architecture.
+    db_path : Path
+        Path to the initialized SQLite database the shards are merged into.
+    distro : str
+        The distribution name.
+    release : str
+        The release name.
+    jobs : int
+        Number of shards loaded at the same time.
+
+    Returns
+    -------
+    LoadStats
+        Numbers of inserted and dropped duplicate packages.
+    """
+    paths = [shard_path(db_path, index) for index in range(len(files))]
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(files)), mp_context=PROCESS_CONTEXT
+        ) as executor:
+            shards = list(
+                executor.map(load_shard, files, paths, repeat(distro), repeat(release))
+            )
+
+        db_con = sqlite3.connect(db_path)
+        for pragma in LOAD_PRAGMAS:
+            db_con.execute(pragma)
+
+        stats = LoadStats()
+        for path, shard in zip(paths, shards):
+            merged = merge_shard(db_con, path)
+            stats = stats.merge(
+                LoadStats(merged.packages, shard.duplicates + merged.duplicates)
+            )
+        db_con.close()
+    finally:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    logging.info("Merged %d shards into %s", len(paths), db_path.name)
+    return stats
+
+
+def load_files(
+    files: list[Path], db_path: Path, distro: str, release: str, jobs: int = 1
+) -> LoadStats:
+    """Load metadata files into a database with up to jobs processes.
+
+    Several files are loaded into shards in parallel, a single file
+    is parsed in parallel instead.
+    """
+    if jobs > 1 and len(files) > 1:
+        return load_sharded(files, db_path, distro, release, jobs)
+
+    stats = LoadStats()
+    for file_path in files:
+        stats = stats.merge(
+            process_metadata_into_db(file_path, db_path, distro, release, jobs)
+        )
+    return stats
 
 
 def deserialize_ubuntu_metadata(
-    tmp_dir: Path, db_path: Path, distro: str, release: str
+    tmp_dir: Path, db_path: Path, distro: str, release: str, jobs: int = 1
 ) -> None:
     """Deserialize Ubuntu metadata files into an SQLite database.
 
@@ -274,6 +652,8 @@ def deserialize_ubuntu_metadata(
         The distribution name.
     release : str
         The release name.
+    jobs : int
+        Number of processes loading the files.
 
     Returns
     -------
@@ -286,5 +666,4 @@ def deserialize_ubuntu_metadata(
         and txt_file.stem.startswith(distro)
         and release in txt_file.stem
     ]
-    for file_path in txt_files:
-        process_metadata_into_db(file_path, db_path, distro, release)
+    load_files(txt_files, db_path, distro, release, jobs)
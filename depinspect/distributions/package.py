@@ -1,5 +1,45 @@
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from pathlib import Path
+from typing import NamedTuple
+
+
+# Shared by every record that has no entries in a relation field.
+NO_RELATIONS: tuple[str, ...] = ()
+
+
+class PackageRecord(NamedTuple):
+    """Compact, immutable package record used while ingesting metadata.
+
+    Attribute names match the properties of Package, so both can be passed
+    to the loader. Relation fields are tuples instead of lists.
+    """
+
+    package: str = ""
+    architecture: str = ""
+    version: str = ""
+    release: str = ""
+    description: str = ""
+    depends: tuple[str, ...] = NO_RELATIONS
+    pre_depends: tuple[str, ...] = NO_RELATIONS
+    recommends: tuple[str, ...] = NO_RELATIONS
+    suggests: tuple[str, ...] = NO_RELATIONS
+    enhances: tuple[str, ...] = NO_RELATIONS
+    breaks: tuple[str, ...] = NO_RELATIONS
+    conflicts: tuple[str, ...] = NO_RELATIONS
+    provides: tuple[str, ...] = NO_RELATIONS
+
+
+class LoadStats(NamedTuple):
+    """Outcome of loading metadata into a database."""
+
+    packages: int = 0
+    duplicates: int = 0
+    replaced: int = 0
+    deleted: int = 0
+
+    def merge(self, other: "LoadStats") -> "LoadStats":
+        return LoadStats(*(a + b for a, b in zip(self, other)))
 
 
 class Package(ABC):
@@ -20,7 +60,8 @@ class Package(ABC):
         self._description: str = ""
 
     def _str_to_list(self, string: str) -> list[str]:
-        return [string.strip() for string in string.split(",")]
+        # Folded fields may span several lines, so whitespace is normalized.
+        return [" ".join(string.split()) for string in string.split(",")]
 
     @property
     def distribution(self) -> str:
@@ -141,12 +182,50 @@ class Package(ABC):
 
     @staticmethod
     @abstractmethod
-    def init(
-        tmp_dir: Path,
-        config: dict[str, dict[str, dict[str, dict[str, str]]]],
-        db_suffix: str,
-        output_path: Path,
-    ) -> None:
+    def iter_metadata(
+        file_path: Path, release: str, jobs: int = 1
+    ) -> Iterator[PackageRecord]:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def database_name(release: str, branch: str, arch: str) -> str:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def extracted_suffix() -> str:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def index_diff_url(url: str) -> str | None:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def repomd_url(url: str) -> str | None:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def load(
+        db_path: Path, files: list[Path], release: str, jobs: int = 1
+    ) -> LoadStats:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def update(
+        db_path: Path, files: list[Path], release: str, jobs: int = 1
+    ) -> LoadStats:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def load_stream(
+        db_path: Path, streams: list[Iterator[bytes]], release: str
+    ) -> LoadStats:
         pass
 
     @staticmethod
@@ -161,10 +240,15 @@ class Package(ABC):
 
     @staticmethod
     @abstractmethod
-    def get_dependencies(arch: str, pkg: str) -> set[str]:
+    def get_dependencies(arch: str, pkg: str, versions: bool = True) -> set[str]:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def get_divergent(arch_a: str, arch_b: str, versions: bool = True) -> set[str]:
         pass
 
     @staticmethod
     @abstractmethod
-    def get_divergent(arch_a: str, arch_b: str) -> set[str]:
+    def get_descriptions(arch: str, pkg: str) -> dict[str, str | None]:
         pass
@@ -0,0 +1,88 @@
+import re
+from typing import NamedTuple
+
+# One alternative of a relation entry, e.g.
+# "python3:any (>= 3.10) [amd64 !i386] <!nocheck> <stage1 cross>".
+# Groups are the fields of Relation in order.
+ALTERNATIVE = re.compile(
+    r"\s*([^\s:(\[<|]+)(?::([^\s(\[<|]+))?"
+    r"\s*(?:\(\s*(<<|<=|=|>=|>>|<|>)\s*([^)\s]+)\s*\))?"
+    r"\s*(?:\[([^\]]*)\])?"
+    r"\s*((?:<[^>]*>\s*)*)"
+)
+
+# An alternative that is a bare package name, the most common kind.
+BARE_NAME = re.compile(r"[^\s:(\[<|]+")
+
+PROFILE_FORMULA = re.compile(r"<([^>]*)>")
+
+# Obsolete operators, which policy defines as the non-strict ones.
+OPERATORS = {"<": "<=", ">": ">="}
+
+
+class Relation(NamedTuple):
+    """One alternative of an entry of a relation field.
+
+    archq is the architecture qualifier that follows the name after a colon.
+    op and version are the version constraint, if there is one. arches is
+    the architecture restriction list without brackets and profiles the
+    build profile formulas, both with whitespace normalized.
+    """
+
+    name: str
+    archq: str | None = None
+    op: str | None = None
+    version: str | None = None
+    arches: str | None = None
+    profiles: str | None = None
+
+    def __str__(self) -> str:
+        text = self.name if self.archq is None else f"{self.name}:{self.archq}"
+        if self.op is not None:
+            text = f"{text} ({self.op} {self.version})"
+        if self.arches is not None:
+            text = f"{text} [{self.arches}]"
+        if self.profiles is not None:
+            text = f"{text} {self.profiles}"
+        return text
+
+
+def parse_alternative(text: str) -> Relation:
+    """Parse one alternative of a relation entry.
+
+    Raises
+    ------
+    ValueError
+        If the alternative is not a well-formed relation.
+    """
+    match = ALTERNATIVE.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Malformed relation {text!r}")
+
+    name, archq, op, version, arches, profiles = match.groups()
+    if arches is not None:
+        arches = " ".join(arches.split()) or None
+    if profiles:
+        profiles = " ".join(
+            f"<{' '.join(formula.split())}>"
+            for formula in PROFILE_FORMULA.findall(profiles)
+        )
+
+    return Relation(
+        name, archq, OPERATORS.get(op, op), version, arches, profiles or None
+    )
+
+
+def parse_entry(entry: str) -> tuple[Relation, ...]:
+    """Parse an entry of a relation field into its alternatives.
+
+    Entries are the comma separated parts of a field.
+
+    Raises
+    ------
+    ValueError
+        If an alternative is not a well-formed relation.
+    """
+    if BARE_NAME.fullmatch(entry):
+        return (Relation(entry),)
+    return tuple(parse_alternative(part) for part in entry.split("|"))
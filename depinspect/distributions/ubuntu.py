@@ -1,20 +1,137 @@
 import logging
-import sqlite3
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
+from mmap import ACCESS_READ, mmap
 from pathlib import Path
-from re import split
+from sys import intern
 
-from depinspect.archives.extractor import (
-    extract_xz_archive,
-    process_archives,
-)
-from depinspect.archives.fetcher import fetch_and_save_metadata
+from depinspect.archives.stream import iter_lines
 from depinspect.constants import DATABASE_DIR, DB_SUFFIX, UBUNTU_ARCHS
-from depinspect.database import database
-from depinspect.distributions.loader import deserialize_ubuntu_metadata
-from depinspect.distributions.package import Package
+from depinspect.database import catalog, database
+from depinspect.database.connection import readers
+from depinspect.distributions.loader import (
+    PROCESS_CONTEXT,
+    apply_changes,
+    insert_packages_into_db,
+    load_files,
+)
+from depinspect.distributions.package import (
+    NO_RELATIONS,
+    LoadStats,
+    Package,
+    PackageRecord,
+)
 from depinspect.files import list_files_in_directory
 
 
+# Stored fields of Packages indices, mapped to PackageRecord fields.
+FIELDS = {
+    "Package": "package",
+    "Architecture": "architecture",
+    "Version": "version",
+    "Description": "description",
+    "Depends": "depends",
+    "Pre-Depends": "pre_depends",
+    "Recommends": "recommends",
+    "Suggests": "suggests",
+    "Enhances": "enhances",
+    "Breaks": "breaks",
+    "Conflicts": "conflicts",
+    "Provides": "provides",
+}
+
+# Relation fields in the order they appear in PackageRecord.
+RELATION_FIELDS = (
+    "depends",
+    "pre_depends",
+    "recommends",
+    "suggests",
+    "enhances",
+    "breaks",
+    "conflicts",
+    "provides",
+)
+
+# Field names as they appear in the input, resolved to a record field
+# or to None for fields that are ignored. Grows as new names are seen.
+FIELD_DISPATCH: dict[str, str | None] = dict(FIELDS)
+
+CONTINUATION = (" ", "\t")
+
+# Smaller files are not worth the cost of starting worker processes.
+PARALLEL_MIN_SIZE = 4 * 1024 * 1024
+
+
+def resolve_field(key: str) -> str | None:
+    """Resolve a field name case-insensitively and remember the result."""
+    field = next(
+        (field for name, field in FIELDS.items() if name.lower() == key.lower()), None
+    )
+    if field is None:
+        logging.debug("Ignoring Ubuntu package field %s", key)
+
+    FIELD_DISPATCH[key] = field
+    return field
+
+
+def intern_relations(value: str) -> tuple[str, ...]:
+    """Split a relation field into a tuple of interned entries."""
+    if "\n" in value:
+        value = " ".join(value.split())
+    return tuple([intern(entry.strip()) for entry in value.split(",")])
+
+
+def stanza_ranges(file_path: Path, parts: int) -> list[tuple[int, int]]:
+    """Split a metadata file into roughly equal byte ranges of whole stanzas.
+
+    Parameters
+    ----------
+    file_path : Path
+        Path to the metadata file.
+    parts : int
+        Desired number of ranges.
+
+    Returns
+    -------
+    list[tuple[int, int]]
+        Start and end offsets of every range. Ranges begin right after
+        a blank line, so no stanza is split between two ranges.
+    """
+    size = file_path.stat().st_size
+    if size == 0:
+        return []
+
+    with open(file_path, "rb") as file, mmap(
+        file.fileno(), 0, access=ACCESS_READ
+    ) as mm:
+        boundaries = [0]
+        for part in range(1, parts):
+            target = max(size * part // parts, boundaries[-1])
+            separator = mm.find(b"\n\n", target)
+            if separator == -1:
+                break
+            if separator + 2 > boundaries[-1]:
+                boundaries.append(separator + 2)
+
+    if boundaries[-1] < size:
+        boundaries.append(size)
+
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def parse_range(
+    file_path: Path, start: int, end: int, dist_release: str
+) -> list[PackageRecord]:
+    """Parse the stanzas of a metadata file between two byte offsets."""
+    with open(file_path, "rb") as file, mmap(
+        file.fileno(), 0, access=ACCESS_READ
+    ) as mm:
+        text = mm[start:end].decode("utf-8")
+
+    return list(Ubuntu.iter_packages(text.splitlines(keepends=True), dist_release))
+
+
 class Ubuntu(Package):
     @staticmethod
     def parse_metadata(file_path: Path, dist_release: str) -> list["Package"]:
@@ -32,81 +149,306 @@ class Ubuntu(Package):
         List[Package]
             A list of Package objects representing Ubuntu packages.
         """
+        return [
+            Ubuntu.from_record(record)
+            for record in Ubuntu.iter_metadata(file_path, dist_release)
+        ]
+
+    @staticmethod
+    def iter_metadata(
+        file_path: Path, dist_release: str, jobs: int = 1
+    ) -> Iterator[PackageRecord]:
+        """Lazily parse Ubuntu metadata file one stanza at a time.
+
+        The file is read line by line and stays open until the iterator is
+        exhausted, so memory use is bounded by the largest stanza.
+
+        Parameters
+        ----------
+        file_path : Path
+            Path to the Ubuntu metadata file to be parsed.
+        dist_release : str
+            The release name.
+        jobs : int
+            Number of processes parsing the file. Files smaller than
+            PARALLEL_MIN_SIZE are always parsed in the current process.
+
+        Returns
+        -------
+        Iterator[PackageRecord]
+            Package records in the order their stanzas appear in the file.
+        """
+        if jobs > 1 and file_path.stat().st_size >= PARALLEL_MIN_SIZE:
+            yield from Ubuntu.iter_metadata_parallel(file_path, dist_release, jobs)
+            return
+
         with open(file_path, encoding="utf-8") as file:
-            file_content = file.read()
-            ubuntu_packages: list[Package] = []
-
-            blocks = split(r"\n(?=Package:)", file_content)
-            for block in blocks:
-                if block.strip():
-                    lines = block.strip().split("\n")
-                    package_info = Ubuntu()
-
-                    for line in lines:
-                        key, value = split(r":\s*", line, 1)
-                        try:
-                            setattr(package_info, key.lower().replace("-", "_"), value)
-                        except AttributeError:
-                            logging.warning(
-                                "Ubuntu package field %s was not set. "
-                                "Skipping value: %s",
-                                key,
-                                value,
-                            )
-                            pass
-
-                    package_info.release = dist_release
-                    ubuntu_packages.append(package_info)
-
-        return ubuntu_packages
-
-    @staticmethod
-    def init(
-        tmp_dir: Path,
-        config: dict[str, dict[str, dict[str, dict[str, str]]]],
-        db_suffix: str,
-        output_path: Path,
-    ) -> None:
-        """Initialize the Ubuntu database.
+            yield from Ubuntu.iter_packages(file, dist_release)
+
+    @staticmethod
+    def iter_metadata_parallel(
+        file_path: Path, dist_release: str, jobs: int
+    ) -> Iterator[PackageRecord]:
+        """Parse Ubuntu metadata file in a pool of processes.
+
+        The file is split at blank lines between stanzas into roughly equal
+        byte ranges. Each range is parsed in a separate process and the results
+        are yielded in their original order.
 
         Parameters
         ----------
-        tmp_dir : Path
-            Temporary directory to store intermediate files.
-        config : Dict[str, Dict[str, Dict[str, Dict[str, str]]]]
-            Configuration dictionary containing information about sources.
-        db_suffix : str
-            Suffix to be added to the database name.
-        output_path : Path
-            Output path for the initialized database.
+        file_path : Path
+            Path to the Ubuntu metadata file to be parsed.
+        dist_release : str
+            The release name.
+        jobs : int
+            Number of processes parsing the file.
 
         Returns
         -------
-        None
+        Iterator[PackageRecord]
+            Package records in the order their stanzas appear in the file.
         """
-        try:
-            for release in config["ubuntu"].keys():
-                logging.info("Fetching ubuntu archives.")
-                fetch_and_save_metadata(config, "ubuntu", tmp_dir)
-
-                logging.info("Extracting ubuntu xz archives.")
-                process_archives(
-                    input_dir=tmp_dir,
-                    output_dir=tmp_dir,
-                    file_extension=".txt",
-                    archive_extension=".xz",
-                    extractor=extract_xz_archive,
-                )
-
-                logging.info("Processing metadata into ubuntu database.")
-                db_path = database.init(
-                    db_name=f"ubuntu_{release}{db_suffix}", output_path=output_path
-                )
-                deserialize_ubuntu_metadata(tmp_dir, db_path, "ubuntu", release)
-        except Exception:
-            logging.exception(
-                "There was an exception trying to initialize ubuntu database."
+        ranges = stanza_ranges(file_path, jobs)
+
+        if len(ranges) < 2:
+            with open(file_path, encoding="utf-8") as file:
+                yield from Ubuntu.iter_packages(file, dist_release)
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(ranges)), mp_context=PROCESS_CONTEXT
+        ) as executor:
+            chunks = executor.map(
+                parse_range,
+                repeat(file_path),
+                [start for start, _ in ranges],
+                [end for _, end in ranges],
+                repeat(dist_release),
             )
+            for packages in chunks:
+                yield from packages
+
+    @staticmethod
+    def iter_packages(
+        lines: Iterable[str], dist_release: str
+    ) -> Iterator[PackageRecord]:
+        """Parse lines of Ubuntu metadata and yield package records one at a time.
+
+        Fields are looked up in a precomputed dispatch table. Fields that aren't
+        stored, such as Filename or SHA256, are skipped without being parsed.
+
+        Parameters
+        ----------
+        lines : Iterable[str]
+            Lines of the Ubuntu metadata. Stanzas are separated by blank lines.
+        dist_release : str
+            The release name.
+
+        Returns
+        -------
+        Iterator[PackageRecord]
+            Package records in the order their stanzas appear in the input.
+        """
+        dispatch = FIELD_DISPATCH
+        dist_release = intern(dist_release)
+        values: dict[str, str] = {}
+        field: str | None = None
+
+        for line in lines:
+            if line[:1] in CONTINUATION and not line.isspace():
+                if field is not None:
+                    values[field] = f"{values[field]}\n{line.strip()}"
+                continue
+
+            if not line or line.isspace():
+                if values:
+                    yield Ubuntu.make_record(values, dist_release)
+                    values = {}
+                field = None
+                continue
+
+            key, sep, value = line.partition(":")
+            if not sep:
+                logging.warning("Skipping malformed Ubuntu metadata line: %s", line)
+                field = None
+                continue
+
+            try:
+                field = dispatch[key]
+            except KeyError:
+                field = resolve_field(key)
+
+            if field is not None:
+                values[field] = value.strip()
+
+        if values:
+            yield Ubuntu.make_record(values, dist_release)
+
+    @staticmethod
+    def make_record(values: dict[str, str], dist_release: str) -> PackageRecord:
+        """Build a package record from raw values keyed by record field names.
+
+        Package names, architectures and relation entries are interned,
+        so values repeated across packages are stored once.
+        """
+        get = values.get
+        return PackageRecord(
+            intern(get("package", "")),
+            intern(get("architecture", "")),
+            get("version", ""),
+            dist_release,
+            get("description", ""),
+            *[
+                NO_RELATIONS
+                if (value := get(field)) is None
+                else intern_relations(value)
+                for field in RELATION_FIELDS
+            ],
+        )
+
+    @staticmethod
+    def from_record(record: PackageRecord) -> "Ubuntu":
+        """Build a full Package object from a package record."""
+        package_info = Ubuntu()
+
+        for field, value in record._asdict().items():
+            if isinstance(value, tuple):
+                setattr(package_info, f"_{field}", list(value))
+            else:
+                setattr(package_info, f"_{field}", value)
+
+        return package_info
+
+    @staticmethod
+    def database_name(release: str, branch: str, arch: str) -> str:
+        """Get the name of the database that stores a given source.
+
+        All branches and architectures of a release share one database.
+        """
+        return f"ubuntu_{release}{DB_SUFFIX}"
+
+    @staticmethod
+    def extracted_suffix() -> str:
+        """Get the file extension of extracted Ubuntu archives."""
+        return ".txt"
+
+    @staticmethod
+    def index_diff_url(url: str) -> str | None:
+        """Get the URL of the pdiff index published next to a Packages index."""
+        base_url, _, name = url.rpartition("/")
+        if not name.startswith("Packages"):
+            return None
+        return f"{base_url}/Packages.diff/Index"
+
+    @staticmethod
+    def repomd_url(url: str) -> str | None:
+        """Ubuntu sources always point at a Packages index."""
+        return None
+
+    @staticmethod
+    def load(
+        db_path: Path, files: list[Path], release: str, jobs: int = 1
+    ) -> LoadStats:
+        """Build the Ubuntu database of a release from extracted metadata files.
+
+        Parameters
+        ----------
+        db_path : Path
+            Path to the database that will be (re)initialized.
+        files : list[Path]
+            Extracted metadata files of every source of the release.
+        release : str
+            The release name.
+        jobs : int
+            Number of processes loading the metadata files. Several files
+            are loaded into separate shards in parallel and merged, a single
+            file is parsed in parallel.
+
+        Returns
+        -------
+        LoadStats
+            Numbers of inserted and dropped duplicate packages.
+        """
+        logging.info("Processing metadata into ubuntu database.")
+        db_path = database.init(
+            db_name=db_path.name, output_path=db_path.parent, indexes=False
+        )
+
+        stats = load_files(files, db_path, "ubuntu", release, jobs)
+
+        database.create_indexes(db_path)
+        return stats
+
+    @staticmethod
+    def update(
+        db_path: Path, files: list[Path], release: str, jobs: int = 1
+    ) -> LoadStats:
+        """Apply only the changes of new metadata files to an Ubuntu database.
+
+        Databases built with an older schema are rebuilt.
+
+        Parameters
+        ----------
+        db_path : Path
+            Path to a loaded database of the release.
+        files : list[Path]
+            Extracted metadata files of every source of the release.
+        release : str
+            The release name.
+        jobs : int
+            Number of processes parsing each metadata file.
+
+        Returns
+        -------
+        LoadStats
+            Numbers of inserted, dropped duplicate, replaced and deleted packages.
+        """
+        if database.schema_version(db_path) != database.SCHEMA_VERSION:
+            logging.info("%s has an older schema, rebuilding.", db_path.name)
+            return Ubuntu.load(db_path, files, release, jobs)
+
+        logging.info("Applying metadata changes to ubuntu database.")
+        packages = chain.from_iterable(
+            Ubuntu.iter_metadata(file_path, release, jobs) for file_path in files
+        )
+        return apply_changes(packages, db_path)
+
+    @staticmethod
+    def load_stream(
+        db_path: Path, streams: list[Iterator[bytes]], release: str
+    ) -> LoadStats:
+        """Build the Ubuntu database of a release from decompressed metadata streams.
+
+        Packages are inserted while the streams are being read,
+        so no intermediate files are written.
+
+        Parameters
+        ----------
+        db_path : Path
+            Path to the database that will be (re)initialized.
+        streams : list[Iterator[bytes]]
+            Decompressed metadata of every source of the release.
+        release : str
+            The release name.
+
+        Returns
+        -------
+        LoadStats
+            Numbers of inserted and dropped duplicate packages.
+        """
+        logging.info("Streaming metadata into ubuntu database.")
+        db_path = database.init(
+            db_name=db_path.name, output_path=db_path.parent, indexes=False
+        )
+
+        stats = LoadStats()
+        for chunks in streams:
+            packages = Ubuntu.iter_packages(iter_lines(chunks), release)
+            stats = stats.merge(insert_packages_into_db(packages, db_path))
+
+        database.create_indexes(db_path)
+        return stats
 
     @staticmethod
     def get_all_archs() -> set[str]:
@@ -117,27 +459,33 @@ class Ubuntu(Package):
     def get_stored_packages() -> set[str]:
         """Get the set of all distinct package names stored in Ubuntu databases.
 
+        Names are read from the catalog once it is built, otherwise
+        every database is scanned.
+
         Returns
         -------
         set[str]
             Set containing all distinct package names stored in Ubuntu databases.
         """
+        if catalog.is_built(DATABASE_DIR, "ubuntu"):
+            return set(
+                catalog.iter_names(DATABASE_DIR, "ubuntu", Ubuntu.get_all_archs())
+            )
+
         res: set[str] = set()
 
         databases = list_files_in_directory(DATABASE_DIR / "ubuntu")
 
         for db_path in databases:
-            db_con = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            db_con = readers.get(db_path)
 
             for arch in Ubuntu.get_all_archs():
                 res.update(database.find_all_distinct(db_con, arch))
 
-            db_con.close()
-
         return res
 
     @staticmethod
-    def get_dependencies(arch: str, pkg: str) -> set[str]:
+    def get_dependencies(arch: str, pkg: str, versions: bool = True) -> set[str]:
         """Get the dependencies of a package for a specific architecture in Ubuntu.
 
         Parameters
@@ -146,6 +494,8 @@ class Ubuntu(Package):
             The target architecture for which dependencies are retrieved.
         pkg : str
             The name of the package for which dependencies are retrieved.
+        versions : bool
+            Include version constraints of the dependencies.
 
         Returns
         -------
@@ -165,21 +515,56 @@ class Ubuntu(Package):
         if db_not_exists(db):
             return set()
 
-        db_con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
+        db_con = readers.get(db)
 
-        res = database.find_dependencies(
+        res = database.find_relations(
             db_con=db_con,
             table="depends",
             arch=arch,
             name=pkg,
+            versions=versions,
         )
 
-        db_con.close()
+        return res
+
+    @staticmethod
+    def get_descriptions(arch: str, pkg: str) -> dict[str, str | None]:
+        """Get the descriptions of a package for a specific architecture in Ubuntu.
+
+        Parameters
+        ----------
+        arch : str
+            The target architecture for which descriptions are retrieved.
+        pkg : str
+            The name of the package for which descriptions are retrieved.
+
+        Returns
+        -------
+        dict[str, str | None]
+            Description of every stored version of the package,
+            None if descriptions were not stored.
+
+        Note
+        ----
+        The release version is set to "jammy".
+        """
+        from depinspect.validator import db_not_exists
+
+        release = "jammy"
+
+        db = DATABASE_DIR / "ubuntu" / f"ubuntu_{release}{DB_SUFFIX}"
+
+        if db_not_exists(db):
+            return {}
+
+        db_con = readers.get(db)
+
+        res = database.find_descriptions(db_con=db_con, arch=arch, name=pkg)
 
         return res
 
     @staticmethod
-    def get_divergent(arch_a: str, arch_b: str) -> set[str]:
+    def get_divergent(arch_a: str, arch_b: str, versions: bool = True) -> set[str]:
         """Find packages with divergent dependencies between two architectures.
 
         Parameters
@@ -188,6 +573,9 @@ class Ubuntu(Package):
             The first target architecture for comparison.
         arch_b : str
             The second target architecture for comparison.
+        versions : bool
+            Treat dependencies that differ only in the required version
+            as divergent.
 
         Returns
         -------
@@ -200,8 +588,6 @@ class Ubuntu(Package):
         """
         from depinspect.validator import db_not_exists
 
-        res: set[str] = set()
-
         release = "jammy"
 
         db = DATABASE_DIR / "ubuntu" / f"ubuntu_{release}{DB_SUFFIX}"
@@ -209,20 +595,14 @@ class Ubuntu(Package):
         if db_not_exists(db):
             return set()
 
-        db_con = sqlite3.connect(f"file:{db}?mode=ro", uri=True)
-
-        pkgs = Ubuntu.get_stored_packages()
+        db_con = readers.get(db)
 
-        for pkg in pkgs:
-            depends_a = database.find_dependencies(
-                db_con=db_con, table="depends", arch=arch_a, name=pkg
-            )
-            depends_b = database.find_dependencies(
-                db_con=db_con, table="depends", arch=arch_b, name=pkg
-            )
-            if not (depends_a.issubset(depends_b) and depends_b.issubset(depends_a)):
-                res.add(pkg)
-
-        db_con.close()
+        res = database.find_divergent(
+            db_con=db_con,
+            table="depends",
+            arch_a=arch_a,
+            arch_b=arch_b,
+            versions=versions,
+        )
 
         return res
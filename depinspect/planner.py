@@ -0,0 +1,600 @@
+import logging
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Literal, NamedTuple
+
+from depinspect.archives.cache import write_validators
+from depinspect.archives.extractor import (
+    extract_archives,
+    extract_bz2_archive,
+    extract_xz_archive,
+)
+from depinspect.archives.fetcher import PDIFF, FetchResult, fetch_all
+from depinspect.archives.pdiff import patch_index, store_index
+from depinspect.archives.repomd import (
+    PrimaryDb,
+    matches,
+    resolve_primary_db,
+    verify_stream,
+)
+from depinspect.archives.stream import decompress_stream, stream_from_url
+from depinspect.constants import SETTINGS
+from depinspect.database import generation
+from depinspect.distributions.mapping import distro_class_mapping
+from depinspect.distributions.package import LoadStats
+
+UPDATE_SETTINGS = SETTINGS.get("update", {})
+
+EXTRACT_WORKERS: int = UPDATE_SETTINGS.get("extract_workers", 4)
+
+LOAD_WORKERS: int = UPDATE_SETTINGS.get("load_workers", 2)
+
+EXTRACTORS: dict[str, Callable[[Path, Path], None]] = {
+    ".xz": extract_xz_archive,
+    ".bz2": extract_bz2_archive,
+}
+
+
+class SourceError(Exception):
+    """A source of a database couldn't be fetched, verified or extracted."""
+
+
+class Job(NamedTuple):
+    """A single configured source of metadata."""
+
+    distro: str
+    release: str
+    branch: str
+    arch: str
+    url: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.distro}_{self.release}_{self.branch}_{self.arch}"
+
+    @property
+    def archive_ext(self) -> str:
+        return self.url.split(".")[-1]
+
+    @property
+    def archive_name(self) -> str:
+        return f"{self.name}.{self.archive_ext}"
+
+    @property
+    def db_name(self) -> str:
+        return distro_class_mapping[self.distro].database_name(
+            self.release, self.branch, self.arch
+        )
+
+    @property
+    def index_name(self) -> str:
+        return f"{self.name}{distro_class_mapping[self.distro].extracted_suffix()}"
+
+    @property
+    def diff_url(self) -> str | None:
+        return distro_class_mapping[self.distro].index_diff_url(self.url)
+
+
+def plan_jobs(config: dict[str, dict[str, dict[str, dict[str, str]]]]) -> list[Job]:
+    """Build the list of update jobs from the configuration.
+
+    Parameters
+    ----------
+    config : dict[str, dict[str, dict[str, dict[str, str]]]]
+        Configuration dictionary mapping distro, release, branch and arch to a URL.
+
+    Returns
+    -------
+    list[Job]
+        Jobs for every supported distribution in configuration order.
+        Jobs may share a URL, its archive is fetched and extracted once.
+    """
+    return [
+        Job(distro, release, branch, arch, url)
+        for distro, releases in config.items()
+        if distro in distro_class_mapping
+        for release, branches in releases.items()
+        for branch, archs in branches.items()
+        for arch, url in archs.items()
+    ]
+
+
+def resolve_job(job: Job, database_dir: Path) -> tuple[Job, PrimaryDb | None] | None:
+    """Resolve the source of a job, or return None if it should be skipped.
+
+    Raises
+    ------
+    SourceError
+        If repomd.xml of the source can't be fetched or parsed.
+    """
+    repomd_url = distro_class_mapping[job.distro].repomd_url(job.url)
+    if repomd_url is None:
+        return job, None
+
+    db_path = database_dir / job.distro / job.db_name
+    try:
+        primary = resolve_primary_db(repomd_url)
+        if db_path.is_file() and matches(db_path, primary.open_checksum):
+            logging.info("%s matches %s", db_path.name, repomd_url)
+            return None
+    except (OSError, ValueError) as e:
+        raise SourceError(f"Failed to resolve {job.url}: {e}") from e
+
+    return job._replace(url=primary.url), primary
+
+
+def resolve(
+    jobs: list[Job], database_dir: Path, max_workers: int
+) -> tuple[dict[Job, PrimaryDb | None], dict[Path, LoadStats | Exception]]:
+    """Resolve stage: find primary databases of sources given by a repository URL.
+
+    Returns
+    -------
+    dict[Job, PrimaryDb | None]
+        Jobs that need an update, with URLs pointing at archives, mapped to
+        checksums of the primary database if it was resolved from repomd.xml.
+        Databases that already match the checksum of their repository are left out.
+    dict[Path, LoadStats | Exception]
+        The error for every database with a source that couldn't be resolved.
+        Other sources of these databases are left out as well.
+    """
+    primaries: dict[Job, PrimaryDb | None] = {}
+    failed: dict[Path, LoadStats | Exception] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(resolve_job, job, database_dir) for job in jobs]
+
+    for job, future in zip(jobs, futures):
+        db_path = database_dir / job.distro / job.db_name
+        try:
+            result = future.result()
+        except SourceError as e:
+            logging.error("Keeping the current %s: %s", db_path.name, e)
+            failed.setdefault(db_path, e)
+            continue
+        if result is not None:
+            primaries[result[0]] = result[1]
+
+    return {
+        job: primary
+        for job, primary in primaries.items()
+        if database_dir / job.distro / job.db_name not in failed
+    }, failed
+
+
+def patch_job(job: Job, cache_dir: Path, output_dir: Path) -> FetchResult | None:
+    """Patch the cached index of a job, or return None to fall back.
+
+    The patched index is written to the output directory, the cached one
+    is kept until the database built from it is promoted.
+    """
+    index_path = cache_dir / job.distro / job.index_name
+
+    if job.diff_url is None or not index_path.is_file():
+        return None
+
+    output_path = output_dir / job.distro / job.index_name
+    Path.mkdir(output_path.parent, parents=True, exist_ok=True)
+
+    try:
+        modified = patch_index(job.diff_url, index_path, output_path)
+    except (OSError, ValueError) as e:
+        logging.warning("Falling back to a full download of %s: %s", job.url, e)
+        return None
+
+    return FetchResult(output_path if modified else index_path, modified)
+
+
+def patch(
+    jobs: list[Job], cache_dir: Path, output_dir: Path, max_workers: int
+) -> dict[Job, FetchResult]:
+    """Patch stage: bring cached indices up to date with pdiff patches.
+
+    Returns
+    -------
+    dict[Job, FetchResult]
+        Up to date indices of the jobs that don't need a full download.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(
+            partial(patch_job, cache_dir=cache_dir, output_dir=output_dir), jobs
+        )
+        return {job: result for job, result in zip(jobs, results) if result is not None}
+
+
+def keep_indices(indices: dict[Job, Path], cache_dir: Path) -> None:
+    """Keep indices that later updates can patch instead of downloading."""
+    for job, path in indices.items():
+        index_path = cache_dir / job.distro / job.index_name
+        if job.diff_url is not None and path != index_path:
+            store_index(path, index_path)
+
+
+def promoted_jobs(
+    planned: dict[Path, list[Job]], results: dict[Path, LoadStats | Exception]
+) -> list[Job]:
+    """Get jobs whose source went only into databases that were promoted."""
+    promoted: dict[str, bool] = {}
+    for db_path, unit_jobs in planned.items():
+        for job in unit_jobs:
+            promoted[job.url] = promoted.get(job.url, True) and isinstance(
+                results.get(db_path), LoadStats
+            )
+
+    return [
+        job for unit_jobs in planned.values() for job in unit_jobs if promoted[job.url]
+    ]
+
+
+def commit_sources(jobs: list[Job], fetched: dict[Job, FetchResult]) -> None:
+    """Store validators of fetched archives of jobs whose databases were promoted.
+
+    Until then, the next update doesn't count the archives as unmodified,
+    so a database that failed to build is built again.
+    """
+    for job in jobs:
+        result = fetched[job]
+        if result.validators is not None:
+            write_validators(result.path, job.url, result.validators)
+
+
+def download(
+    jobs: list[Job], cache_dir: Path, max_workers: int, max_per_host: int
+) -> dict[Job, FetchResult]:
+    """Download stage: fetch every distinct URL once into the archive cache."""
+    targets: dict[str, Path] = {}
+    for job in jobs:
+        targets.setdefault(job.url, cache_dir / job.distro / job.archive_name)
+
+    for path in targets.values():
+        Path.mkdir(path.parent, parents=True, exist_ok=True)
+
+    results = fetch_all(targets, max_workers, max_per_host, store_validators=False)
+
+    return {job: results[job.url] for job in jobs}
+
+
+def extract(archives: dict[Job, Path], output_dir: Path, jobs: int) -> dict[Job, Path]:
+    """Extract stage: decompress archives of jobs in a pool of processes.
+
+    Returns
+    -------
+    dict[Job, Path]
+        Extracted files of the jobs that were processed successfully.
+        Jobs sharing an archive share the file extracted from it.
+    """
+    tasks: list[tuple[Callable[[Path, Path], None], Path, Path]] = []
+    extracted: dict[Path, Path] = {}
+    outputs: dict[Path, list[Job]] = {}
+
+    for job, archive_path in archives.items():
+        extractor = EXTRACTORS.get(archive_path.suffix)
+        if extractor is None:
+            logging.error("Unsupported archive format: %s", archive_path.name)
+            continue
+
+        out_file_path = extracted.get(archive_path)
+        if out_file_path is None:
+            suffix = distro_class_mapping[job.distro].extracted_suffix()
+            out_file_path = output_dir / job.distro / f"{job.name}{suffix}"
+            Path.mkdir(out_file_path.parent, parents=True, exist_ok=True)
+
+            tasks.append((extractor, archive_path, out_file_path))
+            extracted[archive_path] = out_file_path
+
+        outputs.setdefault(out_file_path, []).append(job)
+
+    results = extract_archives(tasks, jobs)
+
+    return {
+        job: out_file_path
+        for out_file_path, error in results.items()
+        if error is None
+        for job in outputs[out_file_path]
+    }
+
+
+def verified(
+    file_path: Path,
+    primary: PrimaryDb | None,
+    field: Literal["checksum", "open_checksum"],
+) -> bool:
+    """Check a file against a checksum of its primary database from repomd.xml."""
+    if primary is None:
+        return True
+
+    if matches(file_path, getattr(primary, field)):
+        return True
+
+    logging.error("%s doesn't match the %s from repomd.xml", file_path.name, field)
+    return False
+
+
+def usable_archive(job: Job, result: FetchResult, primary: PrimaryDb | None) -> Path:
+    """Get the fetched archive of a job, checked against repomd.xml.
+
+    Raises
+    ------
+    SourceError
+        If the archive failed to download, is missing or doesn't match
+        the checksum of its primary database.
+    """
+    if result.error is not None:
+        raise SourceError(f"Failed to fetch {job.url}: {result.error}")
+
+    if not result.path.is_file():
+        raise SourceError(f"No archive is available for {job.url}")
+
+    if not verified(result.path, primary, "checksum"):
+        # Discard the cached archive, so it is downloaded again.
+        result.path.unlink()
+        raise SourceError(f"{result.path.name} doesn't match repomd.xml")
+
+    return result.path
+
+
+def build_generation(
+    db_path: Path, build: Callable[[Path], LoadStats], seed: bool = False
+) -> LoadStats:
+    """Build the next generation of a database in staging and swap it in.
+
+    The current database stays readable for the whole build and is
+    replaced only if the new generation passes validation. A seeded
+    build starts from a copy of the current database.
+    """
+    if seed:
+        new_path = generation.stage_copy(db_path)
+    else:
+        new_path = generation.staging_path(db_path)
+
+    try:
+        stats = build(new_path)
+        generation.promote(db_path)
+    finally:
+        new_path.unlink(missing_ok=True)
+
+    return stats
+
+
+def build_databases(
+    tasks: dict[Path, Callable[[], LoadStats]], max_workers: int
+) -> dict[Path, LoadStats | Exception]:
+    """Run database building tasks in parallel and collect a result for each."""
+    results: dict[Path, LoadStats | Exception] = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(task): db_path for db_path, task in tasks.items()}
+        for future in as_completed(futures):
+            db_path = futures[future]
+            try:
+                results[db_path] = future.result()
+                logging.info("Database %s has been updated.", db_path.name)
+            except Exception as e:
+                results[db_path] = e
+                logging.exception("Failed to load %s", db_path.name)
+
+    return results
+
+
+def load(
+    units: dict[Path, list[tuple[Job, Path]]],
+    max_workers: int,
+    jobs: int = 1,
+    incremental: bool = False,
+) -> dict[Path, LoadStats | Exception]:
+    """Load stage: build every database from its extracted files in parallel.
+
+    Each metadata file is parsed by up to jobs processes. In incremental
+    mode, only the changes are applied to a copy of an existing database.
+    """
+    tasks: dict[Path, Callable[[], LoadStats]] = {}
+
+    for db_path, files in units.items():
+        distro_class = distro_class_mapping[files[0][0].distro]
+        seed = incremental and db_path.is_file()
+        build = distro_class.update if seed else distro_class.load
+
+        tasks[db_path] = partial(
+            build_generation,
+            db_path,
+            partial(
+                build,
+                # A file shared by several sources is parsed once.
+                files=list(dict.fromkeys(file for _, file in files)),
+                release=files[0][0].release,
+                jobs=jobs,
+            ),
+            seed,
+        )
+
+    return build_databases(tasks, max_workers)
+
+
+def source_stream(job: Job, primary: PrimaryDb | None) -> Iterator[bytes]:
+    """Decompressed stream of a job, checked against repomd.xml on the way.
+
+    A stream that doesn't match raises ValueError once it is consumed,
+    so the database being written from it is never promoted.
+    """
+    chunks = stream_from_url(job.url)
+    if primary is None:
+        return decompress_stream(chunks, job.archive_ext)
+
+    return verify_stream(
+        decompress_stream(
+            verify_stream(chunks, primary.checksum, job.archive_name),
+            job.archive_ext,
+        ),
+        primary.open_checksum,
+        job.index_name,
+    )
+
+
+def load_streams(
+    units: dict[Path, list[Job]],
+    primaries: dict[Job, PrimaryDb | None],
+    max_workers: int,
+) -> dict[Path, LoadStats | Exception]:
+    """Streaming ingest: build every database straight from HTTP responses.
+
+    Responses are decompressed and consumed in bounded chunks, so neither
+    archives nor extracted files are written to disk. Sources resolved from
+    repomd.xml are hashed as they are read.
+    """
+    tasks: dict[Path, Callable[[], LoadStats]] = {
+        db_path: partial(
+            build_generation,
+            db_path,
+            partial(
+                distro_class_mapping[jobs[0].distro].load_stream,
+                streams=[source_stream(job, primaries[job]) for job in jobs],
+                release=jobs[0].release,
+            ),
+        )
+        for db_path, jobs in units.items()
+    }
+
+    return build_databases(tasks, max_workers)
+
+
+def run_update(
+    config: dict[str, dict[str, dict[str, dict[str, str]]]],
+    tmp_dir: Path,
+    cache_dir: Path,
+    database_dir: Path,
+    max_workers: int,
+    max_per_host: int,
+    extract_workers: int = EXTRACT_WORKERS,
+    load_workers: int = LOAD_WORKERS,
+    stream: bool = False,
+    incremental: bool = False,
+    pdiff: bool = PDIFF,
+) -> dict[Path, LoadStats | Exception]:
+    """Plan and run an update of all configured databases.
+
+    Every archive is downloaded and extracted once, however many jobs share
+    its URL, and every extracted file is loaded once into its database. Databases
+    whose sources weren't modified upstream since the last update are skipped.
+    Sources given by a repository URL are resolved through repomd.xml first.
+    Every other database is built as a new generation next to the current one,
+    which is replaced atomically once the new generation is validated.
+
+    Parameters
+    ----------
+    config : dict[str, dict[str, dict[str, dict[str, str]]]]
+        Configuration dictionary mapping distro, release, branch and arch to a URL.
+    tmp_dir : Path
+        Temporary directory for extracted files.
+    cache_dir : Path
+        Directory where fetched archives are kept between updates.
+    database_dir : Path
+        Directory with a subdirectory of databases for each distribution.
+    max_workers : int
+        Maximum number of downloads running at the same time.
+    max_per_host : int
+        Maximum number of downloads running at the same time against one host.
+    extract_workers : int
+        Number of processes extracting archives and parsing extracted files.
+    load_workers : int
+        Number of databases loaded at the same time.
+    stream : bool
+        Stream every source straight into its database instead of going through
+        the archive cache. Every database is rebuilt unconditionally.
+    incremental : bool
+        Apply only new, changed and removed packages to existing databases
+        instead of rebuilding them. Not used when streaming.
+    pdiff : bool
+        Patch cached indices with pdiff patches where the mirror publishes
+        them, and download full archives only when that fails.
+
+    Returns
+    -------
+    dict[Path, LoadStats | Exception]
+        Load statistics for every database that was rebuilt, or the error for
+        every database that was kept because building it failed. A database
+        is kept as well when any of its sources can't be resolved, fetched,
+        verified or extracted.
+    """
+    # A database is rebuilt only from all of its sources. If any of them
+    # fails, the current generation is kept and the failure is reported.
+    primaries, failed = resolve(plan_jobs(config), database_dir, max_workers)
+    jobs = list(primaries)
+
+    planned: dict[Path, list[Job]] = {}
+    for job in jobs:
+        planned.setdefault(database_dir / job.distro / job.db_name, []).append(job)
+
+    for db_path in planned:
+        Path.mkdir(db_path.parent, parents=True, exist_ok=True)
+
+    if stream:
+        logging.info("Streaming %d sources into %d databases.", len(jobs), len(planned))
+        return failed | load_streams(planned, primaries, load_workers)
+
+    patched = patch(jobs, cache_dir, tmp_dir, max_workers) if pdiff else {}
+
+    remaining = [job for job in jobs if job not in patched]
+    logging.info("Fetching %d archives.", len(remaining))
+    fetched = download(remaining, cache_dir, max_workers, max_per_host)
+    fetched.update(patched)
+
+    pending: dict[Path, list[Job]] = {}
+    archives: dict[Job, Path] = {}
+    indices: dict[Job, Path] = {}
+    for db_path, unit_jobs in planned.items():
+        unit_modified = any(fetched[job].modified for job in unit_jobs)
+        unit_failed = any(fetched[job].error is not None for job in unit_jobs)
+
+        if not (unit_modified or unit_failed) and db_path.is_file():
+            logging.info("%s is up to date.", db_path.name)
+            continue
+
+        try:
+            unit_archives = {
+                job: usable_archive(job, fetched[job], primaries[job])
+                for job in unit_jobs
+                if job not in patched
+            }
+        except SourceError as e:
+            logging.error("Keeping the current %s: %s", db_path.name, e)
+            failed[db_path] = e
+            continue
+
+        archives.update(unit_archives)
+        indices.update({job: patched[job].path for job in unit_jobs if job in patched})
+        pending[db_path] = unit_jobs
+
+    logging.info("Extracting %d archives.", len(archives))
+    extracted = extract(archives, tmp_dir, extract_workers)
+    extracted = {
+        job: path
+        for job, path in extracted.items()
+        if verified(path, primaries[job], "open_checksum")
+    }
+    extracted.update(indices)
+
+    units: dict[Path, list[tuple[Job, Path]]] = {}
+    for db_path, unit_jobs in pending.items():
+        missing = [job.url for job in unit_jobs if job not in extracted]
+        if missing:
+            failed[db_path] = SourceError(
+                f"Failed to extract or verify {', '.join(missing)}"
+            )
+            logging.error("Keeping the current %s: %s", db_path.name, failed[db_path])
+        else:
+            units[db_path] = [(job, extracted[job]) for job in unit_jobs]
+
+    logging.info("Loading %d databases.", len(units))
+    results = failed | load(units, load_workers, extract_workers, incremental)
+
+    # Cached sources move on only with the databases built from them.
+    promoted = promoted_jobs(planned, results)
+    commit_sources(promoted, fetched)
+    if pdiff:
+        keep_indices(
+            {job: extracted[job] for job in promoted if job in extracted}, cache_dir
+        )
+
+    return results
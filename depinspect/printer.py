@@ -1,5 +1,10 @@
+from collections.abc import Iterable
+from pathlib import Path
+
 from click import echo
 
+from depinspect.distributions.package import LoadStats
+
 MAX_CHAR_LENGTH = 80
 
 
@@ -108,7 +113,23 @@ def diff(
         )
 
 
-def list_all(distro: str, archs: set[str], pkgs: set[str]) -> None:
+def info(
+    distro: str, arch: str, name: str, descriptions: dict[str, str | None]
+) -> None:
+    """Print the description of every stored version of a package."""
+    echo(f"Package: {name}")
+    echo(f"Distribution: {distro}")
+    echo(f"Architecture: {arch}\n")
+
+    if not descriptions:
+        echo("Package is not stored.")
+        return
+
+    for version, description in sorted(descriptions.items()):
+        echo(f"{version}: {description or '(no description stored)'}")
+
+
+def list_all(distro: str, archs: set[str], pkgs: Iterable[str]) -> None:
     """Print information about architectures, and packages.
 
     Parameters
@@ -117,8 +138,9 @@ def list_all(distro: str, archs: set[str], pkgs: set[str]) -> None:
         The name of the Linux distribution.
     archs : set[str]
         Set of architectures available for the distribution.
-    pkgs : set[str]
-        Set of package names available for the distribution.
+    pkgs : Iterable[str]
+        Package names available for the distribution, printed in the given
+        order as they come.
 
     Returns
     -------
@@ -129,7 +151,7 @@ def list_all(distro: str, archs: set[str], pkgs: set[str]) -> None:
     echo(f"Architectures: {', '.join(archs)}\n")
 
     echo("Packages:")
-    for pkg in sorted(pkgs):
+    for pkg in pkgs:
         echo(pkg)
 
 
@@ -142,3 +164,34 @@ def divergent(distro: str, arch_a: str, arch_b: str, pkgs: set[str]) -> None:
     echo("Packages:")
     for pkg in sorted(pkgs):
         echo(pkg)
+
+
+def update_summary(results: dict[Path, LoadStats | Exception]) -> None:
+    """Print the outcome of an update for every rebuilt database."""
+    if not results:
+        echo("All databases are up to date.")
+        return
+
+    echo("Updated databases:")
+    for db_path, result in sorted(results.items()):
+        if isinstance(result, Exception):
+            echo(f"{db_path.name}: failed ({result!r})")
+        else:
+            summary = (
+                f"{db_path.name}: {result.packages} packages, "
+                f"{result.duplicates} duplicates dropped"
+            )
+            if result.replaced or result.deleted:
+                summary += f", {result.replaced} replaced, {result.deleted} deleted"
+            echo(summary)
+
+
+def rollback(distro: str, db_paths: list[Path]) -> None:
+    """Print the databases that were rolled back to the previous generation."""
+    if not db_paths:
+        echo(f"No previous generation is kept for {distro}.")
+        return
+
+    echo("Rolled back databases:")
+    for db_path in db_paths:
+        echo(db_path.name)
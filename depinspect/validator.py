@@ -4,7 +4,9 @@ from sqlite3 import Connection
 
 import click
 
-from depinspect.constants import DISTRIBUTIONS
+from depinspect.constants import DATABASE_DIR, DISTRIBUTIONS
+from depinspect.database import catalog
+from depinspect.database.connection import ReaderConnection
 from depinspect.distributions.mapping import distro_class_mapping
 
 
@@ -58,6 +60,23 @@ def validate_package_name(
         )
 
 
+def validate_package_stored(
+    ctx: click.Context,
+    distro: str,
+    arch: str,
+    package: str,
+) -> None:
+    """Validate that a package is stored, once the catalog of the distro is built."""
+    if not catalog.is_built(DATABASE_DIR, distro):
+        return
+
+    if not catalog.is_stored(DATABASE_DIR, distro, arch, package):
+        raise click.BadOptionUsage(
+            package,
+            f"{package} is not stored for {distro} {arch}.",
+        )
+
+
 def validate_diff_args(
     ctx: click.Context,
     param: click.Parameter,
@@ -82,14 +101,37 @@ def validate_diff_args(
         validate_distribution_name(ctx, distribution)
         validate_architecture_name(ctx, distribution, architecture)
         validate_package_name(ctx, package_name)
+        validate_package_stored(ctx, distribution, architecture, package_name)
+
+    return value
+
+
+def validate_info_args(
+    ctx: click.Context,
+    param: click.Parameter,
+    value: tuple[str, str, str],
+) -> tuple[str, str, str]:
+    """Validate the input arguments for the 'info' command."""
+    distribution, architecture, package_name = value
+
+    validate_distribution_name(ctx, distribution)
+    validate_architecture_name(ctx, distribution, architecture)
+    validate_package_name(ctx, package_name)
+    validate_package_stored(ctx, distribution, architecture, package_name)
 
     return value
 
 
 def is_valid_sql_table(db: Connection, table: str) -> bool:
-    """Check if a table exists in the SQLite database."""
+    """Check if a table exists in the SQLite database.
+
+    Tables of read-only connections are known without a query.
+    """
+    if isinstance(db, ReaderConnection):
+        return table in db.tables
+
     res = db.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-    tables = [elem["name"] for elem in res]
+    tables = [elem[0] for elem in res]
     return table in tables
 
 
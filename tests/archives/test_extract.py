@@ -1,9 +1,14 @@
+import bz2
 import lzma
 from pathlib import Path
 
 import pytest
 
-from depinspect.archives.extractor import extract_xz_archive
+from depinspect.archives.extractor import (
+    extract_bz2_archive,
+    extract_xz_archive,
+    process_archives,
+)
 
 
 def test_extract_xz_archive(tmp_path: Path) -> None:
@@ -43,3 +48,46 @@ def test_extract_xz_archive_corrupted_archive(tmp_path: Path) -> None:
     # Test case for handling a corrupted archive
     with pytest.raises(lzma.LZMAError):
         extract_xz_archive(archive_path, output_path)
+
+
+def test_extract_bz2_archive_in_small_chunks(tmp_path: Path) -> None:
+    data = b"Package: apt\n" * 10000
+    archive_path = tmp_path / "test_archive.bz2"
+    archive_path.write_bytes(bz2.compress(data))
+    output_path = tmp_path / "test_output.txt"
+
+    extract_bz2_archive(archive_path, output_path, buffer_size=1000)
+
+    assert output_path.read_bytes() == data
+
+
+def test_extract_xz_archive_keeps_output_on_failure(tmp_path: Path) -> None:
+    archive_path = tmp_path / "corrupted_archive.xz"
+    archive_path.write_bytes(lzma.compress(b"data" * 1000)[:-20])
+    output_path = tmp_path / "output.txt"
+    output_path.write_bytes(b"previous")
+
+    with pytest.raises(EOFError):
+        extract_xz_archive(archive_path, output_path)
+
+    assert output_path.read_bytes() == b"previous"
+    assert set(tmp_path.iterdir()) == {archive_path, output_path}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_process_archives_reports_errors_per_archive(tmp_path: Path, jobs: int) -> None:
+    for name in ("a", "b"):
+        (tmp_path / f"{name}.xz").write_bytes(lzma.compress(name.encode()))
+    (tmp_path / "broken.xz").write_bytes(b"corrupted_data")
+    (tmp_path / "a.txt").write_bytes(b"previous")
+
+    results = process_archives(
+        tmp_path, tmp_path, ".txt", ".xz", extract_xz_archive, jobs=jobs
+    )
+
+    assert results[tmp_path / "a.txt"] is None
+    assert results[tmp_path / "b.txt"] is None
+    assert isinstance(results[tmp_path / "broken.txt"], lzma.LZMAError)
+    assert (tmp_path / "a.txt").read_bytes() == b"a"
+    assert (tmp_path / "b.txt").read_bytes() == b"b"
+    assert not (tmp_path / "broken.txt").exists()
@@ -1,8 +1,11 @@
+from pathlib import Path
 from typing import Any
 from urllib import request
+from urllib.error import HTTPError
 
 import pytest
 
+from depinspect.archives.fetcher import FetchResult, fetch_all
 from depinspect.constants import PYPROJECT_TOML
 
 
@@ -31,3 +34,53 @@ def test_url_sources(
             for _, architectures in branches.items():
                 for _, url in architectures.items():
                     check_url(url)
+
+
+def test_fetch_all_collects_results_per_url(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    for name in ("a.xz", "b.xz", "c.bz2"):
+        (served_dir / name).write_bytes(name.encode())
+
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    targets = {
+        f"{http_server}/{name}": output_dir / name
+        for name in ("a.xz", "missing.xz", "b.xz", "c.bz2")
+    }
+
+    results = fetch_all(targets, max_workers=4, max_per_host=2)
+
+    assert set(results) == set(targets)
+    assert isinstance(results[f"{http_server}/missing.xz"].error, HTTPError)
+    for name in ("a.xz", "b.xz", "c.bz2"):
+        assert results[f"{http_server}/{name}"].error is None
+        assert results[f"{http_server}/{name}"].modified
+        assert (output_dir / name).read_bytes() == name.encode()
+    assert not (output_dir / "missing.xz").exists()
+
+
+def test_fetch_all_skips_unmodified_targets(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    (served_dir / "a.xz").write_bytes(b"first")
+    url = f"{http_server}/a.xz"
+    local_path = tmp_path / "a.xz"
+
+    assert fetch_all({url: local_path})[url].modified
+    assert fetch_all({url: local_path})[url] == FetchResult(local_path)
+    assert fetch_all({url: local_path}, conditional=False)[url].modified
+
+    # Validators that are not stored right away are returned instead.
+    (served_dir / "a.xz").write_bytes(b"second")
+    result = fetch_all({url: local_path}, conditional=False, store_validators=False)[
+        url
+    ]
+    assert result.modified
+    assert result.validators is not None and "last_modified" in result.validators
+
+
+def test_fetch_all_rejects_invalid_limits(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        fetch_all({}, max_workers=0)
@@ -0,0 +1,159 @@
+import gzip
+import hashlib
+import lzma
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from depinspect import planner
+from depinspect.archives.pdiff import apply_ed_script, patch_index
+from depinspect.distributions.package import LoadStats
+from depinspect.planner import run_update
+
+OLD = b"Package: apt\nVersion: 2.4.5\nDepends: adduser\n\nPackage: adduser\n"
+
+MIDDLE = b"Package: apt\nVersion: 2.4.6\nDepends: adduser\n\nPackage: adduser\n"
+
+NEW = b"Package: apt\nVersion: 2.4.6\nDepends: adduser, gpgv\n\nPackage: gpgv\n"
+
+# Commands are listed from the end of the file, as "diff --ed" does.
+PATCHES = {
+    "2023-12-01-0000.00": b"2c\nVersion: 2.4.6\n.\n",
+    "2023-12-02-0000.00": b"5c\nPackage: gpgv\n.\n3c\nDepends: adduser, gpgv\n.\n",
+}
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def serve_pdiff(served_dir: Path, current: bytes) -> None:
+    diff_dir = served_dir / "Packages.diff"
+    diff_dir.mkdir(parents=True, exist_ok=True)
+
+    history = [(OLD, "2023-12-01-0000.00"), (MIDDLE, "2023-12-02-0000.00")]
+    lines = [f"SHA256-Current: {sha256(current)} {len(current)}", "SHA256-History:"]
+    lines += [f" {sha256(old)} {len(old)} {name}" for old, name in history]
+    lines.append("SHA256-Patches:")
+    lines += [f" {sha256(p)} {len(p)} {name}" for name, p in PATCHES.items()]
+    lines.append("SHA256-Download:")
+    for name, patch in PATCHES.items():
+        compressed = gzip.compress(patch)
+        (diff_dir / f"{name}.gz").write_bytes(compressed)
+        lines.append(f" {sha256(compressed)} {len(compressed)} {name}.gz")
+
+    (diff_dir / "Index").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_apply_ed_script() -> None:
+    lines = [b"a\n", b"b\n", b"c\n", b"d\n"]
+
+    apply_ed_script(lines, b"4d\n2,3c\nB\nC\n.\n0a\nstart\n.\n")
+
+    assert lines == [b"start\n", b"a\n", b"B\n", b"C\n"]
+    with pytest.raises(ValueError):
+        apply_ed_script(lines, b"1w\n")
+
+
+def test_patch_index(served_dir: Path, http_server: str, tmp_path: Path) -> None:
+    serve_pdiff(served_dir, NEW)
+    index_path = tmp_path / "Packages.txt"
+    diff_url = f"{http_server}/Packages.diff/Index"
+
+    index_path.write_bytes(OLD)
+    assert patch_index(diff_url, index_path)
+    assert index_path.read_bytes() == NEW
+
+    # Only the newer patch applies to an index that is one version behind.
+    (served_dir / "Packages.diff" / "2023-12-01-0000.00.gz").unlink()
+    index_path.write_bytes(MIDDLE)
+    assert patch_index(diff_url, index_path)
+    assert index_path.read_bytes() == NEW
+
+    assert not patch_index(diff_url, index_path)
+
+    # A patched index can be written apart from the cached one.
+    output_path = tmp_path / "Packages.new"
+    index_path.write_bytes(MIDDLE)
+    assert patch_index(diff_url, index_path, output_path)
+    assert output_path.read_bytes() == NEW
+    assert index_path.read_bytes() == MIDDLE
+
+
+def test_patch_index_rejects_mismatch(
+    served_dir: Path, http_server: str, tmp_path: Path
+) -> None:
+    serve_pdiff(served_dir, NEW + b"Version: 1.0\n")
+    index_path = tmp_path / "Packages.txt"
+    diff_url = f"{http_server}/Packages.diff/Index"
+
+    index_path.write_bytes(OLD)
+    with pytest.raises(ValueError):
+        patch_index(diff_url, index_path)
+    assert index_path.read_bytes() == OLD
+
+    index_path.write_bytes(b"Package: unknown\n")
+    with pytest.raises(ValueError):
+        patch_index(diff_url, index_path)
+
+
+def test_run_update_with_pdiff(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    archive = served_dir / "Packages.xz"
+    archive.write_bytes(lzma.compress(OLD))
+    config = {"ubuntu": {"jammy": {"main": {"amd64": f"{http_server}/Packages.xz"}}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+
+    run_update(config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2)
+
+    # Only the patches are available, the full archive can't be used anymore.
+    serve_pdiff(served_dir, NEW)
+    archive.write_bytes(b"corrupted")
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+    )
+
+    assert list(results) == [db_path]
+    with sqlite3.connect(db_path) as db_con:
+        rows = db_con.execute("SELECT name, version FROM packages").fetchall()
+    assert sorted(rows) == [("apt", "2.4.6"), ("gpgv", "")]
+
+
+def test_run_update_keeps_cached_index_until_promoted(
+    tmp_path: Path,
+    served_dir: Path,
+    http_server: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    archive = served_dir / "Packages.xz"
+    archive.write_bytes(lzma.compress(OLD))
+    config = {"ubuntu": {"jammy": {"main": {"amd64": f"{http_server}/Packages.xz"}}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+    index_path = tmp_path / "cache" / "ubuntu" / "ubuntu_jammy_main_amd64.txt"
+
+    run_update(config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2)
+    serve_pdiff(served_dir, NEW)
+
+    def failing_build(*args: Any, **kwargs: Any) -> LoadStats:
+        raise ValueError("load failed")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(planner, "build_generation", failing_build)
+        results = run_update(
+            config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+        )
+    assert isinstance(results[db_path], ValueError)
+    assert index_path.read_bytes() == OLD
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+    )
+
+    assert list(results) == [db_path]
+    assert index_path.read_bytes() == NEW
@@ -0,0 +1,166 @@
+import hashlib
+import lzma
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from depinspect.archives.repomd import Checksum, parse_repomd
+from depinspect.planner import SourceError, run_update
+
+REPOMD = """<?xml version="1.0" encoding="UTF-8"?>
+<repomd xmlns="http://linux.duke.edu/metadata/repo">
+  <data type="primary">
+    <checksum type="sha256">0000</checksum>
+    <location href="repodata/primary.xml.gz"/>
+  </data>
+  <data type="primary_db">
+    <checksum type="sha256">{checksum}</checksum>
+    <open-checksum type="sha256">{open_checksum}</open-checksum>
+    <location href="repodata/{name}"/>
+  </data>
+</repomd>
+"""
+
+
+def serve_repo(served_dir: Path, tmp_path: Path, packages: list[str]) -> None:
+    db_path = tmp_path / "primary.sqlite"
+    db_path.unlink(missing_ok=True)
+    with sqlite3.connect(db_path) as db_con:
+        db_con.execute("CREATE TABLE packages (pkgKey INTEGER PRIMARY KEY, name TEXT)")
+        db_con.executemany(
+            "INSERT INTO packages (name) VALUES (?)", [(name,) for name in packages]
+        )
+    db_con.close()
+
+    content = db_path.read_bytes()
+    archive = lzma.compress(content)
+    name = f"{hashlib.sha256(archive).hexdigest()}-primary.sqlite.xz"
+
+    repodata = served_dir / "repo" / "repodata"
+    repodata.mkdir(parents=True, exist_ok=True)
+    (repodata / name).write_bytes(archive)
+    (repodata / "repomd.xml").write_text(
+        REPOMD.format(
+            checksum=hashlib.sha256(archive).hexdigest(),
+            open_checksum=hashlib.sha256(content).hexdigest(),
+            name=name,
+        ),
+        encoding="utf-8",
+    )
+
+
+def test_parse_repomd() -> None:
+    content = REPOMD.format(checksum="ABC", open_checksum="def", name="p.sqlite.xz")
+
+    primary = parse_repomd(content.encode(), "http://example.com/repo/")
+
+    assert primary.url == "http://example.com/repo/repodata/p.sqlite.xz"
+    assert primary.checksum == Checksum("sha256", "abc")
+    assert primary.open_checksum == Checksum("sha256", "def")
+    with pytest.raises(ValueError):
+        parse_repomd(b'<repomd xmlns="http://linux.duke.edu/metadata/repo"/>', "")
+
+
+def test_run_update_resolves_repomd(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    serve_repo(served_dir, tmp_path, ["bash", "glibc"])
+    config = {"fedora": {"f39": {"everything": {"x86_64": f"{http_server}/repo"}}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "fedora" / "fedora_f39_everything_x86_64.sqlite"
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+    )
+
+    assert list(results) == [db_path]
+    with sqlite3.connect(db_path) as db_con:
+        assert db_con.execute("SELECT COUNT(*) FROM packages").fetchone() == (2,)
+    db_con.close()
+
+    # The database matches repomd.xml, so nothing is downloaded.
+    for archive in (served_dir / "repo" / "repodata").glob("*.xz"):
+        archive.unlink()
+    assert (
+        run_update(config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2)
+        == {}
+    )
+
+
+def test_run_update_rejects_checksum_mismatch(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    serve_repo(served_dir, tmp_path, ["bash"])
+    repomd = served_dir / "repo" / "repodata" / "repomd.xml"
+    content = repomd.read_text(encoding="utf-8")
+    repomd.write_text(
+        content.replace('<checksum type="sha256">', '<checksum type="sha256">0'),
+        encoding="utf-8",
+    )
+    config = {"fedora": {"f39": {"everything": {"x86_64": f"{http_server}/repo"}}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "fedora" / "fedora_f39_everything_x86_64.sqlite"
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+    )
+
+    assert list(results) == [db_path]
+    assert isinstance(results[db_path], SourceError)
+    assert not list((database_dir / "fedora").glob("*.sqlite"))
+
+
+def test_run_update_stream_verifies_checksums(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    serve_repo(served_dir, tmp_path, ["bash"])
+    config = {"fedora": {"f39": {"everything": {"x86_64": f"{http_server}/repo"}}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "fedora" / "fedora_f39_everything_x86_64.sqlite"
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2, stream=True
+    )
+    assert list(results) == [db_path]
+
+    serve_repo(served_dir, tmp_path, ["bash", "glibc"])
+    repomd = served_dir / "repo" / "repodata" / "repomd.xml"
+    content = repomd.read_text(encoding="utf-8")
+    repomd.write_text(
+        content.replace(
+            '<open-checksum type="sha256">', '<open-checksum type="sha256">0'
+        ),
+        encoding="utf-8",
+    )
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2, stream=True
+    )
+
+    assert isinstance(results[db_path], ValueError)
+    with sqlite3.connect(db_path) as db_con:
+        assert db_con.execute("SELECT COUNT(*) FROM packages").fetchone() == (1,)
+    db_con.close()
+
+
+def test_run_update_reports_unreachable_repomd(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    config = {"fedora": {"f39": {"everything": {"x86_64": f"{http_server}/missing"}}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "fedora" / "fedora_f39_everything_x86_64.sqlite"
+
+    for stream in (False, True):
+        results = run_update(
+            config,
+            tmp_path / "tmp",
+            tmp_path / "cache",
+            database_dir,
+            4,
+            2,
+            stream=stream,
+        )
+
+        assert list(results) == [db_path]
+        assert isinstance(results[db_path], SourceError)
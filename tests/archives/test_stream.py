@@ -0,0 +1,54 @@
+import bz2
+import lzma
+from collections.abc import Callable
+
+import pytest
+
+from depinspect.archives.stream import decompress_stream, iter_lines
+
+
+def split_into_chunks(data: bytes, size: int) -> list[bytes]:
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize(
+    "archive_ext, compress",
+    [("xz", lzma.compress), ("bz2", bz2.compress)],
+)
+def test_decompress_stream_bounds_chunks(
+    archive_ext: str, compress: Callable[[bytes], bytes]
+) -> None:
+    data = b"Package: apt\nVersion: 2.4.5\n\n" * 1000
+    chunks = split_into_chunks(compress(data), 100)
+
+    output = list(decompress_stream(chunks, archive_ext, chunk_size=512))
+
+    assert b"".join(output) == data
+    assert max(len(chunk) for chunk in output) <= 512
+
+
+def test_decompress_stream_concatenated_streams() -> None:
+    chunks = split_into_chunks(bz2.compress(b"first\n") + bz2.compress(b"second\n"), 7)
+
+    assert b"".join(decompress_stream(chunks, "bz2")) == b"first\nsecond\n"
+
+
+def test_decompress_stream_truncated() -> None:
+    with pytest.raises(EOFError):
+        list(decompress_stream([lzma.compress(b"data" * 100)[:-10]], "xz"))
+
+
+def test_decompress_stream_unsupported_format() -> None:
+    with pytest.raises(ValueError):
+        list(decompress_stream([b""], "gz"))
+
+
+def test_iter_lines() -> None:
+    chunks = [b"Package: a", b"pt\nVersion: 1\n", b"\nPackage: ", "é".encode()]
+
+    assert list(iter_lines(chunks)) == [
+        "Package: apt",
+        "Version: 1",
+        "",
+        "Package: é",
+    ]
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from depinspect.database import catalog, database
+from depinspect.database.connection import readers
+from depinspect.distributions.loader import insert_packages_into_db
+from depinspect.distributions.package import PackageRecord
+
+
+def build(database_dir: Path, name: str, packages: list[tuple[str, str]]) -> Path:
+    distro_dir = database_dir / name.split("_")[0]
+    distro_dir.mkdir(exist_ok=True)
+    db_path = database.init(name, distro_dir)
+    insert_packages_into_db(
+        [PackageRecord(package=pkg, architecture=arch) for pkg, arch in packages],
+        db_path,
+    )
+    return db_path
+
+
+def test_catalog_follows_stored_databases(tmp_path: Path) -> None:
+    jammy = build(
+        tmp_path,
+        "ubuntu_jammy.sqlite",
+        [("tar", "amd64"), ("apt", "amd64"), ("apt", "riscv64")],
+    )
+    build(tmp_path, "ubuntu_noble.sqlite", [("bash", "i386")])
+    assert not catalog.is_built(tmp_path, "ubuntu")
+
+    catalog.sync(tmp_path)
+    assert catalog.is_built(tmp_path, "ubuntu")
+    assert not catalog.is_built(tmp_path, "fedora")
+    assert list(catalog.iter_names(tmp_path, "ubuntu", {"amd64", "riscv64"})) == [
+        "apt",
+        "tar",
+    ]
+    assert catalog.stored_archs(tmp_path, "ubuntu") == {"amd64", "riscv64", "i386"}
+    assert catalog.is_stored(tmp_path, "ubuntu", "riscv64", "apt")
+    assert not catalog.is_stored(tmp_path, "ubuntu", "riscv64", "tar")
+
+    # A rebuilt database replaces its rows, a removed one drops them.
+    insert_packages_into_db([PackageRecord("zstd", "riscv64")], jammy)
+    (tmp_path / "ubuntu" / "ubuntu_noble.sqlite").unlink()
+    catalog.sync(tmp_path, [jammy])
+    assert catalog.is_stored(tmp_path, "ubuntu", "riscv64", "zstd")
+    assert catalog.stored_archs(tmp_path, "ubuntu") == {"amd64", "riscv64"}
+
+    readers.close()
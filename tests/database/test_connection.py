@@ -0,0 +1,49 @@
+import sqlite3
+from os import replace
+from pathlib import Path
+
+import pytest
+
+from depinspect.database import database
+from depinspect.database.connection import MMAP_SIZE, Readers
+from depinspect.distributions.loader import insert_packages_into_db
+from depinspect.distributions.package import PackageRecord
+from depinspect.validator import is_valid_sql_table
+
+
+def build(db_path: Path, names: list[str]) -> Path:
+    db_path = database.init(db_path.name, db_path.parent)
+    insert_packages_into_db(
+        [PackageRecord(package=name, architecture="amd64") for name in names], db_path
+    )
+    return db_path
+
+
+def test_readers_reuse_connections(tmp_path: Path) -> None:
+    db_path = build(tmp_path / "ubuntu_jammy.sqlite", ["apt"])
+
+    with Readers() as readers:
+        db_con = readers.get(db_path)
+        assert readers.get(db_path) is db_con
+        assert db_con.execute("PRAGMA query_only").fetchone()[0] == 1
+        assert db_con.execute("PRAGMA mmap_size").fetchone()[0] == MMAP_SIZE
+        assert is_valid_sql_table(db_con, "depends")
+        assert not is_valid_sql_table(db_con, "requires")
+        with pytest.raises(sqlite3.OperationalError):
+            db_con.execute("DELETE FROM packages")
+
+        # A bad table name is rejected without closing the shared connection.
+        with pytest.raises(ValueError):
+            database.find_relations(db_con, "requires", "amd64", "apt")
+        assert readers.get(db_path) is db_con
+
+        # A new generation replaces the file and gets a new connection.
+        replace(build(tmp_path / "new.sqlite", ["apt", "tar"]), db_path)
+        new_con = readers.get(db_path)
+        assert new_con is not db_con
+        assert database.find_all_distinct(new_con, "amd64") == {"apt", "tar"}
+
+        new_con.close()
+        assert readers.get(db_path) is not new_con
+
+    assert not readers.connections
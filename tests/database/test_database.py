@@ -0,0 +1,64 @@
+import sqlite3
+from pathlib import Path
+
+from depinspect.database import database
+
+
+def primary(db_path: Path, packages: dict[tuple[str, str], list[str]]) -> Path:
+    """Write a database with the tables of a Fedora primary.sqlite that are read."""
+    db_con = sqlite3.connect(db_path)
+    db_con.executescript(
+        """
+        CREATE TABLE packages (pkgKey INTEGER PRIMARY KEY, name TEXT, arch TEXT);
+        CREATE TABLE requires (name TEXT, pkgKey INTEGER);
+        """
+    )
+    with db_con:
+        for (name, arch), requires in packages.items():
+            pkg_key = db_con.execute(
+                "INSERT INTO packages (name, arch) VALUES (?, ?)", (name, arch)
+            ).lastrowid
+            db_con.executemany(
+                "INSERT INTO requires (name, pkgKey) VALUES (?, ?)",
+                [(req, pkg_key) for req in requires],
+            )
+    db_con.close()
+    return db_path
+
+
+def test_find_divergent_between_matches_lookups(tmp_path: Path) -> None:
+    everything = primary(
+        tmp_path / "everything.sqlite",
+        {
+            ("bash", "x86_64"): ["glibc", "ncurses-libs"],
+            ("gcc", "x86_64"): ["cpp", "binutils"],
+            ("dnf", "noarch"): ["python3-dnf"],
+            ("grub2", "x86_64"): ["efibootmgr"],
+            ("filesystem", "x86_64"): [],
+        },
+    )
+    koji = primary(
+        tmp_path / "koji.sqlite",
+        {
+            ("bash", "riscv64"): ["ncurses-libs", "glibc"],
+            ("gcc", "riscv64"): ["cpp"],
+            ("dnf", "noarch"): ["python3-dnf", "rpm"],
+            ("opensbi", "riscv64"): ["dtc"],
+            ("filesystem", "riscv64"): [],
+        },
+    )
+
+    con_a = sqlite3.connect(f"file:{everything}?mode=ro", uri=True)
+    con_b = sqlite3.connect(f"file:{koji}?mode=ro", uri=True)
+    names = {"bash", "gcc", "dnf", "grub2", "opensbi", "filesystem"}
+    expected = {
+        name
+        for name in names
+        if database.find_dependencies(con_a, "requires", "x86_64", name)
+        != database.find_dependencies(con_b, "requires", "riscv64", name)
+    }
+
+    res = database.find_divergent_between(con_a, con_b, "requires", "x86_64", "riscv64")
+    assert res == expected == {"gcc", "grub2", "opensbi"}
+    con_a.close()
+    con_b.close()
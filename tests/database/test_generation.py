@@ -0,0 +1,57 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from depinspect.database import database, generation
+from depinspect.distributions.loader import insert_packages_into_db
+from depinspect.distributions.package import PackageRecord
+
+
+def build(db_path: Path, names: list[str]) -> Path:
+    db_path = database.init(db_path.name, db_path.parent)
+    insert_packages_into_db(
+        [PackageRecord(package=name, architecture="amd64") for name in names], db_path
+    )
+    return db_path
+
+
+def stored_names(db_path: Path) -> list[str]:
+    with sqlite3.connect(db_path) as db_con:
+        return [name for (name,) in db_con.execute("SELECT name FROM packages")]
+
+
+def test_promote_and_rollback(tmp_path: Path) -> None:
+    db_path = build(tmp_path / "ubuntu_jammy.sqlite", ["apt", "adduser"])
+    reader = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+
+    build(generation.staging_path(db_path), ["apt", "adduser", "passwd"])
+    generation.promote(db_path)
+
+    # An open connection keeps reading the generation it was opened on.
+    assert reader.execute("SELECT COUNT(*) FROM packages").fetchone() == (2,)
+    reader.close()
+    assert len(stored_names(db_path)) == 3
+    assert [path for path in tmp_path.iterdir() if path.is_file()] == [db_path]
+    assert generation.with_previous(tmp_path) == [db_path]
+
+    generation.rollback(db_path)
+
+    assert sorted(stored_names(db_path)) == ["adduser", "apt"]
+    with pytest.raises(FileNotFoundError):
+        generation.rollback(db_path)
+
+
+def test_promote_rejects_invalid_generation(tmp_path: Path) -> None:
+    db_path = build(tmp_path / "ubuntu_jammy.sqlite", ["apt", "adduser", "passwd"])
+
+    build(generation.staging_path(db_path), ["apt"])
+    with pytest.raises(ValueError):
+        generation.promote(db_path)
+
+    generation.staging_path(db_path).write_bytes(b"not a database")
+    with pytest.raises(sqlite3.DatabaseError):
+        generation.promote(db_path)
+
+    assert len(stored_names(db_path)) == 3
+    assert generation.with_previous(tmp_path) == []
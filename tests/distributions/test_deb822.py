@@ -0,0 +1,30 @@
+from depinspect.distributions.deb822 import iter_stanzas
+
+
+def test_iter_stanzas_joins_continuation_lines() -> None:
+    lines = [
+        "Package: apt\n",
+        "Depends: adduser,\n",
+        " libc6 (>= 2.34)\n",
+        "Description: package manager\n",
+        " Long description.\n",
+        " .\n",
+        "\n",
+        "\n",
+        "Package: adduser",
+    ]
+
+    assert list(iter_stanzas(lines)) == [
+        {
+            "Package": "apt",
+            "Depends": "adduser,\nlibc6 (>= 2.34)",
+            "Description": "package manager\nLong description.\n.",
+        },
+        {"Package": "adduser"},
+    ]
+
+
+def test_iter_stanzas_skips_malformed_lines() -> None:
+    lines = [" orphan continuation", "Package: apt", "no separator", " orphan"]
+
+    assert list(iter_stanzas(lines)) == [{"Package": "apt"}]
@@ -0,0 +1,237 @@
+import sqlite3
+from pathlib import Path
+
+from depinspect.database import database
+from depinspect.distributions.loader import (
+    apply_changes,
+    insert_packages_into_db,
+    load_files,
+)
+from depinspect.distributions.package import LoadStats, PackageRecord
+
+
+def test_insert_packages_into_db_in_batches(tmp_path: Path) -> None:
+    db_path = database.init("ubuntu_test.sqlite", tmp_path, indexes=False)
+    packages = [
+        PackageRecord(
+            package=f"pkg{i}",
+            architecture="amd64",
+            version="1.0",
+            release="jammy",
+            depends=(f"dep{i}", "libc6"),
+            provides=(f"virtual{i}",) if i % 2 else (),
+        )
+        for i in range(25)
+    ]
+
+    # Duplicates are dropped within a batch, across batches and across calls.
+    stats = insert_packages_into_db(packages + packages[5:7], db_path, batch_size=4)
+    assert stats == LoadStats(packages=25, duplicates=2)
+    stats = insert_packages_into_db(packages[:3], db_path, batch_size=4)
+    assert stats == LoadStats(packages=0, duplicates=3)
+
+    database.create_indexes(db_path)
+
+    con = sqlite3.connect(db_path)
+    assert con.execute("SELECT COUNT(*) FROM packages").fetchone() == (25,)
+    assert con.execute("SELECT COUNT(*) FROM depends").fetchone() == (50,)
+    # Every package depends on libc6, but the name is stored once.
+    assert con.execute("SELECT COUNT(*) FROM names").fetchone() == (38,)
+    indexes = {
+        name
+        for (name,) in con.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'"
+        )
+    }
+    assert {"packagename", "dependsname", "providesname"} <= indexes
+    assert database.find_relations(con, "provides", "amd64", "pkg7") == {"virtual7"}
+    con.close()
+
+
+def test_apply_changes_writes_only_differences(tmp_path: Path) -> None:
+    db_path = database.init("ubuntu_test.sqlite", tmp_path)
+    old = [
+        PackageRecord("apt", "amd64", "2.4.5", "jammy", depends=("adduser",)),
+        PackageRecord("adduser", "all", "3.118", "jammy", depends=("passwd",)),
+        PackageRecord("passwd", "amd64", "4.8", "jammy", breaks=("login (<< 4)",)),
+    ]
+    insert_packages_into_db(old, db_path)
+
+    con = sqlite3.connect(db_path)
+    (adduser_key,) = con.execute(
+        "SELECT pkgKey FROM packages WHERE name = 'adduser'"
+    ).fetchone()
+
+    new = [
+        PackageRecord("apt", "amd64", "2.4.5", "jammy", depends=("adduser", "gpgv")),
+        PackageRecord("adduser", "all", "3.118", "jammy", depends=("passwd",)),
+        PackageRecord("adduser", "all", "3.118", "jammy", depends=("passwd",)),
+        PackageRecord("gpgv", "amd64", "2.2", "jammy"),
+    ]
+    stats = apply_changes(new, db_path, batch_size=2)
+
+    assert stats == LoadStats(packages=1, duplicates=1, replaced=1, deleted=1)
+    assert con.execute(
+        "SELECT pkgKey FROM packages WHERE name = 'adduser'"
+    ).fetchone() == (adduser_key,)
+    assert sorted(con.execute("SELECT name FROM packages")) == [
+        ("adduser",),
+        ("apt",),
+        ("gpgv",),
+    ]
+    assert con.execute("SELECT COUNT(*) FROM depends").fetchone() == (3,)
+    assert con.execute("SELECT COUNT(*) FROM breaks").fetchone() == (0,)
+    assert database.find_relations(con, "depends", "amd64", "apt") == {
+        "adduser",
+        "gpgv",
+    }
+    con.close()
+
+
+def test_relations_are_normalized(tmp_path: Path) -> None:
+    db_path = database.init("ubuntu_test.sqlite", tmp_path)
+    depends = (
+        "libc6 (>= 2.34)",
+        "gpgv | gpgv2 (>>1.0) | gpgv1",
+        "python3:any [amd64]",
+        "",
+    )
+    packages = [
+        PackageRecord("apt", "amd64", "2.4.5", "jammy", depends=depends),
+        PackageRecord("gnupg", "amd64", "2.2", "jammy", depends=("gpgv",)),
+    ]
+    insert_packages_into_db(packages, db_path)
+
+    con = sqlite3.connect(db_path)
+    assert (
+        con.execute(
+            """SELECT grp, alt, archq, op, version FROM depends
+        JOIN names ON names.nameKey = depends.nameKey
+        WHERE names.name = 'gpgv2'"""
+        ).fetchall()
+        == [(1, 1, None, ">>", "1.0")]
+    )
+    assert database.find_relations(con, "depends", "amd64", "apt") == {
+        "libc6 (>= 2.34)",
+        "gpgv | gpgv2 (>> 1.0) | gpgv1",
+        "python3:any [amd64]",
+    }
+    assert database.find_relations(con, "depends", "amd64", "apt", False) == {
+        "libc6",
+        "gpgv | gpgv2 | gpgv1",
+        "python3:any [amd64]",
+    }
+    assert database.find_dependents(con, "depends", "amd64", "gpgv") == {
+        "apt",
+        "gnupg",
+    }
+    assert database.find_dependents(con, "depends", "amd64", "python3:any") == set()
+    con.close()
+
+
+def test_descriptions_are_stored_apart(tmp_path: Path) -> None:
+    db_path = database.init("ubuntu_test.sqlite", tmp_path)
+    packages = [
+        PackageRecord("apt", "amd64", "2.4.5", "jammy", description="package manager"),
+        PackageRecord("apt", "amd64", "2.4.5", "jammy", description="duplicate"),
+        PackageRecord("apt", "amd64", "2.4.6", "jammy", description="newer apt"),
+        PackageRecord("gpgv", "amd64", "2.2", "jammy"),
+    ]
+    insert_packages_into_db(packages, db_path)
+
+    con = sqlite3.connect(db_path)
+    columns = [row[1] for row in con.execute("PRAGMA table_info(packages)")]
+    assert "description" not in columns
+    assert con.execute("SELECT COUNT(*) FROM descriptions").fetchone() == (2,)
+    assert database.find_descriptions(con, "amd64", "apt") == {
+        "2.4.5": "package manager",
+        "2.4.6": "newer apt",
+    }
+    assert database.find_descriptions(con, "amd64", "gpgv") == {"2.2": None}
+    assert database.find_descriptions(con, "amd64", "missing") == {}
+    con.close()
+
+
+def test_load_files_merges_shards(tmp_path: Path) -> None:
+    stanza = (
+        "Package: {0}\nArchitecture: {1}\nVersion: 1.0\nDepends: {2}\n"
+        "Description: {0} on {1}\n\n"
+    )
+    files = []
+    for arch in ("amd64", "arm64", "riscv64"):
+        file_path = tmp_path / f"ubuntu_jammy_main_{arch}.txt"
+        file_path.write_text(
+            stanza.format("apt", arch, f"libc6 (>= 2.34), lib-{arch}")
+            + stanza.format("adduser", "all", "passwd | shadow"),
+            encoding="utf-8",
+        )
+        files.append(file_path)
+
+    sequential = database.init("sequential.sqlite", tmp_path)
+    sharded = database.init("sharded.sqlite", tmp_path)
+
+    assert load_files(files, sequential, "ubuntu", "jammy") == LoadStats(4, 2)
+    assert load_files(files, sharded, "ubuntu", "jammy", jobs=2) == LoadStats(4, 2)
+    assert not list(tmp_path.glob("*.shard*"))
+
+    for db_path in (sequential, sharded):
+        con = sqlite3.connect(db_path)
+        assert database.find_relations(con, "depends", "riscv64", "apt") == {
+            "libc6 (>= 2.34)",
+            "lib-riscv64",
+        }
+        assert database.find_relations(con, "depends", "all", "adduser") == {
+            "passwd | shadow"
+        }
+        assert database.find_dependents(con, "depends", "arm64", "libc6") == {"apt"}
+        assert database.find_descriptions(con, "arm64", "apt") == {
+            "1.0": "apt on arm64"
+        }
+        con.close()
+
+
+def test_find_divergent_matches_lookups(tmp_path: Path) -> None:
+    db_path = database.init("ubuntu_test.sqlite", tmp_path)
+    packages = [
+        PackageRecord("apt", "amd64", "2.4", "jammy", depends=("libc6 (>= 2.34)",)),
+        PackageRecord("apt", "riscv64", "2.4", "jammy", depends=("libc6 (>= 2.35)",)),
+        PackageRecord("gpg", "amd64", "2.2", "jammy", depends=("gpgv | gpgv2", "zlib")),
+        PackageRecord(
+            "gpg", "riscv64", "2.2", "jammy", depends=("zlib", "gpgv | gpgv2")
+        ),
+        PackageRecord("tar", "amd64", "1.0", "jammy", depends=("a | b",)),
+        PackageRecord("tar", "riscv64", "1.0", "jammy", depends=("b | a",)),
+        # Relations of every version count, also when split differently.
+        PackageRecord("vim", "amd64", "1", "jammy", depends=("x", "y")),
+        PackageRecord("vim", "riscv64", "1", "jammy", depends=("x",)),
+        PackageRecord("vim", "riscv64", "2", "jammy", depends=("y",)),
+        PackageRecord("grub", "amd64", "2.0", "jammy", depends=("efi",)),
+        PackageRecord("bash", "amd64", "5.1", "jammy"),
+        PackageRecord("adduser", "all", "3.1", "jammy", depends=("passwd",)),
+    ]
+    insert_packages_into_db(packages, db_path)
+
+    con = sqlite3.connect(db_path)
+    names = {pkg.package for pkg in packages}
+    for versions in (True, False):
+        expected = {
+            name
+            for name in names
+            if database.find_relations(con, "depends", "amd64", name, versions)
+            != database.find_relations(con, "depends", "riscv64", name, versions)
+        }
+        assert (
+            database.find_divergent(con, "depends", "amd64", "riscv64", versions)
+            == expected
+        )
+    assert database.find_divergent(con, "depends", "amd64", "riscv64") == {
+        "apt",
+        "tar",
+        "grub",
+    }
+    assert database.find_divergent(con, "depends", "amd64", "riscv64", False) == {
+        "tar",
+        "grub",
+    }
+    assert database.find_divergent(con, "depends", "amd64", "amd64") == set()
+    con.close()
@@ -0,0 +1,31 @@
+import pytest
+
+from depinspect.distributions.relations import Relation, parse_entry
+
+
+def test_parse_entry_splits_alternatives() -> None:
+    assert parse_entry("zlib1g (>=1:1.2.0) | libz1 | python3:any (<< 3.11)") == (
+        Relation("zlib1g", None, ">=", "1:1.2.0"),
+        Relation("libz1"),
+        Relation("python3", "any", "<<", "3.11"),
+    )
+
+
+def test_parse_entry_keeps_bare_names() -> None:
+    assert parse_entry("libstdc++6") == (Relation("libstdc++6"),)
+    assert parse_entry(" libz1") == (Relation("libz1"),)
+
+
+def test_parse_entry_normalizes_restrictions() -> None:
+    (relation,) = parse_entry("debhelper(> 13)[ amd64  !i386 ]  <!nocheck> < stage1 >")
+
+    assert relation == Relation(
+        "debhelper", None, ">=", "13", "amd64 !i386", "<!nocheck> <stage1>"
+    )
+    assert str(relation) == "debhelper (>= 13) [amd64 !i386] <!nocheck> <stage1>"
+
+
+@pytest.mark.parametrize("entry", ["libc6 | ", "libc6 (>= 2.34) junk", "(>= 1)"])
+def test_parse_entry_rejects_malformed_entries(entry: str) -> None:
+    with pytest.raises(ValueError):
+        parse_entry(entry)
@@ -1,5 +1,11 @@
+import logging
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
 from depinspect.constants import ROOT_DIR
-from depinspect.distributions.ubuntu import Ubuntu
+from depinspect.distributions.ubuntu import Ubuntu, stanza_ranges
 from depinspect.files import list_files_in_directory
 
 
@@ -28,3 +34,101 @@ def test_ubuntu_parsing() -> None:
                 assert (
                     f"Package: {entry.package}\n" in metadata
                 ), f"Package {entry.package} not found in {metadata_file}"
+
+
+def test_ubuntu_iter_metadata_is_lazy(tmp_path: Path) -> None:
+    metadata_file = tmp_path / "Packages.txt"
+    metadata_file.write_text(
+        "Package: apt\n"
+        "Architecture: amd64\n"
+        "Depends: adduser,\n"
+        " libc6\n"
+        "  (>= 2.34)\n"
+        "\n"
+        "Package: adduser\n"
+        "Architecture: all\n",
+        encoding="utf-8",
+    )
+
+    packages = Ubuntu.iter_metadata(metadata_file, "jammy")
+
+    apt = next(packages)
+    assert apt.package == "apt"
+    assert apt.depends == ("adduser", "libc6 (>= 2.34)")
+    assert apt.release == "jammy"
+    assert [pkg.package for pkg in packages] == ["adduser"]
+
+
+def test_ubuntu_iter_packages_ignores_unneeded_fields(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    lines = [
+        "Package: apt\n",
+        "SHA256: 0123456789abcdef\n",
+        "Conffiles:\n",
+        " /etc/apt/apt.conf.d/01autoremove 0123456789abcdef\n",
+        "pre-depends: libc6 (>= 2.34)\n",
+        "Conflicts: apt-legacy\n",
+        "Description: commandline package manager\n",
+    ]
+
+    with caplog.at_level(logging.WARNING):
+        (apt,) = Ubuntu.iter_packages(lines, "jammy")
+
+    assert not caplog.records
+    assert apt.package == "apt"
+    assert apt.pre_depends == ("libc6 (>= 2.34)",)
+    assert apt.conflicts == ("apt-legacy",)
+    assert apt.depends == ()
+    assert apt.description == "commandline package manager"
+
+
+def test_ubuntu_iter_metadata_parallel_keeps_order(tmp_path: Path) -> None:
+    metadata_file = tmp_path / "Packages.txt"
+    metadata_file.write_text(
+        "".join(
+            f"Package: pkg{i}\nDepends: dep{i}\nDescription: {'x' * (i % 7)}\n\n\n"
+            for i in range(200)
+        ),
+        encoding="utf-8",
+    )
+
+    ranges = stanza_ranges(metadata_file, 3)
+    content = metadata_file.read_bytes()
+
+    assert len(ranges) == 3
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+    assert all(
+        content[start:].lstrip(b"\n").startswith(b"Package:") for start, _ in ranges
+    )
+
+    packages = list(Ubuntu.iter_metadata_parallel(metadata_file, "jammy", jobs=3))
+
+    assert [pkg.package for pkg in packages] == [f"pkg{i}" for i in range(200)]
+    assert [pkg.depends for pkg in packages] == [(f"dep{i}",) for i in range(200)]
+
+
+def test_ubuntu_records_are_compact(tmp_path: Path) -> None:
+    metadata_file = tmp_path / "Packages.txt"
+    metadata_file.write_text(
+        "".join(
+            f"Package: pkg{i}\nArchitecture: amd64\nVersion: 1.{i}\n"
+            f"Depends: libc6 (>= 2.34), libgcc-s1\nDescription: package {i}\n\n"
+            for i in range(2000)
+        ),
+        encoding="utf-8",
+    )
+
+    tracemalloc.start()
+    records = list(Ubuntu.iter_metadata(metadata_file, "jammy"))
+    records_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    packages = Ubuntu.parse_metadata(metadata_file, "jammy")
+    packages_peak = tracemalloc.get_traced_memory()[1] - start
+    tracemalloc.stop()
+
+    assert records[0].depends[0] is records[1].depends[0]
+    assert records[0].suggests is records[1].suggests
+    assert [pkg.package for pkg in packages] == [rec.package for rec in records]
+    assert records_peak * 1.5 < packages_peak
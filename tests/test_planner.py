@@ -0,0 +1,214 @@
+import lzma
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from depinspect import planner
+from depinspect.distributions.package import LoadStats
+from depinspect.planner import Job, SourceError, plan_jobs, run_update
+
+PACKAGES = """Package: apt
+Architecture: {arch}
+Version: 2.4.5
+Depends: adduser, libc6 (>= 2.34)
+Description: commandline package manager
+
+Package: adduser
+Architecture: all
+Version: 3.118
+Depends: passwd
+Description: add and remove users and groups
+"""
+
+
+def make_sources(
+    served_dir: Path, base_url: str, archs: tuple[str, ...] = ("i386", "amd64")
+) -> dict[str, str]:
+    sources = {}
+    for arch in archs:
+        archive = served_dir / f"Packages-{arch}.xz"
+        archive.write_bytes(lzma.compress(PACKAGES.format(arch=arch).encode()))
+        sources[arch] = f"{base_url}/{archive.name}"
+    return sources
+
+
+def test_plan_jobs_keeps_jobs_sharing_a_url() -> None:
+    url = "http://example.com/Packages.xz"
+    config = {
+        "ubuntu": {"jammy": {"main": {"i386": url, "amd64": url}}},
+        "unknown": {"release": {"branch": {"arch": url}}},
+    }
+
+    jobs = plan_jobs(config)
+
+    assert jobs == [
+        Job("ubuntu", "jammy", "main", "i386", url),
+        Job("ubuntu", "jammy", "main", "amd64", url),
+    ]
+    assert jobs[0].db_name == jobs[1].db_name == "ubuntu_jammy.sqlite"
+
+
+def test_run_update_builds_and_skips_unmodified(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    config = {"ubuntu": {"jammy": {"main": make_sources(served_dir, http_server)}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+    )
+
+    # adduser is an "all" package listed in both indices.
+    assert results == {db_path: LoadStats(packages=3, duplicates=1)}
+    with sqlite3.connect(db_path) as db_con:
+        rows = db_con.execute("SELECT name, arch FROM packages").fetchall()
+    assert sorted(rows) == [("adduser", "all"), ("apt", "amd64"), ("apt", "i386")]
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+    )
+
+    assert results == {}
+
+
+def test_run_update_stream(tmp_path: Path, served_dir: Path, http_server: str) -> None:
+    config = {"ubuntu": {"jammy": {"main": make_sources(served_dir, http_server)}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2, stream=True
+    )
+
+    assert results == {db_path: LoadStats(packages=3, duplicates=1)}
+    assert not (tmp_path / "cache").exists()
+    with sqlite3.connect(db_path) as db_con:
+        rows = db_con.execute("SELECT name, arch FROM packages").fetchall()
+    assert sorted(rows) == [("adduser", "all"), ("apt", "amd64"), ("apt", "i386")]
+
+
+def test_run_update_incremental(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    config = {"ubuntu": {"jammy": {"main": make_sources(served_dir, http_server)}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+
+    run_update(config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2)
+
+    archive = served_dir / "Packages-amd64.xz"
+    changed = PACKAGES.format(arch="amd64").replace("Version: 2.4.5", "Version: 2.4.6")
+    archive.write_bytes(lzma.compress(changed.encode()))
+
+    # A fresh cache makes every source count as modified.
+    results = run_update(
+        config,
+        tmp_path / "tmp",
+        tmp_path / "fresh-cache",
+        database_dir,
+        4,
+        2,
+        incremental=True,
+    )
+
+    assert results == {db_path: LoadStats(packages=1, duplicates=1, deleted=1)}
+    with sqlite3.connect(db_path) as db_con:
+        rows = db_con.execute("SELECT name, arch, version FROM packages").fetchall()
+    assert sorted(rows) == [
+        ("adduser", "all", "3.118"),
+        ("apt", "amd64", "2.4.6"),
+        ("apt", "i386", "2.4.5"),
+    ]
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_run_update_keeps_database_when_a_source_fails(
+    tmp_path: Path, served_dir: Path, http_server: str, incremental: bool
+) -> None:
+    archs = ("i386", "amd64", "riscv64")
+    config = {
+        "ubuntu": {"jammy": {"main": make_sources(served_dir, http_server, archs)}}
+    }
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+
+    run_update(config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2)
+
+    # The riscv64 mirror returns 404 while amd64 has a new version.
+    (served_dir / "Packages-riscv64.xz").unlink()
+    changed = PACKAGES.format(arch="amd64").replace("Version: 2.4.5", "Version: 2.4.6")
+    (served_dir / "Packages-amd64.xz").write_bytes(lzma.compress(changed.encode()))
+
+    results = run_update(
+        config,
+        tmp_path / "tmp",
+        tmp_path / "cache",
+        database_dir,
+        4,
+        2,
+        incremental=incremental,
+    )
+
+    assert list(results) == [db_path]
+    assert isinstance(results[db_path], SourceError)
+    with sqlite3.connect(db_path) as db_con:
+        rows = db_con.execute("SELECT name, arch, version FROM packages").fetchall()
+    assert ("apt", "riscv64", "2.4.5") in rows
+    assert ("apt", "amd64", "2.4.5") in rows
+
+
+def test_run_update_retries_failed_load(
+    tmp_path: Path,
+    served_dir: Path,
+    http_server: str,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    config = {"ubuntu": {"jammy": {"main": make_sources(served_dir, http_server)}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+
+    run_update(config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2)
+
+    changed = PACKAGES.format(arch="amd64").replace("Version: 2.4.5", "Version: 2.4.6")
+    (served_dir / "Packages-amd64.xz").write_bytes(lzma.compress(changed.encode()))
+
+    def failing_build(*args: Any, **kwargs: Any) -> LoadStats:
+        raise ValueError("load failed")
+
+    # A fresh cache makes every source count as modified.
+    cache_dir = tmp_path / "fresh-cache"
+    with monkeypatch.context() as patched:
+        patched.setattr(planner, "build_generation", failing_build)
+        results = run_update(config, tmp_path / "tmp", cache_dir, database_dir, 4, 2)
+    assert isinstance(results[db_path], ValueError)
+
+    # The archive is unchanged upstream, but the failed load is not forgotten.
+    results = run_update(config, tmp_path / "tmp", cache_dir, database_dir, 4, 2)
+
+    assert list(results) == [db_path]
+    with sqlite3.connect(db_path) as db_con:
+        rows = db_con.execute("SELECT name, arch, version FROM packages").fetchall()
+    assert ("apt", "amd64", "2.4.6") in rows
+    assert run_update(config, tmp_path / "tmp", cache_dir, database_dir, 4, 2) == {}
+
+
+def test_run_update_extracts_shared_archive_once(
+    tmp_path: Path, served_dir: Path, http_server: str
+) -> None:
+    archive = served_dir / "Packages.xz"
+    archive.write_bytes(lzma.compress(PACKAGES.format(arch="amd64").encode()))
+    url = f"{http_server}/Packages.xz"
+    config = {"ubuntu": {"jammy": {"main": {"i386": url, "amd64": url}}}}
+    database_dir = tmp_path / "database"
+    db_path = database_dir / "ubuntu" / "ubuntu_jammy.sqlite"
+
+    results = run_update(
+        config, tmp_path / "tmp", tmp_path / "cache", database_dir, 4, 2
+    )
+
+    assert results == {db_path: LoadStats(packages=2)}
+    assert len(list((tmp_path / "tmp" / "ubuntu").iterdir())) == 1
+    assert len(list((tmp_path / "cache" / "ubuntu").glob("*.xz"))) == 1
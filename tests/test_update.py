@@ -1,35 +1,34 @@
+import lzma
 from pathlib import Path
 
-import pytest
-
 from depinspect.archives.extractor import extract_xz_archive, process_archives
-from depinspect.archives.fetcher import fetch_and_save_metadata
+from depinspect.archives.fetcher import fetch_all
 from depinspect.database import database
 from depinspect.distributions.loader import deserialize_ubuntu_metadata
 
+PACKAGES = """Package: apt
+Architecture: i386
+Version: 2.4.5
+Depends: adduser
 
-@pytest.fixture
-def data() -> dict[str, dict[str, dict[str, dict[str, str]]]]:
-    return {
-        "ubuntu": {
-            "jammy": {
-                "main": {
-                    "i386": "http://archive.ubuntu.com"
-                    "/ubuntu/dists/jammy/main"
-                    "/binary-i386/Packages.xz"
-                }
-            }
-        }
-    }
+Package: adduser
+Architecture: all
+Version: 3.118
+"""
 
 
 def test_initialize_from_archives(
-    tmp_path: Path, data: dict[str, dict[str, dict[str, dict[str, str]]]]
+    tmp_path: Path, served_dir: Path, http_server: str
 ) -> None:
-    fetch_and_save_metadata(data, "ubuntu", tmp_path)
-    process_archives(tmp_path, tmp_path, ".txt", ".xz", extract_xz_archive)
-    db_path = database.init("ubuntu_test.sqlite", tmp_path)
-    deserialize_ubuntu_metadata(tmp_path, db_path, "ubuntu", "jammy")
+    (served_dir / "Packages.xz").write_bytes(lzma.compress(PACKAGES.encode()))
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+
+    fetch_all({f"{http_server}/Packages.xz": output_dir / "ubuntu_jammy_main_i386.xz"})
+    process_archives(output_dir, output_dir, ".txt", ".xz", extract_xz_archive)
+    db_path = database.init("ubuntu_test.sqlite", output_dir)
+    deserialize_ubuntu_metadata(output_dir, db_path, "ubuntu", "jammy")
 
     assert db_path.is_file(), "Database file is not created"
     assert db_path.suffix == ".sqlite", "Unexpected database file extension"
+    assert database.count_packages(db_path) == 2